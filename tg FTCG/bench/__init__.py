@@ -0,0 +1 @@
+"""Offline benchmark harness with fake Telegram and Gemini backends."""
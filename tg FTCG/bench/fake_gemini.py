@@ -0,0 +1,184 @@
+"""
+Fake google-genai client with configurable latency and streaming.
+
+It mimics the parts of genai.Client that GeminiClient uses
+(client.aio.models.generate_content and generate_content_stream, and
+client.aio.caches.create for context caching), so the real client code
+runs unchanged without network access or API keys.
+"""
+
+import asyncio
+import random
+from typing import Dict, List, Optional
+
+# Every fake answer ends with this marker so the benchmark can tell when a reply is complete
+END_MARKER = "ENDOFANSWER"
+
+WORDS = (
+    "robot motor sensor encoder gyro drivetrain mecanum intake arm lift servo "
+    "autonomous teleop alliance scoring match chassis battery wiring controller code"
+).split()
+
+# Latency of model tiers relative to the configured one, matched by substring of the model name
+MODEL_LATENCY_FACTORS = {"lite": 0.5, "pro": 2.0}
+
+
+class FakeAPIError(Exception):
+    """Stand-in for google.genai.errors.APIError."""
+
+    def __init__(self, code: int, message: str = "Simulated Gemini error"):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FakeUsage:
+    """Stand-in for GenerateContentResponseUsageMetadata."""
+
+    def __init__(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = completion_tokens
+        self.cached_content_token_count = 0
+        self.total_token_count = prompt_tokens + completion_tokens
+
+
+class FakeCachedContent:
+    """Stand-in for a CachedContent."""
+
+    def __init__(self, name: str, model: str):
+        self.name = name
+        self.model = model
+
+
+class FakeResponse:
+    """Stand-in for a GenerateContentResponse (or one streamed chunk)."""
+
+    def __init__(self, text: str, usage_metadata: Optional[FakeUsage] = None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class FakeModels:
+    """Implements the async model calls with simulated latency."""
+
+    def __init__(
+        self,
+        first_chunk_latency: float,
+        chunk_interval: float,
+        chunks: int,
+        jitter: float,
+        error_rate: float
+    ):
+        self.first_chunk_latency = first_chunk_latency
+        self.chunk_interval = chunk_interval
+        self.chunks = chunks
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = 0
+        self.calls_by_model: Dict[str, int] = {}
+        self.errors = 0
+
+        # Tokens of each cached content by name, and prompt tokens billed so far
+        self.cached_contents: Dict[str, int] = {}
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def _delay(self, base: float, model: str = "") -> float:
+        for marker, factor in MODEL_LATENCY_FACTORS.items():
+            if marker in model:
+                base *= factor
+                break
+        return max(0.0, base * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def _answer_chunks(self, model: str) -> List[str]:
+        self.calls += 1
+        self.calls_by_model[model] = self.calls_by_model.get(model, 0) + 1
+        words_per_chunk = 12
+        chunks = []
+        for index in range(self.chunks):
+            words = " ".join(random.choice(WORDS) for _ in range(words_per_chunk))
+            chunks.append(("**Answer:** " if index == 0 else " ") + words)
+        chunks[-1] += f" {END_MARKER}"
+        return chunks
+
+    def _maybe_fail(self):
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors += 1
+            raise FakeAPIError(503)
+
+    def _usage(self, contents, config, chunks: List[str]) -> FakeUsage:
+        prompt = contents if isinstance(contents, str) else str(contents)
+        prompt_tokens = len(prompt) // 4
+        cached_tokens = 0
+
+        cache_name = getattr(config, "cached_content", None)
+        if cache_name:
+            if cache_name not in self.cached_contents:
+                raise FakeAPIError(404, f"CachedContent not found: {cache_name}")
+            cached_tokens = self.cached_contents[cache_name]
+        instruction = getattr(config, "system_instruction", None)
+        if instruction:
+            prompt_tokens += len(str(instruction)) // 4
+
+        self.prompt_tokens += prompt_tokens + cached_tokens
+        self.cached_tokens += cached_tokens
+        usage = FakeUsage(prompt_tokens + cached_tokens, sum(len(c) for c in chunks) // 4)
+        usage.cached_content_token_count = cached_tokens
+        return usage
+
+    async def generate_content(self, model: str, contents, config=None, **kwargs) -> FakeResponse:
+        chunks = self._answer_chunks(model)
+        usage = self._usage(contents, config, chunks)
+        total = self.first_chunk_latency + self.chunk_interval * (len(chunks) - 1)
+        await asyncio.sleep(self._delay(total, model))
+        self._maybe_fail()
+        return FakeResponse("".join(chunks), usage)
+
+    async def generate_content_stream(self, model: str, contents, config=None, **kwargs):
+        chunks = self._answer_chunks(model)
+        usage = self._usage(contents, config, chunks)
+
+        async def stream():
+            await asyncio.sleep(self._delay(self.first_chunk_latency, model))
+            self._maybe_fail()
+            for index, chunk in enumerate(chunks):
+                if index:
+                    await asyncio.sleep(self._delay(self.chunk_interval, model))
+                last = index == len(chunks) - 1
+                yield FakeResponse(chunk, usage if last else None)
+
+        return stream()
+
+
+class FakeCaches:
+    """Implements cached content creation on top of FakeModels."""
+
+    def __init__(self, models: FakeModels):
+        self.models = models
+
+    async def create(self, model: str, config=None, **kwargs) -> FakeCachedContent:
+        name = f"cachedContents/fake-{len(self.models.cached_contents) + 1}"
+        self.models.cached_contents[name] = len(str(getattr(config, "system_instruction", ""))) // 4
+        return FakeCachedContent(name, model)
+
+
+class FakeAsyncClient:
+    """Stand-in for genai.Client().aio."""
+
+    def __init__(self, models: FakeModels):
+        self.models = models
+        self.caches = FakeCaches(models)
+
+
+class FakeGenAIClient:
+    """Stand-in for genai.Client exposing only the async API."""
+
+    def __init__(
+        self,
+        first_chunk_latency: float = 0.5,
+        chunk_interval: float = 0.2,
+        chunks: int = 8,
+        jitter: float = 0.3,
+        error_rate: float = 0.0
+    ):
+        self.fake_models = FakeModels(first_chunk_latency, chunk_interval, chunks, jitter, error_rate)
+        self.aio = FakeAsyncClient(self.fake_models)
@@ -0,0 +1,163 @@
+"""
+Local stand-in for the Telegram Bot API.
+
+Serves getUpdates from an in-memory queue of synthetic updates and records
+every outgoing bot call, so the benchmark can measure when each user's
+reply was delivered and how many API calls it took.
+"""
+
+import asyncio
+import itertools
+import json
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from bot.web_server import Request, Response, WebServer
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Mentor", "username": "bench_mentor_bot"}
+
+
+class FakeTelegramServer:
+    """Fake Bot API: POST /bot<token>/<method>."""
+
+    def __init__(self, token: str, host: str = "127.0.0.1", port: int = 0):
+        self.token = token
+        self.server = WebServer(host, port)
+
+        self._updates: List[Dict] = []
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1000)
+        self._new_update = asyncio.Event()
+        self._closing = False
+
+        # Called with (method, chat_id, params, timestamp) for every bot call except getUpdates
+        self.listeners: List[Callable[[str, Optional[int], Dict, float], None]] = []
+        self.calls: Dict[str, int] = {}
+        self._callback_chats: Dict[str, int] = {}
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.server.host}:{self.server.port}/bot"
+
+    async def start(self):
+        for method in (
+            "getMe", "deleteWebhook", "getUpdates", "sendMessage", "editMessageText",
+            "sendChatAction", "answerCallbackQuery", "deleteMessage", "setMyCommands", "close",
+        ):
+            self.server.add_route("POST", f"/bot{self.token}/{method}", self._make_handler(method))
+        await self.server.start()
+
+    async def stop(self):
+        # Release pending long polls so their handlers finish instead of being cancelled
+        self._closing = True
+        self._new_update.set()
+        await asyncio.sleep(0)
+        await self.server.stop()
+
+    # Update injection ---------------------------------------------------
+
+    def send_text(self, user_id: int, text: str):
+        """Queue a private text message from a user."""
+        self._push({
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private", "first_name": f"Student{user_id}"},
+                "from": {"id": user_id, "is_bot": False, "first_name": f"Student{user_id}"},
+                "text": text,
+            }
+        })
+
+    def press_button(self, user_id: int, data: str):
+        """Queue an inline keyboard button press on a bot message."""
+        callback_id = str(next(self._message_ids))
+        self._callback_chats[callback_id] = user_id
+        self._push({
+            "callback_query": {
+                "id": callback_id,
+                "from": {"id": user_id, "is_bot": False, "first_name": f"Student{user_id}"},
+                "chat_instance": str(user_id),
+                "data": data,
+                "message": {
+                    "message_id": next(self._message_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private", "first_name": f"Student{user_id}"},
+                    "from": BOT_USER,
+                    "text": "📚 Learning Paths",
+                },
+            }
+        })
+
+    def _push(self, update: Dict):
+        update["update_id"] = next(self._update_ids)
+        self._updates.append(update)
+        self._new_update.set()
+
+    # Bot API ----------------------------------------------------------------
+
+    def _make_handler(self, method: str):
+        async def handler(request: Request) -> Response:
+            params = self._parse_params(request)
+            if method == "getUpdates":
+                result = await self._get_updates(params)
+            else:
+                self.calls[method] = self.calls.get(method, 0) + 1
+                now = time.monotonic()
+                chat_id = self._chat_of(params)
+                for listener in self.listeners:
+                    listener(method, chat_id, params, now)
+                result = self._result(method, params)
+            body = json.dumps({"ok": True, "result": result}).encode("utf-8")
+            return Response(200, body, "application/json")
+
+        return handler
+
+    @staticmethod
+    def _parse_params(request: Request) -> Dict:
+        if not request.body:
+            return {}
+        if request.headers.get("content-type", "").startswith("application/json"):
+            return json.loads(request.body)
+        params = {}
+        for key, values in parse_qs(request.body.decode("utf-8")).items():
+            value = values[0]
+            try:
+                params[key] = json.loads(value)
+            except ValueError:
+                params[key] = value
+        return params
+
+    async def _get_updates(self, params: Dict) -> List[Dict]:
+        offset = int(params.get("offset", 0) or 0)
+        timeout = float(params.get("timeout", 0) or 0)
+
+        # Confirmed updates are dropped, as the real API does
+        self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates and timeout and not self._closing:
+            self._new_update.clear()
+            try:
+                await asyncio.wait_for(self._new_update.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return list(self._updates[:100])
+
+    def _chat_of(self, params: Dict) -> Optional[int]:
+        """Return the chat a bot call targets, if any."""
+        if params.get("chat_id") not in (None, ""):
+            return int(params["chat_id"])
+        return self._callback_chats.get(str(params.get("callback_query_id", "")))
+
+    def _result(self, method: str, params: Dict):
+        if method == "getMe":
+            return BOT_USER
+        if method in ("sendMessage", "editMessageText"):
+            message_id = params.get("message_id") or next(self._message_ids)
+            return {
+                "message_id": int(message_id),
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+                "from": BOT_USER,
+                "text": str(params.get("text", "")),
+            }
+        return True
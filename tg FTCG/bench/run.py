@@ -0,0 +1,311 @@
+"""
+Offline load benchmark for the bot.
+
+Drives the real Application and handlers from bot.main against a local fake
+Telegram Bot API and a fake Gemini backend, replays a synthetic population
+of students and reports reply latency percentiles and throughput.
+
+Usage (from the project root):
+    python -m bench.run --users 50 --messages 5 --think-time 2
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+# Imports nothing from bot, so it is safe before the bot's settings are configured
+from bench import fake_gemini
+
+BENCH_TOKEN = "123456:BENCHMARK"
+
+QUESTIONS = [
+    "How does a robot move?",
+    "What's the difference between FRC and FTC?",
+    "Explain what autonomous mode is",
+    "How do I start learning to program a robot?",
+    "What is a motor controller?",
+    "How do encoders work?",
+    "What does a mecanum drivetrain do?",
+    "How should we scout at our first competition?",
+]
+
+# Learning-path navigation buttons (answered without the LLM)
+MENU_BUTTONS = ["learn_beginner", "learn_intermediate", "learn_advanced", "back_to_levels"]
+
+# Texts that mean the bot answered with an error instead of a generated reply
+ERROR_MARKERS = (
+    "trouble connecting", "Something went wrong", "had trouble generating",
+    "can't take more", "faster than I can answer",
+)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline benchmark for the FIRST Robotics Mentor Bot")
+    parser.add_argument("--users", type=int, default=20, help="Number of simulated students")
+    parser.add_argument("--messages", type=int, default=5, help="Requests sent by each student")
+    parser.add_argument("--think-time", type=float, default=1.0,
+                        help="Mean pause (seconds) between a reply and the student's next request")
+    parser.add_argument("--lesson-ratio", type=float, default=0.2,
+                        help="Share of requests that are learning-path topic taps")
+    parser.add_argument("--menu-ratio", type=float, default=0.0,
+                        help="Share of requests that are menu navigation taps (no LLM call)")
+    parser.add_argument("--first-chunk-latency", type=float, default=0.5,
+                        help="Fake Gemini time to first streamed chunk (seconds)")
+    parser.add_argument("--chunk-interval", type=float, default=0.2,
+                        help="Fake Gemini delay between streamed chunks (seconds)")
+    parser.add_argument("--chunks", type=int, default=8, help="Chunks per fake answer")
+    parser.add_argument("--jitter", type=float, default=0.3, help="Relative latency jitter (0-1)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of failing Gemini calls")
+    parser.add_argument("--context-cache-min-tokens", type=int,
+                        help="Cache system instructions from this size (tokens), e.g. 1 to cache the "
+                             "built-in prompts, which are shorter than Gemini's minimum")
+    parser.add_argument("--reply-timeout", type=float, default=60.0,
+                        help="Seconds before a request counts as failed")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this JSON file")
+    parser.add_argument("--max-p95", type=float,
+                        help="Exit with status 1 if the p95 reply latency exceeds this (seconds)")
+    return parser.parse_args(argv)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class PendingReply:
+    """A request waiting for its reply."""
+
+    def __init__(self, kind: str, started: float):
+        self.kind = kind
+        self.started = started
+        self.first_text: Optional[float] = None
+        self.calls = 0
+        self.done = asyncio.get_running_loop().create_future()
+
+
+class ReplyTracker:
+    """Matches bot API calls to the outstanding request of each chat."""
+
+    def __init__(self):
+        self._pending: Dict[int, PendingReply] = {}
+        self.results: List[Dict] = []
+
+    def expect(self, chat_id: int, kind: str) -> PendingReply:
+        pending = self._pending[chat_id] = PendingReply(kind, time.monotonic())
+        return pending
+
+    def on_call(self, method: str, chat_id: Optional[int], params: Dict, now: float):
+        pending = self._pending.get(chat_id)
+        if pending is None:
+            return
+        pending.calls += 1
+        if method not in ("sendMessage", "editMessageText"):
+            return
+
+        text = str(params.get("text", ""))
+        if pending.kind == "menu":
+            # Menus are answered with a single edit
+            pending.first_text = now
+            self._finish(chat_id, pending, now, ok=method == "editMessageText")
+            return
+
+        if pending.first_text is None and ("Answer" in text or any(m in text for m in ERROR_MARKERS)):
+            pending.first_text = now
+
+        failed = any(marker in text for marker in ERROR_MARKERS)
+        # Streaming previews end with a cursor; only the final text counts as delivered
+        complete = fake_gemini.END_MARKER in text and not text.rstrip().endswith("▌")
+        if failed or complete:
+            self._finish(chat_id, pending, now, ok=not failed)
+
+    def fail(self, chat_id: int, pending: PendingReply):
+        self._finish(chat_id, pending, time.monotonic(), ok=False)
+
+    def _finish(self, chat_id: int, pending: PendingReply, now: float, ok: bool):
+        if self._pending.get(chat_id) is not pending:
+            return
+        del self._pending[chat_id]
+        self.results.append({
+            "kind": pending.kind,
+            "ok": ok,
+            "latency": now - pending.started,
+            "first_text": (pending.first_text or now) - pending.started,
+            "calls": pending.calls,
+        })
+        if not pending.done.done():
+            pending.done.set_result(ok)
+
+
+async def simulate_user(user_id: int, args, fake, tracker: ReplyTracker, topic_ids: List[str]):
+    """One student: send a request, wait for the answer, think, repeat."""
+    for _ in range(args.messages):
+        if args.think_time:
+            await asyncio.sleep(random.expovariate(1 / args.think_time))
+
+        roll = random.random()
+        if roll < args.menu_ratio:
+            pending = tracker.expect(user_id, "menu")
+            fake.press_button(user_id, random.choice(MENU_BUTTONS))
+        elif roll < args.menu_ratio + args.lesson_ratio:
+            pending = tracker.expect(user_id, "lesson")
+            fake.press_button(user_id, f"topic_{random.choice(topic_ids)}")
+        else:
+            pending = tracker.expect(user_id, "message")
+            fake.send_text(user_id, random.choice(QUESTIONS))
+
+        try:
+            await asyncio.wait_for(asyncio.shield(pending.done), timeout=args.reply_timeout)
+        except asyncio.TimeoutError:
+            tracker.fail(user_id, pending)
+
+
+def build_report(args, tracker: ReplyTracker, elapsed: float, fake, genai) -> Dict:
+    results = tracker.results
+    ok = [r for r in results if r["ok"]]
+    report = {
+        "users": args.users,
+        "requests": len(results),
+        "failed": len(results) - len(ok),
+        "elapsed_seconds": round(elapsed, 3),
+        "replies_per_second": round(len(ok) / elapsed, 3) if elapsed else 0.0,
+        "gemini_calls": genai.fake_models.calls,
+        "gemini_calls_by_model": dict(sorted(genai.fake_models.calls_by_model.items())),
+        "gemini_prompt_tokens": genai.fake_models.prompt_tokens,
+        "gemini_cached_tokens": genai.fake_models.cached_tokens,
+        "telegram_calls": dict(sorted(fake.calls.items())),
+        "telegram_calls_per_reply": round(sum(r["calls"] for r in results) / len(results), 2)
+        if results else 0.0,
+        "latency": {},
+    }
+    for kind in ("all", "message", "lesson", "menu"):
+        selected = [r for r in ok if kind == "all" or r["kind"] == kind]
+        if not selected:
+            continue
+        latencies = [r["latency"] for r in selected]
+        first = [r["first_text"] for r in selected]
+        report["latency"][kind] = {
+            "count": len(selected),
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "first_text_p50": round(percentile(first, 0.50), 3),
+            "first_text_p95": round(percentile(first, 0.95), 3),
+        }
+    return report
+
+
+def print_report(report: Dict):
+    print()
+    print(f"Requests: {report['requests']} ({report['failed']} failed) "
+          f"from {report['users']} users in {report['elapsed_seconds']}s")
+    print(f"Throughput: {report['replies_per_second']} replies/s, "
+          f"Gemini calls: {report['gemini_calls']}, "
+          f"Telegram calls per reply: {report['telegram_calls_per_reply']}")
+    print()
+    print(f"{'kind':<9}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'first p50':>11}{'first p95':>11}")
+    for kind, stats in report["latency"].items():
+        print(
+            f"{kind:<9}{stats['count']:>7}{stats['p50']:>9.3f}{stats['p95']:>9.3f}{stats['p99']:>9.3f}"
+            f"{stats['first_text_p50']:>11.3f}{stats['first_text_p95']:>11.3f}"
+        )
+    print()
+    print("Gemini calls by model:", ", ".join(f"{m}={n}" for m, n in report["gemini_calls_by_model"].items()))
+    print(f"Gemini prompt tokens: {report['gemini_prompt_tokens']} "
+          f"({report['gemini_cached_tokens']} from context caches)")
+    print("Telegram API calls:", ", ".join(f"{m}={n}" for m, n in report["telegram_calls"].items()))
+
+
+async def run(args) -> Dict:
+    from bench.fake_telegram import FakeTelegramServer
+    from bot.main import build_application, post_init, post_shutdown, post_stop
+    from bot.ai import get_llm_router
+    from bot.ai.model_tiers import TIERS
+    from bot.handlers import learning_paths
+
+    # One log line per fake API call would drown out the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    fake = FakeTelegramServer(BENCH_TOKEN)
+    await fake.start()
+
+    genai = fake_gemini.FakeGenAIClient(
+        first_chunk_latency=args.first_chunk_latency,
+        chunk_interval=args.chunk_interval,
+        chunks=args.chunks,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+    )
+    for tier in TIERS:
+        for provider in get_llm_router(tier).providers:
+            provider.client = genai
+
+    tracker = ReplyTracker()
+    fake.listeners.append(tracker.on_call)
+
+    application = build_application(base_url=fake.base_url)
+    await application.initialize()
+    await post_init(application)
+    await application.updater.start_polling(poll_interval=0.0, timeout=1)
+    await application.start()
+
+    started = time.monotonic()
+    try:
+        await asyncio.gather(*(
+            simulate_user(1000 + index, args, fake, tracker, learning_paths.get_all_topic_ids())
+            for index in range(args.users)
+        ))
+    finally:
+        elapsed = time.monotonic() - started
+        await application.updater.stop()
+        await application.stop()
+        await post_stop(application)
+        await application.shutdown()
+        await post_shutdown(application)
+        await fake.stop()
+
+    return build_report(args, tracker, elapsed, fake, genai)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    random.seed(args.seed)
+
+    # The bot reads its settings on first use, so configure it before starting it
+    os.environ["TELEGRAM_BOT_TOKEN"] = BENCH_TOKEN
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    os.environ.setdefault("LESSON_CACHE_WARM", "false")
+    os.environ.pop("WEBHOOK_URL", None)
+    os.environ["LLM_PROVIDERS"] = "gemini"
+    # Simulated students are much faster than real ones, so rate limits are off unless set
+    os.environ.setdefault("RATE_LIMIT_USER_PER_MINUTE", "0")
+    os.environ.setdefault("RATE_LIMIT_CHAT_PER_MINUTE", "0")
+    if args.context_cache_min_tokens is not None:
+        os.environ["GEMINI_CONTEXT_CACHE_MIN_TOKENS"] = str(args.context_cache_min_tokens)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    p95 = report["latency"].get("all", {}).get("p95", 0.0)
+    if args.max_p95 is not None and (p95 > args.max_p95 or report["failed"]):
+        print(f"FAIL: p95 {p95:.3f}s exceeds {args.max_p95:.3f}s or requests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,20 @@
 """AI integration module for Google Gemini API communication."""
 
 from .gemini_client import GeminiClient
+from .openai_client import OpenAIClient
 from .prompts import SYSTEM_PROMPT
+from .provider import LLMProvider
+from .model_tiers import classify_lesson, classify_question
+from .router import LLMRouter, create_llm_router, get_llm_router
 
-__all__ = ["GeminiClient", "SYSTEM_PROMPT"]
+__all__ = [
+    "GeminiClient",
+    "OpenAIClient",
+    "LLMProvider",
+    "LLMRouter",
+    "create_llm_router",
+    "get_llm_router",
+    "classify_question",
+    "classify_lesson",
+    "SYSTEM_PROMPT",
+]
@@ -0,0 +1,155 @@
+"""
+Gemini context caching for system instructions.
+
+A system instruction sent with many requests (the mentor prompt, lesson
+prompts) can be uploaded once as cached content: later requests refer to it
+by name, so its tokens are neither sent nor processed again and are billed
+at the cached rate. Gemini only caches contents above a minimum size, so
+shorter instructions are sent with each request as before; that includes
+the built-in mentor and lesson prompts, so caching only pays off for custom
+prompts above the minimum. Which instructions are too small is remembered,
+so they cost no work per request. Caches are
+created on first use, recreated shortly before they expire and forgotten if
+a request finds them gone.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Dict, Optional, Tuple
+from bot import metrics
+from bot.ai.tokens import estimate_tokens, match_model
+
+logger = logging.getLogger(__name__)
+
+# Smallest content Gemini caches explicitly, in tokens, matched by model prefix
+MODEL_MIN_TOKENS = {
+    "gemini-2.5-pro": 4096,
+    "gemini-2.5-flash": 1024,
+    "gemini-2.5-flash-lite": 1024,
+}
+DEFAULT_MIN_TOKENS = 4096
+
+# Caches are replaced this many seconds before they expire
+EXPIRY_MARGIN = 60.0
+
+# After a failed upload, the instruction is sent inline for this many seconds
+RETRY_AFTER_FAILURE = 300.0
+
+# Instructions whose size is remembered; few distinct ones are ever sent
+MAX_SIZED_INSTRUCTIONS = 256
+
+
+def _key(model: str, system_instruction: str) -> Tuple[str, str]:
+    return (model, hashlib.sha256(system_instruction.encode("utf-8")).hexdigest())
+
+
+class ContextCache:
+    """Cached contents of one Gemini client, keyed by model and system instruction."""
+
+    def __init__(self, ttl: float, min_tokens: int = 0):
+        """
+        Args:
+            ttl: Seconds a cached content lives on the server
+            min_tokens: Smallest instruction to cache (0 uses the model's minimum)
+        """
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+
+        # Format: {(model, instruction hash): (cache name, monotonic time to replace it)}
+        self._entries: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._pending: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._failed_until: Dict[Tuple[str, str], float] = {}
+        # Format: {(model, instruction): large enough to cache}
+        self._cacheable: Dict[Tuple[str, str], bool] = {}
+
+        self.hits = 0
+        self.created = 0
+        self.failures = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return cache counters."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "created": self.created,
+            "failures": self.failures,
+        }
+
+    def is_cacheable(self, model: str, system_instruction: str) -> bool:
+        """Return True if the instruction is large enough for the model to cache it."""
+        key = (model, system_instruction)
+        cacheable = self._cacheable.get(key)
+        if cacheable is None:
+            minimum = self.min_tokens
+            if not minimum:
+                prefix = match_model(model, MODEL_MIN_TOKENS)
+                minimum = MODEL_MIN_TOKENS[prefix] if prefix else DEFAULT_MIN_TOKENS
+            # Estimates never exceed the number of characters, so short texts need no counting
+            cacheable = len(system_instruction) >= minimum and estimate_tokens(system_instruction) >= minimum
+            if len(self._cacheable) >= MAX_SIZED_INSTRUCTIONS:
+                self._cacheable.clear()
+            self._cacheable[key] = cacheable
+        return cacheable
+
+    async def get(self, client, model: str, system_instruction: str) -> Optional[str]:
+        """
+        Return the name of a cached content holding the system instruction,
+        or None if it should be sent with the request instead.
+        """
+        if not system_instruction or not self.is_cacheable(model, system_instruction):
+            return None
+        caches = getattr(getattr(client, "aio", None), "caches", None)
+        if caches is None:
+            return None
+
+        key = _key(model, system_instruction)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > now:
+            self.hits += 1
+            metrics.CACHE_LOOKUPS.inc(cache="gemini_context", result="hit")
+            return entry[0]
+        if self._failed_until.get(key, 0.0) > now:
+            return None
+
+        # Concurrent requests wait for the same upload
+        task = self._pending.get(key)
+        if task is None:
+            metrics.CACHE_LOOKUPS.inc(cache="gemini_context", result="miss")
+            task = self._pending[key] = asyncio.create_task(
+                self._create(caches, model, system_instruction, key)
+            )
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        # A cancelled request must not abort an upload others are waiting for
+        return await asyncio.shield(task)
+
+    def invalidate(self, name: str):
+        """Forget a cached content the API no longer knows (e.g. deleted or expired early)."""
+        for key, (entry_name, _) in list(self._entries.items()):
+            if entry_name == name:
+                del self._entries[key]
+
+    async def _create(self, caches, model: str, system_instruction: str, key: Tuple[str, str]) -> Optional[str]:
+        from google.genai import types
+
+        try:
+            cached = await caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=system_instruction,
+                    ttl=f"{int(self.ttl)}s",
+                    display_name="mentor-system-instruction",
+                )
+            )
+        except Exception as e:
+            self.failures += 1
+            self._failed_until[key] = time.monotonic() + RETRY_AFTER_FAILURE
+            logger.warning(f"Could not cache the system instruction for {model}, sending it inline: {e}")
+            return None
+
+        self.created += 1
+        self._entries[key] = (cached.name, time.monotonic() + max(self.ttl - EXPIRY_MARGIN, 0.0))
+        logger.info(f"Cached a {estimate_tokens(system_instruction)}-token system instruction for {model}")
+        return cached.name
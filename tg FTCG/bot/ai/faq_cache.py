@@ -0,0 +1,208 @@
+"""
+Semantic cache of answers to frequent context-free questions.
+
+Questions are turned into hashed word, word pair and character n-gram
+vectors and compared by cosine similarity with NumPy, so rephrasings such as
+"what's a servo" and "What is a servo?" can reuse one answer without an
+embedding service. Word pairs keep the order of words, so "Java vs Python"
+and "Python vs Java" don't look identical. The words that decide what is
+asked must match exactly: question words, modals, pronouns and comparisons
+("Can I use a servo?" is not "How do I use a servo?") as well as program
+names, numbers and rule ids ("REV motors in FTC" never gets the answer about
+FRC), however similar the rest is. NumPy is optional: without it the cache
+is disabled.
+"""
+
+import logging
+import re
+import time
+import zlib
+from typing import Dict, FrozenSet, List, Optional
+from bot import metrics
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Size of the hashed feature space
+VECTOR_SIZE = 1024
+
+# Longer questions are usually specific enough that reusing an answer is risky
+MAX_QUESTION_CHARS = 300
+
+# Articles and fillers, which carry no meaning for matching questions
+STOP_WORDS = frozenset("a an the please just so um hey hi s".split())
+
+# Words a cached answer is specific to: FIRST programs, and anything with a
+# digit (numbers, years, rule ids like G301)
+PROGRAM_NAMES = frozenset("fll ftc frc vex".split())
+
+# Words that decide what is asked: question words, modals, pronouns and
+# requests to explain or compare
+INTENT_WORDS = frozenset(
+    "what how why when where which who whom whose can could should would will may might must "
+    "i me my mine we us our you your yours explain define compare".split()
+)
+
+# Ways of asking for a comparison, which are all the same key
+COMPARISON_WORDS = frozenset("compare comparison difference different vs versus".split())
+
+_WORD_RE = re.compile(r"[^\W_]+")
+_CONTRACTION_RE = re.compile(r"\b(what|how|where|who|when|why|that|there)'?s\b")
+
+
+def _tokens(text: str) -> List[str]:
+    return _WORD_RE.findall(_CONTRACTION_RE.sub(r"\1 is", text.casefold()))
+
+
+def _words(text: str) -> List[str]:
+    return [w for w in _tokens(text) if w not in STOP_WORDS]
+
+
+def question_features(text: str) -> List[str]:
+    """Split a question into word, ordered word pair and character trigram features."""
+    words = _words(text)
+    features = []
+    for word in words:
+        features.append(f"w:{word}")
+        padded = f"#{word}#"
+        features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    features.extend(f"p:{first} {second}" for first, second in zip(words, words[1:]))
+    return features
+
+
+def question_keys(text: str) -> FrozenSet[str]:
+    """Return the words of a question that a cached answer must match exactly."""
+    keys = set()
+    for word in _tokens(text):
+        if word in COMPARISON_WORDS:
+            keys.add("compare")
+        elif word in INTENT_WORDS or word in PROGRAM_NAMES or any(c.isdigit() for c in word):
+            keys.add(word)
+    return frozenset(keys)
+
+
+class FAQCache:
+    """In-process similarity index mapping questions to cached answers."""
+
+    def __init__(self, threshold: float, max_entries: int, ttl: float):
+        """
+        Args:
+            threshold: Minimum cosine similarity (0-1) for a cached answer to be reused
+            max_entries: Answers kept before the least recently used is evicted
+            ttl: Seconds after which a cached answer expires
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = np is not None and max_entries > 0
+
+        if np is None:
+            logger.warning("NumPy is not installed; the FAQ answer cache is disabled")
+
+        # Row i of the matrix is the unit vector of the question in slot i
+        self._vectors = np.zeros((max_entries, VECTOR_SIZE), dtype=np.float32) if self.enabled else None
+        self._questions: List[Optional[str]] = [None] * max_entries
+        self._keys: List[FrozenSet[str]] = [frozenset()] * max_entries
+        self._answers: List[Optional[str]] = [None] * max_entries
+        self._created = [0.0] * max_entries
+        self._last_used = [0.0] * max_entries
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return cache size and hit counters."""
+        return {"entries": self._size, "hits": self.hits, "misses": self.misses}
+
+    def _vectorize(self, text: str):
+        """Return the unit feature vector of a question, or None if it has no features."""
+        vector = np.zeros(VECTOR_SIZE, dtype=np.float32)
+        for feature in question_features(text):
+            vector[zlib.crc32(feature.encode("utf-8")) % VECTOR_SIZE] += 1.0
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return None
+        return vector / norm
+
+    def _cacheable(self, question: str) -> bool:
+        return self.enabled and len(question) <= MAX_QUESTION_CHARS
+
+    def _best_match(self, vector, keys: FrozenSet[str]):
+        """Return (slot, similarity) of the most similar cached question with the same keys."""
+        if not self._size:
+            return None, 0.0
+        scores = self._vectors[:self._size] @ vector
+        candidates = np.flatnonzero(scores >= self.threshold)
+        for slot in candidates[np.argsort(scores[candidates])[::-1]]:
+            slot = int(slot)
+            if self._keys[slot] == keys:
+                return slot, float(scores[slot])
+        return None, 0.0
+
+    def get(self, question: str) -> Optional[str]:
+        """Return the cached answer of a similar enough question, if any."""
+        if not self._cacheable(question):
+            return None
+        vector = self._vectorize(question)
+        if vector is None:
+            return None
+
+        slot, similarity = self._best_match(vector, question_keys(question))
+        now = time.time()
+        if slot is not None:
+            if now - self._created[slot] < self.ttl:
+                self.hits += 1
+                metrics.CACHE_LOOKUPS.inc(cache="faq", result="hit")
+                self._last_used[slot] = now
+                logger.debug(
+                    f"FAQ cache hit ({similarity:.2f}): '{question[:50]}' ~ '{self._questions[slot][:50]}'"
+                )
+                return self._answers[slot]
+            self._remove(slot)
+
+        self.misses += 1
+        metrics.CACHE_LOOKUPS.inc(cache="faq", result="miss")
+        return None
+
+    def put(self, question: str, answer: str):
+        """Cache the answer to a question, replacing the entry of a near-identical one."""
+        if not self._cacheable(question) or not answer:
+            return
+        vector = self._vectorize(question)
+        if vector is None:
+            return
+
+        keys = question_keys(question)
+        slot, _ = self._best_match(vector, keys)
+        if slot is None:
+            if self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+            else:
+                slot = min(range(self._size), key=self._last_used.__getitem__)
+
+        now = time.time()
+        self._vectors[slot] = vector
+        self._questions[slot] = question
+        self._keys[slot] = keys
+        self._answers[slot] = answer
+        self._created[slot] = now
+        self._last_used[slot] = now
+
+    def _remove(self, slot: int):
+        """Free a slot by moving the last entry into it."""
+        last = self._size - 1
+        if slot != last:
+            self._vectors[slot] = self._vectors[last]
+            for column in (self._questions, self._keys, self._answers, self._created, self._last_used):
+                column[slot] = column[last]
+        self._vectors[last] = 0.0
+        self._questions[last] = None
+        self._keys[last] = frozenset()
+        self._answers[last] = None
+        self._size = last
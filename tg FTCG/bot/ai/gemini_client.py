@@ -3,79 +3,226 @@ Google Gemini API client using the new google-genai SDK.
 Verified for Gemini 1.5+ and 2.0+ models.
 """
 
+import asyncio
+import importlib.util
 import logging
-from typing import List, Dict
-from google import genai
+import threading
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from bot.ai.context_cache import ContextCache
+from bot.ai.prompts import SYSTEM_PROMPT
+from bot.ai.provider import PooledProvider, Usage
+from bot.ai.tokens import get_history_budget, pack_history
 from bot.config import settings
 
 logger = logging.getLogger(__name__)
 
+# One SDK client (and connection pool) per API key, shared by every model
+_shared_clients: Dict[str, object] = {}
+_shared_clients_lock = threading.Lock()
 
-class GeminiClient:
+
+def _create_sdk_client(api_key: str):
+    """Create a google-genai client with the connection pool settings."""
+    from google import genai
+    from google.genai import types
+
+    if "async_client_args" not in types.HttpOptions.model_fields:
+        # Older SDKs don't accept transport options
+        return genai.Client(api_key=api_key)
+
+    http2 = settings.gemini_http2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP/2 for Gemini needs `pip install \"httpx[http2]\"`, using HTTP/1.1")
+        http2 = False
+
+    import httpx
+    limits = httpx.Limits(
+        max_connections=settings.gemini_pool_size,
+        max_keepalive_connections=settings.gemini_pool_size,
+        keepalive_expiry=settings.gemini_keepalive_expiry,
+    )
+    return genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(async_client_args={"limits": limits, "http2": http2}),
+    )
+
+
+def get_sdk_client(api_key: str):
+    """Return the shared google-genai client for an API key, creating it on first use."""
+    with _shared_clients_lock:
+        client = _shared_clients.get(api_key)
+        if client is None:
+            client = _shared_clients[api_key] = _create_sdk_client(api_key)
+        return client
+
+
+def _usage(usage_metadata) -> Usage:
+    """Convert Gemini usage metadata to token counts."""
+    if usage_metadata is None:
+        return None
+    return {
+        "prompt": usage_metadata.prompt_token_count,
+        "completion": usage_metadata.candidates_token_count,
+        "cached": getattr(usage_metadata, "cached_content_token_count", None),
+    }
+
+
+def _is_cache_error(error: Exception) -> bool:
+    """Return True if a call failed because its cached content is gone or unusable."""
+    return getattr(error, "code", None) in (400, 403, 404) and "cache" in str(error).lower()
+
+
+class GeminiClient(PooledProvider):
     """Wrapper for Google Gemini API using new SDK."""
-    
-    def __init__(self):
-        """Initialize the Gemini client."""
-        self.api_key = settings.gemini_api_key
-        # Initialize client with API key
-        self.client = genai.Client(api_key=self.api_key)
-        
-        # Use settings model or fallback to gemini-1.5-flash
-        self.model = settings.gemini_model if settings.gemini_model else "gemini-1.5-flash"
-        
+
+    name = "gemini"
+
+    def __init__(self, model: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        Initialize the Gemini client.
+
+        Args:
+            model: Model to use instead of settings.gemini_model
+            timeout: Per-call timeout instead of settings.gemini_request_timeout
+        """
+        # Use the given model, the settings model or fall back to gemini-1.5-flash
+        model = model or settings.gemini_model or "gemini-1.5-flash"
+
         # The new SDK typically expects models without "models/" prefix,
         # but handles verification dynamically. We strip it to be safe.
-        if self.model.startswith("models/"):
-            self.model = self.model.replace("models/", "")
-            
-        logger.info(f"Gemini client initialized with model: {self.model}")
-    
-    async def get_response(
+        if model.startswith("models/"):
+            model = model.replace("models/", "")
+
+        super().__init__(
+            model,
+            max_concurrency=settings.gemini_max_concurrency,
+            timeout=timeout or settings.gemini_request_timeout,
+            single_flight=settings.single_flight,
+            # All Gemini models and tiers share GEMINI_MAX_CONCURRENCY
+            pool="gemini"
+        )
+
+        self.api_key = settings.gemini_api_key
+        # The SDK takes most of the bot's import time, so it is loaded on first use
+        self._client = None
+
+        # Long system instructions are uploaded once and referred to by name
+        self.context_cache = ContextCache(
+            ttl=settings.gemini_context_cache_ttl,
+            min_tokens=settings.gemini_context_cache_min_tokens
+        ) if settings.gemini_context_cache else None
+
+        logger.info(
+            f"Gemini client initialized with model: {self.model} "
+            f"(max concurrency: {self.max_concurrency}, timeout: {self.timeout}s)"
+        )
+
+    @property
+    def client(self):
+        """The google-genai client, created (importing the SDK) on first use."""
+        if self._client is None:
+            self._client = get_sdk_client(self.api_key)
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    async def warm_up(self):
+        """Import the SDK and create the client in a worker thread."""
+        await self._get_client()
+
+    async def _get_client(self):
+        """Return the client without blocking the event loop while it is created."""
+        if self._client is None:
+            return await asyncio.to_thread(lambda: self.client)
+        return self._client
+
+    def get_stats(self) -> Dict[str, float]:
+        """Return request pool counters and context cache counters."""
+        stats = super().get_stats()
+        if self.context_cache is not None:
+            stats["context_cache"] = self.context_cache.get_stats()
+        return stats
+
+    def _build_request(
         self,
         user_message: str,
         conversation_history: List[Dict[str, str]] = None,
-        system_prompt: str = None
-    ) -> str:
-        """Get response from Gemini."""
+        system_prompt: str = None,
+        summary: str = None
+    ) -> Tuple[str, str]:
+        """
+        Return (system instruction, contents). The instruction is sent separately
+        so it can be cached; the summary, history and new message form the contents.
+        """
+        full_prompt = ""
+        if summary:
+            full_prompt += f"Summary of the earlier conversation: {summary}\n\n"
+
+        if conversation_history:
+            # Send as many recent turns as fit into this model's history budget
+            budget = get_history_budget(self.model)
+            for msg in pack_history(conversation_history, budget):
+                role = "User" if msg["role"] == "user" else "Model"
+                full_prompt += f"{role}: {msg['content']}\n"
+
+        full_prompt += f"User: {user_message}\nModel:"
+        return system_prompt or SYSTEM_PROMPT, full_prompt
+
+    async def _config(self, client, system_instruction: str, use_cache: bool = True):
+        """Return (generation config, name of the cached content it uses or None)."""
+        from google.genai import types
+
+        cache_name = None
+        if use_cache and self.context_cache is not None:
+            cache_name = await self.context_cache.get(client, self.model, system_instruction)
+        if cache_name:
+            return types.GenerateContentConfig(cached_content=cache_name), cache_name
+        return types.GenerateContentConfig(system_instruction=system_instruction), None
+
+    async def _call(self, method, request: Tuple[str, str]):
+        """Call an async SDK method, sending the instruction inline if its cache is gone."""
+        client = await self._get_client()
+        system_instruction, contents = request
+        config, cache_name = await self._config(client, system_instruction)
         try:
-            # Construct simplified prompt for chat
-            full_prompt = ""
-            if system_prompt:
-                # Add system prompt at the start
-                full_prompt += f"System Instructions: {system_prompt}\n\n"
-            
-            if conversation_history:
-                pass # For now, let's keep it simple and stateless to avoid errors
-                # But we can add history if needed:
-                for msg in conversation_history[-6:]:
-                    role = "User" if msg["role"] == "user" else "Model"
-                    full_prompt += f"{role}: {msg['content']}\n"
-            
-            full_prompt += f"User: {user_message}\nModel:"
-            
-            # Use the simple generate_content method
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=full_prompt
-            )
-            
-            if response.text:
-                return response.text
-            else:
-                return "I couldn't generate a text response."
-            
+            return await method(model=self.model, contents=contents, config=config)
         except Exception as e:
-            logger.error(f"Error calling Gemini API (google-genai): {e}")
-            return (
-                "Sorry, I'm having trouble connecting to my knowledge base right now. 😅\n"
-                "Please try again in a moment."
+            if cache_name is None or not _is_cache_error(e):
+                raise
+            logger.warning(f"Cached system instruction {cache_name} is unusable, sending it inline: {e}")
+            self.context_cache.invalidate(cache_name)
+            config, _ = await self._config(client, system_instruction, use_cache=False)
+            return await method(model=self.model, contents=contents, config=config)
+
+    async def _complete(self, request: Tuple[str, str]) -> Tuple[str, Usage]:
+        """Call the SDK without blocking the event loop."""
+        client = await self._get_client()
+        aio = getattr(client, "aio", None)
+        if aio is not None:
+            response = await self._call(aio.models.generate_content, request)
+        else:
+            # Older SDKs have no async client, so run the sync call in a worker thread
+            from google.genai import types
+            system_instruction, contents = request
+            response = await asyncio.to_thread(
+                client.models.generate_content,
+                model=self.model,
+                contents=contents,
+                config=types.GenerateContentConfig(system_instruction=system_instruction)
             )
-    
-    async def get_learning_response(
-        self,
-        topic_prompt: str,
-        user_question: str = None
-    ) -> str:
-        """Get learning content."""
-        message = user_question if user_question else "Please teach me about this topic."
-        return await self.get_response(user_message=message, system_prompt=topic_prompt)
+        return response.text, _usage(getattr(response, "usage_metadata", None))
+
+    async def _open_stream(self, request: Tuple[str, str]) -> Optional[AsyncIterator[Tuple[str, Usage]]]:
+        """Open a streaming generation, or return None if the SDK can't stream async."""
+        aio = getattr(await self._get_client(), "aio", None)
+        if aio is None:
+            return None
+        stream = await self._call(aio.models.generate_content_stream, request)
+        return self._chunks(stream)
+
+    @staticmethod
+    async def _chunks(stream) -> AsyncIterator[Tuple[str, Usage]]:
+        async for chunk in stream:
+            yield chunk.text, _usage(getattr(chunk, "usage_metadata", None))
@@ -0,0 +1,219 @@
+"""
+Cache for generated learning-path lessons.
+
+Lesson prompts never change, so each topic only needs to be generated once
+per model (topics may use different models, e.g. by level). Entries are
+warmed at startup, refreshed in the background when they get older than the
+TTL and can optionally be persisted to a JSON file.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+from bot import metrics
+from bot.ai.prompts import get_learning_path_prompt
+from bot.ai.provider import is_fallback_reply
+from bot.usage import usage_scope
+
+logger = logging.getLogger(__name__)
+
+LESSON_REQUEST = "Please teach me about this topic."
+
+
+class LessonCache:
+    """Stale-while-revalidate cache of lessons keyed by topic id and model."""
+
+    def __init__(
+        self,
+        ai_client,
+        topic_ids: Iterable[str],
+        ttl: float,
+        refresh_interval: float,
+        path: Optional[str] = None,
+        topic_clients: Optional[Mapping[str, object]] = None
+    ):
+        """
+        Args:
+            ai_client: Client used to generate lessons (must provide generate())
+            topic_ids: Topics that may be cached; other ids are generated uncached
+            ttl: Seconds after which a lesson is regenerated in the background
+            refresh_interval: Seconds between background refresh passes
+            path: Optional JSON file used to persist lessons across restarts
+            topic_clients: Clients to use instead of ai_client for specific topics
+        """
+        self.ai_client = ai_client
+        self.topic_clients = dict(topic_clients or {})
+        self.topic_ids = list(topic_ids)
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.path = Path(path) if path else None
+
+        # Format: {(topic_id, model): {"text": "...", "created": unix_time}}
+        self._entries: Dict[Tuple[str, str], Dict] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._refreshing = set()
+        self._task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+
+        self._load()
+
+    def _client(self, topic_id: str):
+        return self.topic_clients.get(topic_id, self.ai_client)
+
+    def _key(self, topic_id: str) -> Tuple[str, str]:
+        return (topic_id, self._client(topic_id).model)
+
+    def _is_fresh(self, entry: Dict) -> bool:
+        return time.time() - entry["created"] < self.ttl
+
+    def has_lesson(self, topic_id: str) -> bool:
+        """Return whether a lesson (fresh or stale) is cached, without counting a lookup."""
+        return self._key(topic_id) in self._entries
+
+    def get_cached(self, topic_id: str) -> Optional[str]:
+        """
+        Return a cached lesson without waiting on the API.
+        Stale lessons are still returned, and a background refresh is scheduled.
+        """
+        entry = self._entries.get(self._key(topic_id))
+        if entry is None:
+            return None
+
+        self.hits += 1
+        metrics.CACHE_LOOKUPS.inc(cache="lesson", result="hit")
+        if not self._is_fresh(entry):
+            self._schedule_refresh(topic_id)
+        return entry["text"]
+
+    async def get_lesson(self, topic_id: str) -> str:
+        """Return the lesson for a topic, generating it on a cache miss."""
+        cached = self.get_cached(topic_id)
+        if cached is not None:
+            return cached
+
+        self.misses += 1
+        metrics.CACHE_LOOKUPS.inc(cache="lesson", result="miss")
+        if topic_id not in self.topic_ids:
+            return await self._generate(topic_id)
+
+        # Concurrent misses for the same topic share one generation
+        lock = self._locks.setdefault(topic_id, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(self._key(topic_id))
+            if entry is not None:
+                return entry["text"]
+            return await self._refresh(topic_id)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Return cache size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def start(self):
+        """Warm the cache and keep refreshing it in a background task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background refresh task."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        """Regenerate missing or stale lessons, then repeat every refresh interval."""
+        while True:
+            for topic_id in self.topic_ids:
+                entry = self._entries.get(self._key(topic_id))
+                if entry is not None and self._is_fresh(entry):
+                    continue
+                try:
+                    await self._refresh(topic_id)
+                except Exception as e:
+                    logger.warning(f"Could not warm lesson '{topic_id}': {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def _schedule_refresh(self, topic_id: str):
+        """Regenerate a stale lesson without blocking the caller."""
+        if topic_id in self._refreshing:
+            return
+        self._refreshing.add(topic_id)
+
+        async def refresh():
+            try:
+                # Background work, not on behalf of the user who hit the stale entry
+                with usage_scope(user_id=None, chat_id=None):
+                    await self._refresh(topic_id)
+            except Exception as e:
+                logger.warning(f"Background refresh of lesson '{topic_id}' failed: {e}")
+            finally:
+                self._refreshing.discard(topic_id)
+
+        asyncio.create_task(refresh())
+
+    async def _generate(self, topic_id: str) -> str:
+        with usage_scope(feature="lesson", topic=topic_id):
+            return await self._client(topic_id).generate(
+                user_message=LESSON_REQUEST,
+                system_prompt=get_learning_path_prompt(topic_id)
+            )
+
+    async def _refresh(self, topic_id: str) -> str:
+        """
+        Generate a lesson and store it. Errors, and empty or blocked replies,
+        are raised so they are never cached; a previous lesson is kept.
+        """
+        text = await self._generate(topic_id)
+        if is_fallback_reply(text.strip()):
+            raise RuntimeError(f"Got no lesson text for '{topic_id}'")
+        self._entries[self._key(topic_id)] = {"text": text, "created": time.time()}
+        logger.info(f"Cached lesson '{topic_id}' for model {self._client(topic_id).model}")
+
+        if self.path:
+            try:
+                await asyncio.to_thread(self._save, self._snapshot())
+            except OSError as e:
+                logger.warning(f"Could not save lesson cache to {self.path}: {e}")
+        return text
+
+    def _load(self):
+        """Load persisted lessons, ignoring a missing or corrupt file."""
+        if not self.path or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            for key, entry in data.items():
+                if is_fallback_reply(entry.get("text", "")):
+                    continue
+                topic_id, model = key.split("|", 1)
+                self._entries[(topic_id, model)] = entry
+            logger.info(f"Loaded {len(self._entries)} cached lessons from {self.path}")
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable lesson cache {self.path}: {e}")
+
+    def _snapshot(self) -> Dict[str, Dict]:
+        return {f"{topic_id}|{model}": entry for (topic_id, model), entry in self._entries.items()}
+
+    def _save(self, data: Dict[str, Dict]):
+        """Write lessons to disk atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self.path)
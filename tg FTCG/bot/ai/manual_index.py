@@ -0,0 +1,194 @@
+"""
+Local BM25 retrieval index over the FTC game manual.
+
+The manual is split into short passages offline (see bot.ingest_manual) and
+stored as a compact set of NumPy arrays that are memory-mapped at startup.
+At question time only the few most relevant passages are added to the
+prompt, which keeps prompts small while grounding rule questions.
+"""
+
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Passage size in words, and words shared between neighbouring passages
+PASSAGE_WORDS = 180
+PASSAGE_OVERLAP = 30
+
+# Very common words that only add noise to a keyword search
+STOP_WORDS = frozenset(
+    "a about an and are as at be by can could do does for from how i if in is it me "
+    "my of on or please should that the their there this to us was we what when "
+    "which who why will with you your".split()
+)
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words and rule numbers (e.g. "g301"), without stop words."""
+    return [t for t in _TOKEN_RE.findall(text.casefold()) if t not in STOP_WORDS]
+
+
+def chunk_pages(pages: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """
+    Split (source, text) pages into overlapping passages of about PASSAGE_WORDS words.
+    Paragraphs are kept together where possible. Returns (source, passage) pairs.
+    """
+    passages = []
+    for source, text in pages:
+        words: List[str] = []
+        for paragraph in re.split(r"\n\s*\n", text):
+            paragraph_words = paragraph.split()
+            if words and len(words) + len(paragraph_words) > PASSAGE_WORDS:
+                passages.append((source, " ".join(words)))
+                words = words[-PASSAGE_OVERLAP:]
+            words.extend(paragraph_words)
+            # Split paragraphs that are longer than a passage on their own
+            while len(words) > PASSAGE_WORDS:
+                passages.append((source, " ".join(words[:PASSAGE_WORDS])))
+                words = words[PASSAGE_WORDS - PASSAGE_OVERLAP:]
+        if words:
+            passages.append((source, " ".join(words)))
+    return passages
+
+
+def build_index(passages: List[Tuple[str, str]], path: str):
+    """Build a BM25 index of (source, text) passages and write it to a directory."""
+    if np is None:
+        raise RuntimeError("NumPy is required to build the manual index")
+
+    vocabulary: Dict[str, int] = {}
+    postings: List[Dict[int, int]] = []
+    doc_lengths = []
+    for doc_id, (_, text) in enumerate(passages):
+        tokens = tokenize(text)
+        doc_lengths.append(len(tokens))
+        for token in tokens:
+            term_id = vocabulary.setdefault(token, len(vocabulary))
+            if term_id == len(postings):
+                postings.append({})
+            postings[term_id][doc_id] = postings[term_id].get(doc_id, 0) + 1
+
+    # Postings are stored in CSR form: the documents of term t are
+    # posting_docs[term_offsets[t]:term_offsets[t + 1]]
+    term_offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+    for term_id, docs in enumerate(postings):
+        term_offsets[term_id + 1] = term_offsets[term_id] + len(docs)
+    posting_docs = np.empty(term_offsets[-1], dtype=np.int32)
+    posting_freqs = np.empty(term_offsets[-1], dtype=np.float32)
+    for term_id, docs in enumerate(postings):
+        start = term_offsets[term_id]
+        posting_docs[start:start + len(docs)] = list(docs.keys())
+        posting_freqs[start:start + len(docs)] = list(docs.values())
+
+    n_docs = len(passages)
+    doc_freqs = np.diff(term_offsets).astype(np.float32)
+    idf = np.log(1 + (n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+
+    # Passage texts are kept in one UTF-8 blob, sliced by byte offsets
+    encoded = [text.encode("utf-8") for _, text in passages]
+    text_offsets = np.zeros(n_docs + 1, dtype=np.int64)
+    text_offsets[1:] = np.cumsum([len(e) for e in encoded])
+
+    out = Path(path)
+    out.mkdir(parents=True, exist_ok=True)
+    np.save(out / "term_offsets.npy", term_offsets)
+    np.save(out / "posting_docs.npy", posting_docs)
+    np.save(out / "posting_freqs.npy", posting_freqs)
+    np.save(out / "idf.npy", idf)
+    np.save(out / "doc_lengths.npy", np.array(doc_lengths, dtype=np.float32))
+    np.save(out / "text_offsets.npy", text_offsets)
+    (out / "passages.bin").write_bytes(b"".join(encoded))
+    with open(out / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "vocabulary": vocabulary,
+            "sources": [source for source, _ in passages],
+        }, f, ensure_ascii=False)
+
+    logger.info(f"Built manual index with {n_docs} passages and {len(vocabulary)} terms in {out}")
+
+
+class ManualIndex:
+    """Read-only BM25 index loaded with memory-mapped arrays."""
+
+    def __init__(self, path: str):
+        directory = Path(path)
+        with open(directory / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.vocabulary: Dict[str, int] = meta["vocabulary"]
+        self.sources: List[str] = meta["sources"]
+
+        def load(name):
+            return np.load(directory / f"{name}.npy", mmap_mode="r")
+
+        self.term_offsets = load("term_offsets")
+        self.posting_docs = load("posting_docs")
+        self.posting_freqs = load("posting_freqs")
+        self.idf = load("idf")
+        self.doc_lengths = np.array(load("doc_lengths"))
+        self.text_offsets = load("text_offsets")
+        self.texts = np.memmap(directory / "passages.bin", dtype=np.uint8, mode="r") \
+            if (directory / "passages.bin").stat().st_size else np.zeros(0, dtype=np.uint8)
+
+        self.avg_length = float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0
+        # Length normalization part of the BM25 denominator, per passage
+        self._norms = K1 * (1 - B + B * self.doc_lengths / (self.avg_length or 1.0))
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def passage(self, doc_id: int) -> str:
+        start, end = self.text_offsets[doc_id], self.text_offsets[doc_id + 1]
+        return bytes(self.texts[start:end]).decode("utf-8")
+
+    def search(self, query: str, top_k: int, min_score: float = 0.0) -> List[Dict]:
+        """Return up to top_k passages as {"source", "text", "score"}, best first."""
+        term_ids = {self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary}
+        if not term_ids or not len(self):
+            return []
+
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            docs = self.posting_docs[start:end]
+            freqs = self.posting_freqs[start:end]
+            scores[docs] += self.idf[term_id] * freqs * (K1 + 1) / (freqs + self._norms[docs])
+
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [
+            {"source": self.sources[i], "text": self.passage(i), "score": float(scores[i])}
+            for i in best
+            if scores[i] > min_score
+        ]
+
+
+def load_manual_index(path: str) -> Optional[ManualIndex]:
+    """Load the manual index if it has been built, otherwise return None."""
+    if not path or not (Path(path) / "meta.json").exists():
+        return None
+    if np is None:
+        logger.warning("NumPy is not installed; the game manual index is disabled")
+        return None
+    try:
+        index = ManualIndex(path)
+    except Exception as e:
+        logger.error(f"Could not load the manual index from {path}: {e}")
+        return None
+    logger.info(f"Loaded game manual index with {len(index)} passages from {path}")
+    return index
@@ -0,0 +1,91 @@
+"""
+Model tiers and the local classifier that picks one per request.
+
+Most questions beginners ask ("what is a servo?", "thanks!") are answered
+just as well by a lite model, which is faster and far cheaper, while code,
+multi-part and in-depth questions deserve a bigger model. The classifier
+only looks at the text and the conversation (length, keywords, code,
+number of questions, conversation depth), so it adds no latency.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+LITE = "lite"
+STANDARD = "standard"
+PRO = "pro"
+TIERS = (LITE, STANDARD, PRO)
+
+# Learning-path lessons are routed by their level
+LESSON_TIERS = {
+    "beginner": LITE,
+    "intermediate": STANDARD,
+    "advanced": PRO,
+}
+
+# Small talk that never needs more than the lite model
+_SMALL_TALK = re.compile(
+    r"^\s*(hi|hello|hey|yo|thanks|thank you|thx|ok|okay|cool|great|nice|got it|bye|good (morning|night))\b"
+    r"[\s!.,)(:😊🙏👍]*$",
+    re.IGNORECASE
+)
+
+# Code, formulas and stack traces. Only call syntax counts (method calls, empty
+# argument lists, statements), not prose like "motor(s)" or "FTC (2024)"
+_CODE = re.compile(
+    r"```|[{};]\s*$|\b(def|class|public|void|import|return)\b|Exception|Traceback"
+    r"|\b\w+(\.\w+)+\([^()\n]*\)|\b\w+\(\)|\b\w+\([^()\n]*\)\s*[;{]",
+    re.MULTILINE
+)
+
+# Topics whose answers need reasoning rather than recall
+_HARD_TOPICS = re.compile(
+    r"\b(autonomous|pid|odometry|kinematics?|localization|path ?planning|pathfinding|trajectory|"
+    r"roadrunner|pedro|vision|opencv|apriltags?|sensor fusion|feedforward|motion profil\w*|"
+    r"algorithm|state machine|debug\w*|error|crash\w*|exception|optimi[sz]\w*|calculat\w*|"
+    r"torque|gear ratio|current draw|compare|trade-?offs?|design|strategy|step by step|in detail)\b",
+    re.IGNORECASE
+)
+
+# Points at which a question moves up a tier
+_STANDARD_SCORE = 1
+_PRO_SCORE = 3
+
+
+def classify_question(
+    user_message: str,
+    conversation_history: Optional[List[Dict[str, str]]] = None,
+    summary: Optional[str] = None
+) -> str:
+    """Return the tier for a question, from the text and how deep the conversation is."""
+    if _SMALL_TALK.match(user_message):
+        return LITE
+
+    words = len(user_message.split())
+    score = 0
+    if words > 25:
+        score += 1
+    if words > 80:
+        score += 1
+    if _CODE.search(user_message):
+        score += 2
+    score += min(len(_HARD_TOPICS.findall(user_message)), 3)
+    if user_message.count("?") >= 2:
+        # Several questions in one message
+        score += 1
+
+    # Follow-ups deep into a conversation build on earlier answers
+    turns = len(conversation_history or []) // 2
+    if turns >= 3 or summary:
+        score += 1
+
+    if score >= _PRO_SCORE:
+        return PRO
+    if score >= _STANDARD_SCORE:
+        return STANDARD
+    return LITE
+
+
+def classify_lesson(level: str) -> str:
+    """Return the tier for lessons of a learning level."""
+    return LESSON_TIERS.get(level, STANDARD)
@@ -3,106 +3,106 @@ OpenAI API client for generating AI mentor responses.
 """
 
 import logging
-from typing import List, Dict
-from openai import AsyncOpenAI
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from bot.config import settings
 from bot.ai.prompts import SYSTEM_PROMPT
+from bot.ai.provider import PooledProvider, Usage
+from bot.ai.tokens import get_history_budget, pack_history
 
 logger = logging.getLogger(__name__)
 
 
-class OpenAIClient:
+def _usage(usage) -> Usage:
+    """Convert OpenAI usage to token counts."""
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt": usage.prompt_tokens,
+        "completion": usage.completion_tokens,
+        "cached": getattr(details, "cached_tokens", None),
+    }
+
+
+class OpenAIClient(PooledProvider):
     """Wrapper for OpenAI API with conversation context management."""
-    
-    def __init__(self):
-        """Initialize the OpenAI client with API key from settings."""
+
+    name = "openai"
+
+    def __init__(self, model: Optional[str] = None):
+        """
+        Initialize the OpenAI client with API key from settings.
+
+        Args:
+            model: Model to use instead of settings.openai_model
+        """
+        # The openai package is optional; it is only needed when this provider is enabled
+        try:
+            from openai import AsyncOpenAI
+        except ImportError:
+            raise RuntimeError("The openai package is not installed (pip install openai)")
+        if not settings.openai_api_key:
+            raise RuntimeError("OPENAI_API_KEY is not set")
+
+        super().__init__(
+            model or settings.openai_model,
+            max_concurrency=settings.openai_max_concurrency,
+            timeout=settings.openai_request_timeout,
+            single_flight=settings.single_flight,
+            pool="openai"
+        )
         self.client = AsyncOpenAI(api_key=settings.openai_api_key)
-        self.model = settings.openai_model
         logger.info(f"OpenAI client initialized with model: {self.model}")
-    
-    async def get_response(
+
+    def _build_request(
         self,
         user_message: str,
         conversation_history: List[Dict[str, str]] = None,
-        system_prompt: str = None
-    ) -> str:
-        """
-        Get a response from the AI mentor.
-        
-        Args:
-            user_message: The user's question or message
-            conversation_history: Previous messages in the conversation
-            system_prompt: Custom system prompt (uses default if not provided)
-        
-        Returns:
-            The AI mentor's response as a string
-        """
-        try:
-            # Use custom system prompt or default
-            prompt = system_prompt or SYSTEM_PROMPT
-            
-            # Build messages array
-            messages = [{"role": "system", "content": prompt}]
-            
-            # Add conversation history if provided
-            if conversation_history:
-                messages.extend(conversation_history)
-            
-            # Add current user message
-            messages.append({"role": "user", "content": user_message})
-            
-            # Log the request (without full content for privacy)
-            logger.info(f"Sending request to OpenAI (model: {self.model})")
-            
-            # Call OpenAI API
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.7,  # Balanced creativity and consistency
-                max_tokens=1000,  # Reasonable length for Telegram
-            )
-            
-            # Extract the response text
-            assistant_message = response.choices[0].message.content
-            
-            # Log token usage
-            logger.info(
-                f"OpenAI response received. "
-                f"Tokens used: {response.usage.total_tokens} "
-                f"(prompt: {response.usage.prompt_tokens}, "
-                f"completion: {response.usage.completion_tokens})"
-            )
-            
-            return assistant_message
-            
-        except Exception as e:
-            logger.error(f"Error calling OpenAI API: {e}")
-            return (
-                "Sorry, I'm having trouble connecting to my knowledge base right now. 😅\n\n"
-                "Please try again in a moment, or use /help to see what else you can do!"
+        system_prompt: str = None,
+        summary: str = None
+    ) -> List[Dict[str, str]]:
+        """Build the chat messages array."""
+        # Use custom system prompt or default
+        prompt = system_prompt or SYSTEM_PROMPT
+        if summary:
+            prompt += f"\n\nSummary of the earlier conversation: {summary}"
+        messages = [{"role": "system", "content": prompt}]
+
+        # Add as much recent history as fits into the budget
+        if conversation_history:
+            budget = get_history_budget(self.model)
+            messages.extend(
+                {"role": msg["role"], "content": msg["content"]}
+                for msg in pack_history(conversation_history, budget)
             )
-    
-    async def get_learning_response(
-        self,
-        topic_prompt: str,
-        user_question: str = None
-    ) -> str:
-        """
-        Get a response for a specific learning topic.
-        
-        Args:
-            topic_prompt: The system prompt for this learning topic
-            user_question: Optional follow-up question from the user
-        
-        Returns:
-            The AI mentor's response
-        """
-        if user_question:
-            message = user_question
-        else:
-            message = "Please teach me about this topic."
-        
-        return await self.get_response(
-            user_message=message,
-            system_prompt=topic_prompt
+
+        # Add current user message
+        messages.append({"role": "user", "content": user_message})
+        return messages
+
+    async def _complete(self, messages: List[Dict[str, str]]) -> Tuple[str, Usage]:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.7,  # Balanced creativity and consistency
+            max_tokens=1000,  # Reasonable length for Telegram
         )
+        return response.choices[0].message.content, _usage(response.usage)
+
+    async def _open_stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[Tuple[str, Usage]]:
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=1000,
+            stream=True,
+            # The final chunk then carries the token usage
+            stream_options={"include_usage": True},
+        )
+        return self._chunks(stream)
+
+    @staticmethod
+    async def _chunks(stream) -> AsyncIterator[Tuple[str, Usage]]:
+        async for chunk in stream:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            yield text or "", _usage(getattr(chunk, "usage", None))
@@ -2,6 +2,8 @@
 System prompts that define the AI mentor's personality and behavior.
 """
 
+from typing import Dict, List
+
 SYSTEM_PROMPT = """You are an AI mentor for FIRST Robotics beginners. Your goal is to help students grow into confident and skilled FIRST Robotics team members.
 
 YOUR ROLE & BEHAVIOR:
@@ -31,6 +33,35 @@ IMPORTANT RESOURCES:
 Remember: Your tone should always be supportive, motivating, and patient. You are here to build their confidence as much as their knowledge!"""
 
 
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a student and their FIRST Robotics AI mentor.
+
+Update the existing summary with the new conversation turns. Keep:
+- What the student is working on (program, robot, team role, current project)
+- Their experience level and how they like explanations
+- Topics already explained and open questions they still have
+
+Write in the third person, plain text, at most {max_words} words. Reply with the updated summary only."""
+
+
+MANUAL_PROMPT = """Excerpts from the official FTC game manual that may be relevant to the question below:
+
+{passages}
+
+If the question is about the game or its rules, base your answer on these excerpts and mention the rule numbers or pages you used. If the excerpts don't cover it, say so and point to the full manual: https://ftc-resources.firstinspires.org/ftc/game/manual
+
+Question: {question}"""
+
+
+def get_manual_prompt(passages: List[Dict], question: str) -> str:
+    """
+    Build the message that grounds an answer in game manual passages. It is sent
+    in place of the question, so the mentor system prompt stays in place (and
+    stays the same for every request, which lets it be cached).
+    """
+    excerpts = "\n\n".join(f"[{p['source']}] {p['text']}" for p in passages)
+    return MANUAL_PROMPT.format(passages=excerpts, question=question)
+
+
 def get_learning_path_prompt(topic: str) -> str:
     """Generate a focused prompt for specific learning topics."""
     
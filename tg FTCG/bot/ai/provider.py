@@ -0,0 +1,505 @@
+"""
+Common interface for LLM providers.
+
+LLMProvider defines what the handlers rely on: generate() and stream(),
+which raise on errors, and get_response(), stream_response() and
+get_learning_response(), which turn errors into a friendly message.
+
+PooledProvider adds the pieces every API-backed provider shares: a bounded
+request pool with timeouts, retries with backoff, a circuit breaker,
+single-flight coalescing and metrics. Concrete providers only build their
+request and make the raw API calls.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from bot import metrics
+from bot.ai.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, is_retryable
+from bot.ai.singleflight import SingleFlight, request_key
+from bot.ai.tokens import estimate_cost
+from bot.config import settings
+from bot.usage import get_usage_tracker
+
+logger = logging.getLogger(__name__)
+
+# Texts sent to the user instead of a generated answer
+FALLBACK_REPLY = (
+    "Sorry, I'm having trouble connecting to my knowledge base right now. 😅\n"
+    "Please try again in a moment."
+)
+EMPTY_REPLY = "I couldn't generate a text response."
+
+# Token usage of a call, as {"prompt": n, "completion": n, "cached": n}
+Usage = Optional[Dict[str, int]]
+
+
+# Request slots shared by all providers of one API, e.g. every Gemini model and
+# tier, so the API's concurrency limit holds for the whole process.
+# Format: {pool name: (event loop, semaphore)}
+_shared_pools: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+
+
+def _shared_semaphore(pool: str, size: int) -> asyncio.Semaphore:
+    """Return the semaphore of a shared request pool, bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    entry = _shared_pools.get(pool)
+    if entry is None or entry[0] is not loop:
+        entry = _shared_pools[pool] = (loop, asyncio.Semaphore(size))
+    return entry[1]
+
+
+def is_fallback_reply(text: str) -> bool:
+    """Return True if a reply is (or ends with) an error text rather than a real answer."""
+    return not text or text == EMPTY_REPLY or text.endswith(FALLBACK_REPLY)
+
+
+class LLMProvider:
+    """Interface of an LLM backend, with error handling for user-facing replies."""
+
+    # Short name used in logs, e.g. "gemini"
+    name = "llm"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return request counters."""
+        return {}
+
+    async def warm_up(self):
+        """Load what the first request would otherwise wait for (e.g. the SDK)."""
+
+    async def generate(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]] = None,
+        system_prompt: str = None,
+        summary: str = None
+    ) -> str:
+        """Generate a complete answer. Errors and timeouts are raised to the caller."""
+        raise NotImplementedError
+
+    def stream(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]] = None,
+        system_prompt: str = None,
+        summary: str = None
+    ) -> AsyncIterator[str]:
+        """Stream an answer as text chunks. Errors and timeouts are raised to the caller."""
+        raise NotImplementedError
+
+    async def get_response(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]] = None,
+        system_prompt: str = None,
+        summary: str = None
+    ) -> str:
+        """Get a response, or a friendly message if the API call fails."""
+        try:
+            return await self.generate(
+                user_message=user_message,
+                conversation_history=conversation_history,
+                system_prompt=system_prompt,
+                summary=summary
+            )
+
+        except asyncio.TimeoutError:
+            logger.error(f"{self.name} API call timed out")
+            return FALLBACK_REPLY
+        except Exception as e:
+            logger.error(f"Error calling {self.name} API: {e}")
+            return FALLBACK_REPLY
+
+    async def stream_response(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]] = None,
+        system_prompt: str = None,
+        summary: str = None
+    ) -> AsyncIterator[str]:
+        """Stream response chunks, ending with a friendly message on errors."""
+        produced = False
+        chunks = self.stream(
+            user_message=user_message,
+            conversation_history=conversation_history,
+            system_prompt=system_prompt,
+            summary=summary
+        )
+        try:
+            async for chunk in chunks:
+                produced = True
+                yield chunk
+
+        except asyncio.TimeoutError:
+            logger.error(f"{self.name} streaming call timed out")
+        except Exception as e:
+            logger.error(f"Error streaming from {self.name} API: {e}")
+        else:
+            if not produced:
+                yield EMPTY_REPLY
+            return
+        finally:
+            await chunks.aclose()
+
+        yield ("\n\n" if produced else "") + FALLBACK_REPLY
+
+    async def get_learning_response(
+        self,
+        topic_prompt: str,
+        user_question: str = None
+    ) -> str:
+        """Get learning content."""
+        message = user_question if user_question else "Please teach me about this topic."
+        return await self.get_response(user_message=message, system_prompt=topic_prompt)
+
+
+class PooledProvider(LLMProvider):
+    """
+    Base class for API-backed providers.
+
+    Subclasses implement _build_request(), _complete() and _open_stream();
+    this class runs them through the request pool with timeouts, retries
+    transient errors, fails fast while the circuit breaker is open,
+    coalesces identical concurrent requests and records metrics.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_concurrency: int,
+        timeout: float,
+        single_flight: bool = True,
+        pool: Optional[str] = None
+    ):
+        super().__init__(model)
+        # Concurrency limit and per-call timeout for API requests
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        # Providers with the same pool name share max_concurrency slots; None gives this one its own
+        self.pool = pool
+
+        # The semaphore is created lazily so it binds to the running event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        self._waiting = 0
+        self._requests = 0
+        self._timeouts = 0
+        self._errors = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+
+        # Identical concurrent requests share one API call
+        self._single_flight = SingleFlight() if single_flight else None
+
+        # Transient errors are retried; repeated failures open the circuit
+        self.retry_policy = RetryPolicy(
+            max_retries=settings.llm_max_retries,
+            base_delay=settings.llm_retry_base_delay,
+            max_delay=settings.llm_retry_max_delay
+        )
+        self.breaker = CircuitBreaker(
+            f"{self.name}:{model}",
+            failure_threshold=settings.circuit_failure_threshold,
+            recovery_time=settings.circuit_recovery_time
+        )
+        self._retries = 0
+        self._rejected = 0
+        self._cost = 0.0
+
+    def get_stats(self) -> Dict[str, float]:
+        """Return request pool counters and queue-wait metrics."""
+        return {
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "requests": self._requests,
+            "timeouts": self._timeouts,
+            "errors": self._errors,
+            "queue_wait_avg": self._queue_wait_total / self._requests if self._requests else 0.0,
+            "queue_wait_max": self._queue_wait_max,
+            "coalesced": self._single_flight.coalesced if self._single_flight else 0,
+            "retries": self._retries,
+            "rejected": self._rejected,
+            "circuit": self.breaker.state,
+            "cost_usd": round(self._cost, 6),
+        }
+
+    # Provider-specific parts ----------------------------------------------
+
+    def _build_request(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        system_prompt: Optional[str],
+        summary: Optional[str]
+    ) -> Any:
+        """Turn a question and its context into the provider's request payload."""
+        raise NotImplementedError
+
+    async def _complete(self, request: Any) -> Tuple[str, Usage]:
+        """Make one non-streaming API call. Returns (text, usage)."""
+        raise NotImplementedError
+
+    async def _open_stream(self, request: Any) -> Optional[AsyncIterator[Tuple[str, Usage]]]:
+        """Open a streaming API call yielding (text, usage) chunks, or return None if unsupported."""
+        return None
+
+    # Request pool -----------------------------------------------------------
+
+    async def _acquire_slot(self):
+        """Wait for a free slot in the request pool, recording queue wait time."""
+        if self._semaphore is None:
+            if self.pool:
+                self._semaphore = _shared_semaphore(self.pool, self.max_concurrency)
+            else:
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self._waiting += 1
+        metrics.LLM_WAITING.inc()
+        started = time.monotonic()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+            metrics.LLM_WAITING.dec()
+
+        waited = time.monotonic() - started
+        self._requests += 1
+        self._queue_wait_total += waited
+        self._queue_wait_max = max(self._queue_wait_max, waited)
+        self._in_flight += 1
+        metrics.LLM_QUEUE_WAIT.observe(waited)
+        metrics.LLM_IN_FLIGHT.inc()
+        if waited > 1.0:
+            logger.info(f"{self.name} request waited {waited:.2f}s for a free slot")
+
+    def _release_slot(self):
+        """Return a slot to the request pool."""
+        self._in_flight -= 1
+        metrics.LLM_IN_FLIGHT.dec()
+        self._semaphore.release()
+
+    # Retries and circuit breaker -------------------------------------------
+
+    def _check_circuit(self):
+        """Raise CircuitOpenError right away if the provider is known to be failing."""
+        if not self.breaker.allow():
+            self._rejected += 1
+            metrics.LLM_REQUEST_LATENCY.observe(0.0, model=self.model, outcome="rejected")
+            raise CircuitOpenError(f"{self.name} ({self.model}) is unavailable, circuit open")
+
+    def _on_failure(
+        self,
+        error: Exception,
+        attempt: int,
+        deadline: float,
+        can_retry: bool = True
+    ) -> Optional[float]:
+        """
+        Record a failed attempt. Returns the delay before retrying, or None to
+        give up (also when the retry couldn't start before the deadline).
+        """
+        # Only transient failures say something about the provider's health
+        if is_retryable(error):
+            self.breaker.record_failure()
+        self._update_circuit_metric()
+
+        delay = self.retry_policy.delay(error, attempt) if can_retry else None
+        if delay is not None and time.monotonic() + delay >= deadline:
+            logger.warning(f"{self.name} call failed ({error!r}), no time left to retry")
+            delay = None
+        if delay is not None:
+            self._retries += 1
+            metrics.LLM_RETRIES.inc(model=self.model)
+            logger.warning(
+                f"{self.name} call failed ({error!r}), retry {attempt + 1} in {delay:.2f}s"
+            )
+        return delay
+
+    def _on_success(self):
+        self.breaker.record_success()
+        self._update_circuit_metric()
+
+    def _update_circuit_metric(self):
+        state = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+        metrics.LLM_CIRCUIT_STATE.set(state[self.breaker.state], model=self.model)
+
+    def _record_call(self, started: float, outcome: str, usage: Usage = None):
+        """Record latency, token usage and cost of a finished API call."""
+        metrics.LLM_REQUEST_LATENCY.observe(
+            time.monotonic() - started, model=self.model, outcome=outcome
+        )
+        for kind, count in (usage or {}).items():
+            if count:
+                metrics.LLM_TOKENS.inc(count, model=self.model, kind=kind)
+        cost = estimate_cost(self.model, usage)
+        if cost:
+            self._cost += cost
+            metrics.LLM_COST.inc(cost, model=self.model)
+        get_usage_tracker().record(self.model, usage, cost)
+
+    # Public API -------------------------------------------------------------
+
+    async def generate(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]] = None,
+        system_prompt: str = None,
+        summary: str = None
+    ) -> str:
+        """
+        Generate a response.
+
+        Unlike get_response, errors and timeouts are raised to the caller.
+        """
+        request = self._build_request(user_message, conversation_history, system_prompt, summary)
+        if self._single_flight is None:
+            return await self._generate_request(request)
+
+        key = request_key(self.model, system_prompt, user_message, conversation_history, summary)
+        return await self._single_flight.run(key, lambda: self._generate_request(request))
+
+    async def _generate_request(self, request: Any) -> str:
+        """
+        Make a non-streaming API call, retrying transient errors. The timeout
+        covers all attempts, so a retry only gets the time that is left.
+        """
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            self._check_circuit()
+            try:
+                text = await self._generate_once(request, deadline)
+            except Exception as e:
+                delay = self._on_failure(e, attempt, deadline)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self._on_success()
+            return text
+
+    async def _generate_once(self, request: Any, deadline: float) -> str:
+        """Make one non-streaming API call through the request pool, ending by the deadline."""
+        await self._acquire_slot()
+        started = time.monotonic()
+        try:
+            remaining = max(deadline - started, 0.001)
+            text, usage = await asyncio.wait_for(self._complete(request), timeout=remaining)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            self._record_call(started, "timeout")
+            raise
+        except Exception:
+            self._errors += 1
+            self._record_call(started, "error")
+            raise
+        finally:
+            self._release_slot()
+
+        self._record_call(started, "ok", usage)
+        return text or EMPTY_REPLY
+
+    async def stream(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]] = None,
+        system_prompt: str = None,
+        summary: str = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a response as text chunks.
+
+        The timeout applies to the whole generation, retries included. Errors
+        are raised to the caller.
+        """
+        request = self._build_request(user_message, conversation_history, system_prompt, summary)
+        if self._single_flight is None:
+            chunks = self._stream_request(request)
+        else:
+            key = request_key(self.model, system_prompt, user_message, conversation_history, summary)
+            chunks = self._single_flight.stream(key, lambda: self._stream_request(request))
+
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    async def _stream_request(self, request: Any) -> AsyncIterator[str]:
+        """
+        Make a streaming API call, retrying transient errors until the first
+        chunk arrives. The timeout covers all attempts.
+        """
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            self._check_circuit()
+            produced = False
+            chunks = self._stream_once(request, deadline)
+            try:
+                async for text in chunks:
+                    produced = True
+                    yield text
+            except Exception as e:
+                # Once text has been shown, a retry would repeat it
+                delay = self._on_failure(e, attempt, deadline, can_retry=not produced)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            finally:
+                await chunks.aclose()
+            self._on_success()
+            return
+
+    async def _stream_once(self, request: Any, deadline: float) -> AsyncIterator[str]:
+        """Make one streaming API call through the request pool, ending by the deadline."""
+        await self._acquire_slot()
+        started = time.monotonic()
+        # Streams closed early by the consumer are recorded as cancelled
+        outcome = "cancelled"
+        usage = None
+        try:
+            remaining = max(deadline - started, 0.001)
+            stream = await asyncio.wait_for(self._open_stream(request), timeout=remaining)
+
+            if stream is None:
+                # No streaming support: deliver the full answer as a single chunk
+                remaining = max(deadline - time.monotonic(), 0.001)
+                text, usage = await asyncio.wait_for(self._complete(request), timeout=remaining)
+                outcome = "ok"
+                if text:
+                    yield text
+                return
+
+            iterator = stream.__aiter__()
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                try:
+                    text, chunk_usage = await asyncio.wait_for(iterator.__anext__(), timeout=remaining)
+                except StopAsyncIteration:
+                    break
+                # The last chunk carries the usage totals for the whole response
+                usage = chunk_usage or usage
+                if text:
+                    yield text
+            outcome = "ok"
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            outcome = "timeout"
+            raise
+        except Exception:
+            self._errors += 1
+            outcome = "error"
+            raise
+        finally:
+            self._record_call(started, outcome, usage)
+            self._release_slot()
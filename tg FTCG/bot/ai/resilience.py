@@ -0,0 +1,192 @@
+"""
+Circuit breaker and retry policy for LLM API calls.
+
+Errors are classified as transient (rate limits, server errors, timeouts,
+connection problems) or permanent (bad requests, auth errors). Transient
+errors are retried with jittered exponential backoff, honoring retry-after
+hints from the API. Repeated transient failures open a circuit breaker so
+later calls fail in milliseconds instead of waiting for another timeout,
+and a few probe calls are let through after a cool-down to detect recovery.
+"""
+
+import asyncio
+import logging
+import random
+import re
+import time
+from typing import Any, Optional
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# HTTP status codes worth retrying
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an API whose circuit breaker is open."""
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """Return the HTTP status code of an SDK error, if it has one."""
+    for attribute in ("code", "status_code"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Return True for errors that are likely to go away when retried."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    if httpx is not None and isinstance(error, httpx.TransportError):
+        return True
+    return error_status(error) in RETRYABLE_STATUS_CODES
+
+
+def _find_retry_delay(details: Any) -> Optional[str]:
+    """Find the "retryDelay" of a Google RetryInfo entry in an error body."""
+    if isinstance(details, dict):
+        if "retryDelay" in details:
+            return str(details["retryDelay"])
+        values = details.values()
+    elif isinstance(details, list):
+        values = details
+    else:
+        return None
+    for value in values:
+        found = _find_retry_delay(value)
+        if found is not None:
+            return found
+    return None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Return the delay (seconds) the API asked for before retrying, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                pass  # HTTP dates are rare here; fall back to backoff
+
+    # Gemini reports the delay in the error body, e.g. "retryDelay": "17s"
+    delay = _find_retry_delay(getattr(error, "details", None))
+    if delay:
+        match = re.match(r"\s*([\d.]+)\s*s", delay)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class RetryPolicy:
+    """Decides whether and how long to wait before retrying a failed call."""
+
+    def __init__(self, max_retries: int, base_delay: float, max_delay: float):
+        """
+        Args:
+            max_retries: Retries after the first attempt
+            base_delay: Backoff before the first retry (doubles each time)
+            max_delay: Longest wait; calls asked to wait longer are not retried
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, error: BaseException, attempt: int) -> Optional[float]:
+        """Return the seconds to wait before retry number attempt + 1, or None to give up."""
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+
+        hinted = retry_after(error)
+        if hinted is not None:
+            if hinted > self.max_delay:
+                return None
+            # A little jitter so clients told the same delay don't return together
+            return hinted + random.uniform(0, self.base_delay)
+
+        # "Full jitter" exponential backoff
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit breaker counting consecutive failures."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        recovery_time: float,
+        half_open_probes: int = 1
+    ):
+        """
+        Args:
+            name: Name used in logs, e.g. the provider and model
+            failure_threshold: Consecutive failures that open the circuit (0 disables it)
+            recovery_time: Seconds the circuit stays open before probing
+            half_open_probes: Calls let through at the same time while probing
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.half_open_probes = half_open_probes
+
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+    def allow(self) -> bool:
+        """Return whether a call may go ahead, counting it as a probe when half-open."""
+        if not self.failure_threshold or self.state == self.CLOSED:
+            return True
+
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now - self._opened_at < self.recovery_time:
+                return False
+            self.state = self.HALF_OPEN
+            self._probes = 0
+            self._opened_at = now
+        elif now - self._opened_at >= self.recovery_time:
+            # Probes that never reported back (e.g. were cancelled) don't block probing forever
+            self._probes = 0
+            self._opened_at = now
+
+        if self._probes >= self.half_open_probes:
+            return False
+        self._probes += 1
+        return True
+
+    def record_success(self):
+        self._failures = 0
+        if self.state == self.HALF_OPEN:
+            self.state = self.CLOSED
+            logger.info(f"Circuit for {self.name} closed again after a successful probe")
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == self.HALF_OPEN or (
+            self.failure_threshold and self.state == self.CLOSED
+            and self._failures >= self.failure_threshold
+        ):
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            logger.warning(
+                f"Circuit for {self.name} opened after {self._failures} consecutive failures; "
+                f"failing fast for {self.recovery_time}s"
+            )
@@ -0,0 +1,267 @@
+"""
+Routing of LLM requests across providers with failover and hedging.
+
+The router tries providers in order. When a call fails it fails over to the
+next provider. With hedging enabled, a request that has not produced an
+answer (or, for streams, its first chunk) within hedge_after seconds is
+also sent to the next provider, and whichever answers first wins. This
+keeps tail latency bounded when one provider slows down.
+
+With model routing there is one router per model tier (see model_tiers):
+the lite and pro tiers try their own Gemini model first and fail over to
+the standard tier's providers.
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from bot import metrics
+from bot.ai.gemini_client import GeminiClient
+from bot.ai.model_tiers import LITE, PRO, STANDARD
+from bot.ai.openai_client import OpenAIClient
+from bot.ai.provider import LLMProvider
+from bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMRouter(LLMProvider):
+    """LLM provider that spreads requests over several providers."""
+
+    name = "LLM"
+
+    def __init__(self, providers: List[LLMProvider], hedge_after: float = 0.0):
+        """
+        Args:
+            providers: Providers in order of preference (at least one)
+            hedge_after: Seconds before a slow request is raced against the next
+                provider; 0 disables hedging
+        """
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        super().__init__(providers[0].model)
+        self.providers = providers
+        self.hedge_after = hedge_after
+
+        self.failovers = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return routing counters and the stats of each provider."""
+        return {
+            "failovers": self.failovers,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "providers": {
+                f"{p.name}:{p.model}": p.get_stats() for p in self.providers
+            },
+        }
+
+    async def warm_up(self):
+        """Warm up every provider, logging (not raising) failures."""
+        results = await asyncio.gather(
+            *(provider.warm_up() for provider in self.providers), return_exceptions=True
+        )
+        for provider, result in zip(self.providers, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Could not warm up {provider.name} ({provider.model}): {result!r}")
+
+    async def generate(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]] = None,
+        system_prompt: str = None,
+        summary: str = None
+    ) -> str:
+        """Generate an answer with the first provider that succeeds. Errors are raised."""
+        async def attempt(provider: LLMProvider) -> str:
+            return await provider.generate(
+                user_message=user_message,
+                conversation_history=conversation_history,
+                system_prompt=system_prompt,
+                summary=summary
+            )
+
+        _, text = await self._race(attempt)
+        return text
+
+    async def stream(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]] = None,
+        system_prompt: str = None,
+        summary: str = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream an answer from the first provider to produce a chunk.
+
+        Failover and hedging apply until the first chunk arrives; errors after
+        that are raised, since part of the answer has already been shown.
+        """
+        async def attempt(provider: LLMProvider) -> Tuple[AsyncIterator[str], Optional[str]]:
+            chunks = provider.stream(
+                user_message=user_message,
+                conversation_history=conversation_history,
+                system_prompt=system_prompt,
+                summary=summary
+            )
+            try:
+                return chunks, await chunks.__anext__()
+            except StopAsyncIteration:
+                return chunks, None
+            except BaseException:
+                await chunks.aclose()
+                raise
+
+        async def discard(result: Tuple[AsyncIterator[str], Optional[str]]):
+            await result[0].aclose()
+
+        _, (chunks, first) = await self._race(attempt, discard)
+        try:
+            if first is None:
+                return
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    async def _race(
+        self,
+        attempt: Callable[[LLMProvider], Awaitable[Any]],
+        discard: Optional[Callable[[Any], Awaitable[None]]] = None
+    ) -> Tuple[LLMProvider, Any]:
+        """
+        Run attempt(provider) with failover and hedging.
+        Returns the first successful (provider, result); raises the last error if all fail.
+        discard() releases results of attempts that finished but lost the race.
+        """
+        remaining = iter(self.providers)
+        running: Dict[asyncio.Task, LLMProvider] = {}
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        def launch() -> bool:
+            provider = next(remaining, None)
+            if provider is None:
+                return False
+            running[asyncio.create_task(attempt(provider))] = provider
+            return True
+
+        launch()
+        try:
+            while running:
+                can_hedge = self.hedge_after > 0 and not hedged and len(self.providers) > 1
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=self.hedge_after if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    # The request is slow: race it against the next provider
+                    hedged = True
+                    if launch():
+                        self.hedges += 1
+                        metrics.LLM_HEDGES.inc()
+                        logger.info(f"Hedging slow request after {self.hedge_after}s")
+                    continue
+
+                winner = None
+                for task in done:
+                    provider = running.pop(task)
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        logger.warning(f"{provider.name} ({provider.model}) request failed: {last_error!r}")
+                    elif winner is None:
+                        winner = (provider, task.result())
+                    elif discard is not None:
+                        await discard(task.result())
+
+                if winner is not None:
+                    if hedged and winner[0] is not self.providers[0]:
+                        self.hedge_wins += 1
+                    metrics.LLM_ANSWERS.inc(provider=winner[0].name, model=winner[0].model)
+                    return winner
+
+                if not running:
+                    # Every request in flight failed: fail over to the next provider
+                    if not launch():
+                        break
+                    self.failovers += 1
+                    metrics.LLM_FAILOVERS.inc()
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                results = await asyncio.gather(*running, return_exceptions=True)
+                if discard is not None:
+                    for result in results:
+                        if not isinstance(result, BaseException):
+                            await discard(result)
+
+        raise last_error
+
+
+def create_llm_router() -> LLMRouter:
+    """Create the providers listed in settings.llm_providers behind a router."""
+    factories = {"gemini": GeminiClient, "openai": OpenAIClient}
+    providers = []
+    for spec in settings.llm_providers:
+        # Each entry is "provider" or "provider:model"
+        name, _, model = spec.partition(":")
+        factory = factories.get(name.strip().lower())
+        if factory is None:
+            logger.warning(f"Unknown LLM provider '{name}' in LLM_PROVIDERS, skipping it")
+            continue
+        try:
+            providers.append(factory(model.strip() or None))
+        except Exception as e:
+            logger.warning(f"Could not initialize LLM provider '{spec}': {e}")
+
+    if not providers:
+        logger.warning("No usable LLM provider configured, falling back to Gemini")
+        providers.append(GeminiClient())
+
+    logger.info(
+        "LLM providers: " + ", ".join(f"{p.name}:{p.model}" for p in providers)
+        + (f" (hedging after {settings.llm_hedge_after}s)" if settings.llm_hedge_after else "")
+    )
+    return LLMRouter(providers, hedge_after=settings.llm_hedge_after)
+
+
+def create_tier_router(tier: str, standard: LLMRouter) -> LLMRouter:
+    """
+    Create the router of the lite or pro tier: its Gemini model first, then
+    the standard tier's providers. Returns standard itself if routing is off
+    or the tier uses the standard model.
+    """
+    model, timeout = {
+        LITE: (settings.gemini_lite_model, settings.gemini_lite_timeout),
+        PRO: (settings.gemini_pro_model, settings.gemini_pro_timeout),
+    }.get(tier, (None, None))
+    if not settings.model_routing or not model or model == standard.model:
+        return standard
+
+    router = LLMRouter(
+        [GeminiClient(model, timeout=timeout)] + standard.providers,
+        hedge_after=settings.llm_hedge_after
+    )
+    logger.info(f"LLM {tier} tier: gemini:{model} (timeout {router.providers[0].timeout}s)")
+    return router
+
+
+_shared_routers: Dict[str, LLMRouter] = {}
+
+
+def get_llm_router(tier: str = STANDARD) -> LLMRouter:
+    """Return the router of a model tier shared by the whole process, creating it on first use."""
+    router = _shared_routers.get(tier)
+    if router is None:
+        if tier == STANDARD:
+            router = create_llm_router()
+        else:
+            router = create_tier_router(tier, get_llm_router(STANDARD))
+        _shared_routers[tier] = router
+    return router
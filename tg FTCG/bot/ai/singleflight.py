@@ -0,0 +1,169 @@
+"""
+Single-flight coalescing of identical in-flight LLM requests.
+
+When many users ask the same thing at the same moment (a whole team tapping
+the same lesson, or a popular question), only the first request calls the
+API. Everyone else waits for, and shares, that one generation.
+"""
+
+import asyncio
+import hashlib
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from bot import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_message(text: str) -> str:
+    """Normalize a user message so trivially different spellings share a key."""
+    return " ".join(text.split()).casefold()
+
+
+def request_key(
+    model: str,
+    system_prompt: Optional[str],
+    user_message: str,
+    conversation_history: Optional[List[Dict[str, str]]] = None,
+    summary: Optional[str] = None
+) -> str:
+    """Build the coalescing key of a request from everything that shapes the answer."""
+    parts = [model, system_prompt or "", summary or ""]
+    for msg in conversation_history or []:
+        parts.append(f"{msg['role']}:{msg['content']}")
+    parts.append(normalize_message(user_message))
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+class _Call:
+    """One shared generation and the callers waiting for it."""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        # Streamed calls buffer their chunks so late joiners can replay them
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._updated = asyncio.Event()
+
+    def notify(self):
+        """Wake up everyone waiting for the next chunk."""
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def wait_for_update(self):
+        await self._updated.wait()
+
+
+class SingleFlight:
+    """Shares one in-flight call among all concurrent callers with the same key."""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _Call] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return counters of started and coalesced calls."""
+        return {
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls) + len(self._streams),
+        }
+
+    def _join(self, calls: Dict[str, _Call], key: str, kind: str):
+        """Return the in-flight call for a key and whether this caller started it."""
+        call = calls.get(key)
+        if call is not None:
+            self.coalesced += 1
+            metrics.LLM_COALESCED.inc(kind=kind)
+            logger.debug(f"Coalesced {kind} request into an in-flight call")
+            return call, False
+        call = calls[key] = _Call()
+        self.started += 1
+        return call, True
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[str]]) -> str:
+        """
+        Return the result of factory(), sharing it with concurrent callers of the same key.
+
+        The call runs in its own task, so a caller that gives up doesn't cancel
+        it for the others; it is only cancelled once every caller has left.
+        """
+        call, leader = self._join(self._calls, key, "generate")
+        if leader:
+            call.task = asyncio.create_task(factory())
+            call.task.add_done_callback(lambda _: self._forget(self._calls, key, call))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                self._abandon(self._calls, key, call)
+
+    async def stream(
+        self,
+        key: str,
+        factory: Callable[[], AsyncIterator[str]]
+    ) -> AsyncIterator[str]:
+        """
+        Yield the chunks of factory(), sharing one stream with concurrent callers.
+
+        Callers joining mid-stream first get the chunks produced so far. Errors
+        are raised to every caller.
+        """
+        call, leader = self._join(self._streams, key, "stream")
+        if leader:
+            call.task = asyncio.create_task(self._pump(key, call, factory))
+
+        call.waiters += 1
+        index = 0
+        try:
+            while True:
+                while index < len(call.chunks):
+                    yield call.chunks[index]
+                    index += 1
+                if call.done:
+                    if call.error is not None:
+                        raise call.error
+                    return
+                await call.wait_for_update()
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                self._abandon(self._streams, key, call)
+
+    async def _pump(self, key: str, call: _Call, factory: Callable[[], AsyncIterator[str]]):
+        """Read the shared stream into the call's buffer."""
+        chunks = factory()
+        try:
+            async for chunk in chunks:
+                call.chunks.append(chunk)
+                call.notify()
+        except asyncio.CancelledError:
+            call.error = asyncio.CancelledError()
+        except Exception as e:
+            call.error = e
+        finally:
+            await chunks.aclose()
+            call.done = True
+            self._forget(self._streams, key, call)
+            call.notify()
+
+    def _abandon(self, calls: Dict[str, _Call], key: str, call: _Call):
+        """
+        Cancel a call every caller has left. It is forgotten right away, so a
+        caller arriving before the cancellation completes starts a new one.
+        """
+        self._forget(calls, key, call)
+        call.task.cancel()
+
+    @staticmethod
+    def _forget(calls: Dict[str, _Call], key: str, call: _Call):
+        """Drop a finished call so the next request starts a fresh generation."""
+        if calls.get(key) is call:
+            del calls[key]
@@ -0,0 +1,111 @@
+"""
+Rolling conversation summarization.
+
+When a user's history grows past the history budget, the oldest turns are
+folded into a short running summary that is sent with every request
+instead, so prompts stay the same size in long sessions. The budget must be
+the smallest of the models the history is sent to: turns a model's prompt
+has no room for would otherwise be dropped without being summarized.
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from bot.ai.prompts import SUMMARY_PROMPT
+from bot.ai.provider import is_fallback_reply
+from bot.ai.tokens import estimate_message_tokens, get_history_budget, pack_history
+from bot.usage import usage_scope
+
+logger = logging.getLogger(__name__)
+
+
+def format_transcript(messages: List[Dict[str, str]]) -> str:
+    """Render history messages as a plain-text transcript."""
+    lines = []
+    for msg in messages:
+        role = "Student" if msg["role"] == "user" else "Mentor"
+        lines.append(f"{role}: {msg['content']}")
+    return "\n".join(lines)
+
+
+class ConversationSummarizer:
+    """Folds turns that no longer fit the history budget into a per-user summary."""
+
+    def __init__(self, ai_client, store, max_words: int, history_budget: Optional[int] = None):
+        """
+        Args:
+            ai_client: Client used to write summaries (must provide generate())
+            store: ConversationStore holding histories and summaries
+            max_words: Target maximum length of a summary
+            history_budget: Tokens of history kept before folding (default: ai_client's model budget)
+        """
+        self.ai_client = ai_client
+        self.store = store
+        self.max_words = max_words
+        self.history_budget = history_budget or get_history_budget(ai_client.model)
+
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self.summaries_written = 0
+        self.messages_folded = 0
+
+    def schedule(self, user_id: int):
+        """Summarize the user's history in the background if it has grown too long."""
+        if user_id in self._tasks:
+            return
+        task = self._tasks[user_id] = asyncio.create_task(self._summarize(user_id))
+        task.add_done_callback(lambda _: self._tasks.pop(user_id, None))
+
+    async def stop(self):
+        """Cancel summaries that are still running."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "running": len(self._tasks),
+            "summaries_written": self.summaries_written,
+            "messages_folded": self.messages_folded,
+        }
+
+    async def _summarize(self, user_id: int):
+        try:
+            history = await self.store.get_history(user_id)
+            budget = self.history_budget
+            if sum(estimate_message_tokens(m) for m in history) <= budget:
+                return
+
+            # Fold down to half the budget so summaries run every few turns, not every turn
+            kept = pack_history(history, budget // 2)
+            folded = history[:len(history) - len(kept)]
+            if not folded:
+                return
+
+            previous = await self.store.get_summary(user_id)
+            request = (
+                f"Existing summary:\n{previous or '(none yet)'}\n\n"
+                f"New conversation turns:\n{format_transcript(folded)}"
+            )
+            with usage_scope(user_id=user_id, feature="summary"):
+                summary = await self.ai_client.generate(
+                    user_message=request,
+                    system_prompt=SUMMARY_PROMPT.format(max_words=self.max_words)
+                )
+
+            summary = summary.strip()
+            if is_fallback_reply(summary):
+                # An empty or blocked reply must not replace the summary and its turns
+                logger.warning(f"Got no summary for user {user_id}, keeping the history as it is")
+                return
+
+            if await self.store.compact(user_id, folded, summary):
+                self.summaries_written += 1
+                self.messages_folded += len(folded)
+                logger.info(f"Folded {len(folded)} messages of user {user_id} into the summary")
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The history is left untouched, so the next reply simply tries again
+            logger.warning(f"Could not summarize conversation of user {user_id}: {e}")
@@ -0,0 +1,109 @@
+"""
+Fast local token estimation, token-budget-aware history packing and
+cost estimates from the token usage the APIs report.
+"""
+
+from typing import Dict, List, Optional
+from bot.config import settings
+
+# Tokens added per message for the "User:"/"Model:" role prefix and newline
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# History budgets (tokens) for known model families, matched by prefix.
+# Longer prefixes win, so "gemini-2.5-flash-lite" beats "gemini-2.5-flash".
+MODEL_HISTORY_BUDGETS = {
+    "gemini-2.5-pro": 6000,
+    "gemini-2.5-flash": 3000,
+    "gemini-2.5-flash-lite": 1500,
+    "gemini-2.0-flash-lite": 1500,
+    "gemini-2.0-flash": 2500,
+}
+
+# Prices in USD per million (input, output) tokens, matched by prefix like the budgets
+MODEL_PRICES = {
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+# Prompt tokens served from a context cache cost a quarter of the input price
+CACHED_INPUT_DISCOUNT = 0.25
+
+
+def match_model(model: str, table: Dict[str, object]) -> Optional[str]:
+    """Return the longest key of a per-model table that model starts with, or None."""
+    best_prefix = ""
+    for prefix in table:
+        if model.startswith(prefix) and len(prefix) > len(best_prefix):
+            best_prefix = prefix
+    return best_prefix or None
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text without calling the API.
+    Uses ~4 UTF-8 bytes per token, which is close for English and errs on
+    the high side for non-Latin scripts.
+    """
+    if not text:
+        return 0
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+def estimate_message_tokens(message: Dict[str, str]) -> int:
+    """Estimate the tokens a history message adds to a prompt."""
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def get_history_budget(model: str) -> int:
+    """Return the history token budget for a model."""
+    if model in settings.history_token_budgets:
+        return settings.history_token_budgets[model]
+
+    prefix = match_model(model, MODEL_HISTORY_BUDGETS)
+    if prefix:
+        return MODEL_HISTORY_BUDGETS[prefix]
+    return settings.history_token_budget
+
+
+def estimate_cost(model: str, usage: Optional[Dict[str, int]]) -> float:
+    """Return the cost in USD of a call's token usage, or 0 for models without a known price."""
+    if not usage:
+        return 0.0
+    prices = settings.llm_prices.get(model)
+    if prices is None:
+        prefix = match_model(model, MODEL_PRICES)
+        if prefix is None:
+            return 0.0
+        prices = MODEL_PRICES[prefix]
+
+    input_price, output_price = prices
+    prompt = usage.get("prompt") or 0
+    cached = min(usage.get("cached") or 0, prompt)
+    completion = usage.get("completion") or 0
+    return (
+        (prompt - cached) * input_price
+        + cached * input_price * CACHED_INPUT_DISCOUNT
+        + completion * output_price
+    ) / 1_000_000
+
+
+def pack_history(history: List[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+    """
+    Keep the most recent messages that fit into the token budget.
+    Messages are never split, and older ones are only kept if every newer
+    message fits too, so the result is always a contiguous tail of the history.
+    """
+    used = 0
+    start = len(history)
+    for index in range(len(history) - 1, -1, -1):
+        cost = estimate_message_tokens(history[index])
+        if used + cost > budget:
+            break
+        used += cost
+        start = index
+    return history[start:]
@@ -5,11 +5,30 @@ Loads environment variables and validates required settings.
 
 import os
 from pathlib import Path
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
+# Environment variables are also read from this file
 env_path = Path(__file__).parent.parent.parent / ".env"
-load_dotenv(dotenv_path=env_path)
+
+
+def _parse_int_map(value: str) -> dict:
+    """Parse "name=123,other=456" into {"name": 123, "other": 456}."""
+    result = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, number = item.split("=", 1)
+            result[name.strip()] = int(number)
+    return result
+
+
+def _parse_price_map(value: str) -> dict:
+    """Parse "model=0.1/0.4,other=1.25/10" into {"model": (0.1, 0.4), "other": (1.25, 10.0)}."""
+    result = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, prices = item.split("=", 1)
+            input_price, _, output_price = prices.partition("/")
+            result[name.strip()] = (float(input_price), float(output_price or input_price))
+    return result
 
 
 class Settings:
@@ -35,10 +54,174 @@ class Settings:
         
         # Gemini Model (optional, defaults to gemini-2.5-flash)
         self.gemini_model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+        # OpenAI (optional second provider, needs `pip install openai`)
+        self.openai_api_key = os.getenv("OPENAI_API_KEY", "")
+        self.openai_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+        # LLM providers in order of preference, as "provider" or "provider:model",
+        # e.g. "gemini,gemini:gemini-2.0-flash,openai". Failed requests fail over to
+        # the next one; requests slower than LLM_HEDGE_AFTER seconds are also sent
+        # to the next provider and the first answer wins (0 disables hedging).
+        self.llm_providers = [
+            p.strip() for p in os.getenv("LLM_PROVIDERS", "gemini").split(",") if p.strip()
+        ]
+        self.llm_hedge_after = float(os.getenv("LLM_HEDGE_AFTER", "0"))
+
+        # Request pool of each LLM provider: max parallel API calls and timeout (seconds) of a
+        # request, retries included
+        self.gemini_max_concurrency = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+        self.gemini_request_timeout = float(os.getenv("GEMINI_REQUEST_TIMEOUT", "60"))
+        self.openai_max_concurrency = int(os.getenv("OPENAI_MAX_CONCURRENCY", str(self.gemini_max_concurrency)))
+        self.openai_request_timeout = float(os.getenv("OPENAI_REQUEST_TIMEOUT", str(self.gemini_request_timeout)))
+
+        # Model routing: each question is sent to a model tier picked by a local
+        # classifier (length, keywords, code, conversation depth) and each lesson by
+        # its level. GEMINI_MODEL is the standard tier; lite and pro requests fail over
+        # to it. The standard tier uses GEMINI_REQUEST_TIMEOUT (seconds).
+        self.model_routing = os.getenv("MODEL_ROUTING", "true").lower() == "true"
+        self.gemini_lite_model = os.getenv("GEMINI_LITE_MODEL", "gemini-2.5-flash-lite")
+        self.gemini_pro_model = os.getenv("GEMINI_PRO_MODEL", "gemini-2.5-pro")
+        self.gemini_lite_timeout = float(os.getenv("GEMINI_LITE_TIMEOUT", "20"))
+        self.gemini_pro_timeout = float(os.getenv("GEMINI_PRO_TIMEOUT", "120"))
+
+        # Gemini context caching: system instructions at least as long as the model's
+        # minimum (1024 tokens for Flash, 4096 for Pro; GEMINI_CONTEXT_CACHE_MIN_TOKENS
+        # overrides it, 0 = the model's) are uploaded once and reused for the TTL
+        # (seconds) instead of being sent with every request
+        self.gemini_context_cache = os.getenv("GEMINI_CONTEXT_CACHE", "true").lower() == "true"
+        self.gemini_context_cache_ttl = float(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+        self.gemini_context_cache_min_tokens = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "0"))
+
+        # Token prices (USD per million input/output tokens) for the cost metrics,
+        # overriding the built-in ones, e.g. "gemini-2.5-pro=1.25/10"
+        self.llm_prices = _parse_price_map(os.getenv("LLM_PRICES", ""))
+
+        # HTTP connection pools. Idle connections are kept open for the keep-alive time
+        # (seconds) to skip new TLS handshakes; HTTP/2 needs `pip install "httpx[http2]"`.
+        # Telegram sends use a pool of TELEGRAM_POOL_SIZE connections (waiting up to
+        # TELEGRAM_POOL_TIMEOUT seconds for a free one); getUpdates has its own connection.
+        self.telegram_pool_size = int(os.getenv("TELEGRAM_POOL_SIZE", "256"))
+        self.telegram_pool_timeout = float(os.getenv("TELEGRAM_POOL_TIMEOUT", "5"))
+        self.telegram_keepalive_expiry = float(os.getenv("TELEGRAM_KEEPALIVE_EXPIRY", "30"))
+        self.telegram_http_version = os.getenv("TELEGRAM_HTTP_VERSION", "1.1")
+        # One Gemini connection pool is shared by all Gemini models
+        self.gemini_pool_size = int(os.getenv("GEMINI_POOL_SIZE", "64"))
+        self.gemini_keepalive_expiry = float(os.getenv("GEMINI_KEEPALIVE_EXPIRY", "30"))
+        self.gemini_http2 = os.getenv("GEMINI_HTTP2", "false").lower() == "true"
+
+        # Transient LLM errors (rate limits, 5xx, timeouts) are retried with jittered
+        # exponential backoff; a longer retry-after than the max delay is not waited for
+        self.llm_max_retries = int(os.getenv("LLM_MAX_RETRIES", "2"))
+        self.llm_retry_base_delay = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+        self.llm_retry_max_delay = float(os.getenv("LLM_RETRY_MAX_DELAY", "10"))
+
+        # Circuit breaker: after this many consecutive failures a provider is skipped
+        # for the recovery time (seconds), then probed again (threshold 0 disables it)
+        self.circuit_failure_threshold = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+        self.circuit_recovery_time = float(os.getenv("CIRCUIT_RECOVERY_TIME", "30"))
+
+        # Share one API call among identical requests that are in flight at the same time
+        self.single_flight = os.getenv("SINGLE_FLIGHT", "true").lower() == "true"
+
+        # Stream answers into the reply message as they are generated.
+        # Edits are throttled to one per interval (seconds) to respect Telegram limits.
+        self.stream_responses = os.getenv("STREAM_RESPONSES", "true").lower() == "true"
+        self.stream_edit_interval = float(os.getenv("STREAM_EDIT_INTERVAL", "1.2"))
+        # Answers ready within this many seconds are sent as one message; slower ones
+        # show "typing..." and then the streamed text
+        self.reply_preview_delay = float(os.getenv("REPLY_PREVIEW_DELAY", "1.0"))
+
+        # Learning-path lesson cache: lessons older than the TTL (seconds) are
+        # regenerated in the background. Set LESSON_CACHE_PATH to keep them on disk.
+        self.lesson_cache_ttl = float(os.getenv("LESSON_CACHE_TTL", "86400"))
+        self.lesson_refresh_interval = float(os.getenv("LESSON_REFRESH_INTERVAL", "3600"))
+        self.lesson_cache_path = os.getenv("LESSON_CACHE_PATH", "")
+        self.lesson_cache_warm = os.getenv("LESSON_CACHE_WARM", "true").lower() == "true"
+
+        # FAQ answer cache: answers to questions asked without earlier context are
+        # reused for similar questions (cosine similarity of 0-1 above the threshold)
+        self.faq_cache = os.getenv("FAQ_CACHE", "true").lower() == "true"
+        self.faq_cache_threshold = float(os.getenv("FAQ_CACHE_THRESHOLD", "0.95"))
+        self.faq_cache_max_entries = int(os.getenv("FAQ_CACHE_MAX_ENTRIES", "1000"))
+        self.faq_cache_ttl = float(os.getenv("FAQ_CACHE_TTL", "86400"))
+
+        # Game manual retrieval: the index is built with `python -m bot.ingest_manual`.
+        # The top passages scoring above the minimum BM25 score are added to the prompt.
+        self.manual_index_path = os.getenv("MANUAL_INDEX_PATH", "data/manual_index")
+        self.manual_top_k = int(os.getenv("MANUAL_TOP_K", "3"))
+        self.manual_min_score = float(os.getenv("MANUAL_MIN_SCORE", "2.0"))
+
+        # Webhook mode: when WEBHOOK_URL (public base URL) is set, updates are
+        # received on WEBHOOK_PATH by the built-in web server on PORT instead of polling.
+        # WEBHOOK_SECRET is checked against Telegram's secret token header.
+        self.webhook_url = os.getenv("WEBHOOK_URL", "")
+        self.webhook_path = os.getenv("WEBHOOK_PATH", "/telegram")
+        self.webhook_secret = os.getenv("WEBHOOK_SECRET", "")
+        self.port = int(os.getenv("PORT", "8080"))
+
+        # Flood protection: sustained messages per minute and burst size, per user
+        # and per chat (0 per minute disables the limit)
+        self.rate_limit_user_per_minute = float(os.getenv("RATE_LIMIT_USER_PER_MINUTE", "10"))
+        self.rate_limit_user_burst = int(os.getenv("RATE_LIMIT_USER_BURST", "5"))
+        self.rate_limit_chat_per_minute = float(os.getenv("RATE_LIMIT_CHAT_PER_MINUTE", "30"))
+        self.rate_limit_chat_burst = int(os.getenv("RATE_LIMIT_CHAT_BURST", "10"))
+
+        # Admission control: answers generated at once, and how many more may wait
+        # in line (users are told their position); beyond that new questions are turned away
+        self.admission_max_active = int(os.getenv("ADMISSION_MAX_ACTIVE", "32"))
+        self.admission_max_queue = int(os.getenv("ADMISSION_MAX_QUEUE", "200"))
+
+        # A follow-up sent while an answer is still being generated replaces it, and the
+        # messages are answered together after this many seconds of quiet; single
+        # messages are answered right away (0 disables merging)
+        self.message_merge_window = float(os.getenv("MESSAGE_MERGE_WINDOW", "1.0"))
+        
+        # Usage accounting: LLM tokens and cost per user, chat, learning topic, feature
+        # and model, shown by /usage to ADMIN_USER_IDS (comma-separated Telegram user ids).
+        # Totals are logged every USAGE_FLUSH_INTERVAL seconds and saved to USAGE_PATH if set.
+        self.admin_user_ids = {
+            int(user_id) for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id.strip()
+        }
+        self.usage_flush_interval = float(os.getenv("USAGE_FLUSH_INTERVAL", "60"))
+        self.usage_path = os.getenv("USAGE_PATH", "")
+        
+        # Startup time budget (seconds); a slower startup is logged as a warning
+        self.startup_budget = float(os.getenv("STARTUP_BUDGET", "5"))
+        
+        # Number of cheap Telegram updates (commands, menu taps) processed concurrently.
+        # Updates that need the LLM run outside this limit, ordered by admission control.
+        self.max_concurrent_updates = int(os.getenv("MAX_CONCURRENT_UPDATES", "256"))
         
         # Bot configuration
         self.bot_name = "FIRST Robotics Mentor Bot"
-        self.max_conversation_history = 10  # Number of messages to keep in context
+        # Upper bound on stored turns; prompts are trimmed by token budget below
+        self.max_conversation_history = int(os.getenv("MAX_CONVERSATION_HISTORY", "50"))
+
+        # History sent with each request is packed into a token budget. The default
+        # applies to unknown models; HISTORY_TOKEN_BUDGETS overrides per model,
+        # e.g. "gemini-2.5-flash=3000,gemini-2.5-pro=6000"
+        self.history_token_budget = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+        self.history_token_budgets = _parse_int_map(os.getenv("HISTORY_TOKEN_BUDGETS", ""))
+
+        # Fold turns that no longer fit the history budget into a running summary
+        self.summarize_history = os.getenv("SUMMARIZE_HISTORY", "true").lower() == "true"
+        self.summary_max_words = int(os.getenv("SUMMARY_MAX_WORDS", "150"))
+
+        # Conversation store limits: conversations idle for longer than the TTL
+        # (seconds) are dropped, and the least recently used ones are evicted
+        # once the user count or approximate memory budget (bytes) is exceeded
+        self.conversation_max_users = int(os.getenv("CONVERSATION_MAX_USERS", "5000"))
+        self.conversation_idle_ttl = float(os.getenv("CONVERSATION_IDLE_TTL", "86400"))
+        self.conversation_max_bytes = int(os.getenv("CONVERSATION_MAX_BYTES", str(64 * 1024 * 1024)))
+        # Estimated tokens of history kept per user (oldest turns are dropped first)
+        self.conversation_max_tokens = int(os.getenv("CONVERSATION_MAX_TOKENS", "8000"))
+
+        # Conversation backend: "memory" or "sqlite" (durable, survives restarts).
+        # SQLite writes are batched and flushed every CONVERSATION_FLUSH_INTERVAL seconds.
+        self.conversation_backend = os.getenv("CONVERSATION_BACKEND", "memory").lower()
+        self.conversation_db_path = os.getenv("CONVERSATION_DB_PATH", "data/conversations.db")
+        self.conversation_flush_interval = float(os.getenv("CONVERSATION_FLUSH_INTERVAL", "1.0"))
     
     def __repr__(self):
         return (
@@ -47,5 +230,28 @@ class Settings:
         )
 
 
+class _LazySettings:
+    """
+    Settings loaded (with the .env file) and validated on first use, so
+    importing the bot's modules stays cheap and tools that don't need the
+    bot's credentials (e.g. bot.ingest_manual) work without them.
+    """
+
+    _settings = None
+
+    def _load(self) -> Settings:
+        if self._settings is None:
+            from dotenv import load_dotenv
+            load_dotenv(dotenv_path=env_path)
+            self._settings = Settings()
+        return self._settings
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __repr__(self):
+        return repr(self._load())
+
+
 # Create a singleton settings instance
-settings = Settings()
+settings = _LazySettings()
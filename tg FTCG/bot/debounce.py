@@ -0,0 +1,107 @@
+"""
+Merging of messages a user sends in quick succession.
+
+Beginners often split a question over several short messages. A message
+is answered right away, so a complete question costs no extra latency. A
+follow-up that arrives while that answer is still being generated cancels
+it; the messages are then answered together once the user has paused for
+the merge window, taking any further follow-ups along. Replies never arrive
+out of order and superseded generations stop costing tokens.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Burst:
+    """Messages from one user that will be answered together."""
+
+    __slots__ = ("parts", "deadline", "owner", "answering")
+
+    def __init__(self, owner: asyncio.Task):
+        self.parts: List[str] = []
+        self.deadline = 0.0
+        # Task that will answer the merged messages
+        self.owner = owner
+        self.answering = False
+
+
+class MessageDebouncer:
+    """Collects a user's rapid-fire messages into one, handing it to a single task."""
+
+    def __init__(self, window: float):
+        """
+        Args:
+            window: Seconds of quiet awaited after a follow-up before answering (0 disables merging)
+        """
+        self.window = window
+        self._bursts: Dict[Hashable, _Burst] = {}
+
+        self.merged = 0
+        self.superseded = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return merge counters."""
+        return {
+            "pending": len(self._bursts),
+            "merged": self.merged,
+            "superseded": self.superseded,
+        }
+
+    async def collect(self, key: Hashable, text: str) -> Optional[str]:
+        """
+        Add a message. The first message of a burst is returned right away;
+        a follow-up waits until the user pauses.
+
+        Returns the merged text if the calling task should answer it, or None
+        if the message was handed to another task's answer.
+        """
+        if self.window <= 0:
+            return text
+
+        task = asyncio.current_task()
+        burst = self._bursts.get(key)
+        if burst is None:
+            # Most messages are complete questions, so don't make them wait
+            burst = self._bursts[key] = _Burst(task)
+            burst.parts.append(text)
+            burst.answering = True
+            return text
+        if not burst.answering:
+            # Still waiting for the user to finish: the waiting task answers this too
+            burst.parts.append(text)
+            burst.deadline = time.monotonic() + self.window
+            self.merged += 1
+            return None
+
+        # The earlier answer is outdated now; answer everything together instead
+        logger.info(f"Follow-up from {key} supersedes the answer being generated")
+        burst.owner.cancel()
+        burst.owner = task
+        burst.answering = False
+        self.superseded += 1
+        self.merged += 1
+
+        burst.parts.append(text)
+        burst.deadline = time.monotonic() + self.window
+        while True:
+            remaining = burst.deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(remaining)
+
+        burst.answering = True
+        return "\n".join(burst.parts)
+
+    def release(self, key: Hashable):
+        """
+        Mark the calling task's answer as delivered (or abandoned); later
+        messages start a new burst. Does nothing for tasks that don't own one.
+        """
+        burst = self._bursts.get(key)
+        if burst is not None and burst.owner is asyncio.current_task():
+            del self._bursts[key]
@@ -1,6 +1,6 @@
 """Command and conversation handlers for the bot."""
 
-from .commands import start_command, help_command, learn_command, rules_command
+from .commands import start_command, help_command, learn_command, rules_command, usage_command
 from .conversation import ask_command, handle_message
 from .learning_paths import handle_learning_callback
 
@@ -12,4 +12,5 @@ __all__ = [
     "handle_message",
     "handle_learning_callback",
     "rules_command",
+    "usage_command",
 ]
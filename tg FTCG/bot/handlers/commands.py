@@ -3,8 +3,11 @@ Basic command handlers for the FIRST Robotics bot.
 """
 
 import logging
+import time
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+from bot.config import settings
+from bot.usage import get_usage_tracker
 
 logger = logging.getLogger(__name__)
 
@@ -142,3 +145,44 @@ async def rules_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     
     logger.info(f"User {update.effective_user.id} requested rules")
+
+
+def _format_usage(name: str, totals: dict) -> str:
+    tokens = totals["prompt"] + totals["completion"]
+    cached = f", {totals['cached']:,.0f} cached" if totals["cached"] else ""
+    return f"{name}: {totals['calls']:,.0f} calls, {tokens:,.0f} tokens{cached}, ${totals['cost']:.4f}"
+
+
+async def usage_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handle the /usage command - show LLM token usage and cost (admins only).
+    /usage shows totals and the top users, chats, topics, features and models;
+    /usage <user id> shows a single user.
+    """
+    user_id = update.effective_user.id
+    if user_id not in settings.admin_user_ids:
+        await update.message.reply_text("⛔ This command is only available to bot admins.")
+        logger.info(f"User {user_id} tried to use /usage")
+        return
+    
+    tracker = get_usage_tracker()
+    if context.args:
+        lines = [_format_usage(f"👤 User {context.args[0]}", tracker.get("user", context.args[0]))]
+    else:
+        lines = [
+            f"📊 LLM usage since {time.strftime('%Y-%m-%d %H:%M', time.localtime(tracker.since))}",
+            _format_usage("Total", tracker.total()),
+        ]
+        for dimension, title in (
+            ("model", "By model"),
+            ("feature", "By feature"),
+            ("topic", "Top topics"),
+            ("user", "Top users"),
+            ("chat", "Top chats"),
+        ):
+            top = tracker.top(dimension)
+            if top:
+                lines.append(f"\n{title}:")
+                lines.extend(_format_usage(f"• {key}", totals) for key, totals in top)
+    
+    await update.message.reply_text("\n".join(lines))
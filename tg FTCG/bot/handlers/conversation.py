@@ -2,20 +2,125 @@
 Conversation handlers for natural interaction with the AI mentor.
 """
 
+import asyncio
 import logging
-from telegram import Update
+import math
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+from telegram import Message, Update
 from telegram.ext import ContextTypes
-from bot.ai import GeminiClient
+from bot import metrics
+from bot.ai import classify_question, get_llm_router
+from bot.ai.prompts import get_manual_prompt
+from bot.ai.model_tiers import TIERS
+from bot.ai.provider import is_fallback_reply
+from bot.ai.summarizer import ConversationSummarizer
+from bot.ai.tokens import get_history_budget
 from bot.config import settings
+from bot.debounce import MessageDebouncer
+from bot.handlers.delivery import ReplyDelivery
+from bot.ratelimit import AdmissionController, AdmissionRejected, PRIORITY_QUESTION, RateLimiter
+from bot.storage import ConversationStore, create_conversation_store
+from bot.usage import usage_scope
+
+if TYPE_CHECKING:
+    from bot.ai.faq_cache import FAQCache
+    from bot.ai.manual_index import ManualIndex
 
 logger = logging.getLogger(__name__)
 
-# Initialize Gemini client
-ai_client = GeminiClient()
+# Shared by all handlers and created on first use, so importing the handlers
+# neither reads the settings nor creates LLM clients or loads NumPy
+_conversation_store: Optional[ConversationStore] = None
+_summarizer: Optional[ConversationSummarizer] = None
+_manual_index: Optional["ManualIndex"] = None
+_manual_index_loaded = False
+_faq_cache: Optional["FAQCache"] = None
+_limiters: Optional[Dict[str, RateLimiter]] = None
+_admission: Optional[AdmissionController] = None
+_debouncer: Optional[MessageDebouncer] = None
+
+
+def get_conversation_store() -> ConversationStore:
+    """Return the per-user conversation history, with bounded memory use."""
+    global _conversation_store
+    if _conversation_store is None:
+        _conversation_store = store = create_conversation_store()
+        metrics.CONVERSATION_USERS.set_function(lambda: store.get_stats()["users"])
+        metrics.CONVERSATION_BYTES.set_function(lambda: store.get_stats()["bytes"])
+    return _conversation_store
+
 
-# User conversation contexts stored in memory
-# Format: {user_id: [{"role": "user", "content": "..."}, {"role": "assistant", "content": "..."}]}
-user_contexts = {}
+def get_summarizer() -> ConversationSummarizer:
+    """Return the summarizer that folds older turns once a conversation gets long."""
+    global _summarizer
+    if _summarizer is None:
+        # Fold against the smallest budget of any model a question may be routed to
+        budget = min(
+            get_history_budget(provider.model)
+            for tier in TIERS for provider in get_llm_router(tier).providers
+        )
+        _summarizer = ConversationSummarizer(
+            get_llm_router(), get_conversation_store(),
+            max_words=settings.summary_max_words, history_budget=budget
+        )
+    return _summarizer
+
+
+def get_admission() -> AdmissionController:
+    """Return the bound on answers (and lessons) generated at once."""
+    global _admission
+    if _admission is None:
+        _admission = admission = AdmissionController(
+            max_active=settings.admission_max_active,
+            max_queue=settings.admission_max_queue
+        )
+        metrics.ADMISSION_QUEUE_DEPTH.set_function(lambda: admission.queue_depth)
+    return _admission
+
+
+def _get_manual_index() -> Optional["ManualIndex"]:
+    """Return the search index over the game manual, if it has been built."""
+    global _manual_index, _manual_index_loaded
+    if not _manual_index_loaded:
+        from bot.ai.manual_index import load_manual_index
+
+        _manual_index = load_manual_index(settings.manual_index_path)
+        _manual_index_loaded = True
+    return _manual_index
+
+
+def _get_faq_cache() -> "FAQCache":
+    """Return the cache of answers to frequent questions asked without earlier context."""
+    global _faq_cache
+    if _faq_cache is None:
+        from bot.ai.faq_cache import FAQCache
+
+        _faq_cache = FAQCache(
+            threshold=settings.faq_cache_threshold,
+            max_entries=settings.faq_cache_max_entries if settings.faq_cache else 0,
+            ttl=settings.faq_cache_ttl
+        )
+    return _faq_cache
+
+
+def _get_limiters() -> Dict[str, RateLimiter]:
+    """Return the flood protection per user and per chat."""
+    global _limiters
+    if _limiters is None:
+        _limiters = {
+            "user": RateLimiter(settings.rate_limit_user_per_minute, settings.rate_limit_user_burst),
+            "chat": RateLimiter(settings.rate_limit_chat_per_minute, settings.rate_limit_chat_burst),
+        }
+    return _limiters
+
+
+def _get_debouncer() -> MessageDebouncer:
+    """Return the debouncer that answers questions split over several quick messages once."""
+    global _debouncer
+    if _debouncer is None:
+        _debouncer = MessageDebouncer(settings.message_merge_window)
+    return _debouncer
 
 
 async def ask_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -52,55 +157,145 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not user_message or not user_message.strip():
         return
     
-    await process_user_message(update, user_message)
+    await process_user_message(update, user_message, merge_follow_ups=True)
 
 
-async def process_user_message(update: Update, user_message: str):
+async def process_user_message(update: Update, user_message: str, merge_follow_ups: bool = False):
     """
     Process a user's message and generate an AI response.
     Manages conversation context and history.
+    With merge_follow_ups, messages sent in quick succession are answered together.
     """
+    started = time.monotonic()
     user_id = update.effective_user.id
     
-    # Show typing indicator in the header
-    await update.message.chat.send_action("typing")
+    # Drop floods before they cost anything
+    if not await _check_rate_limits(update):
+        return
     
-    # Send a "Thinking" placeholder message
-    placeholder_msg = await update.message.reply_text(
-        "🤔 **Thinking...**\n_Generating mentor response..._",
-        parse_mode="Markdown"
-    )
+    try:
+        if merge_follow_ups:
+            user_message = await _get_debouncer().collect(user_id, user_message)
+            if user_message is None:
+                metrics.MERGED_MESSAGES.inc()
+                return
+        
+        metrics.REPLIES_IN_FLIGHT.inc()
+        try:
+            await _answer_message(update, user_message, started)
+        finally:
+            metrics.REPLIES_IN_FLIGHT.dec()
+    finally:
+        _get_debouncer().release(user_id)
+
+
+async def _answer_message(update: Update, user_message: str, started: float):
+    """Generate and deliver the answer for process_user_message."""
+    user_id = update.effective_user.id
+    
+    # Get conversation context for this user
+    conversation_store = get_conversation_store()
+    conversation_history = await conversation_store.get_history(user_id)
+    summary = await conversation_store.get_summary(user_id)
     
+    # Questions without earlier context may already have a cached answer
+    context_free = not conversation_history and not summary
+    if context_free:
+        cached = _get_faq_cache().get(user_message)
+        if cached is not None:
+            await _send_cached_answer(update, user_message, cached, started)
+            return
+    
+    # Wait for a free generation slot, or shed the request if the queue is full
     try:
-        # Get or create conversation context for this user
-        if user_id not in user_contexts:
-            user_contexts[user_id] = []
+        ticket = get_admission().admit(user_id, PRIORITY_QUESTION)
+    except AdmissionRejected:
+        metrics.ADMISSION_REJECTED.inc()
+        await update.message.reply_text(
+            "😅 I'm answering a lot of questions right now and can't take more. "
+            "Please try again in a minute!"
+        )
+        return
+    
+    delivery = ReplyDelivery(update.message, started=started)
+    try:
+        if ticket.position:
+            # Tell the user right away; this message becomes the answer later
+            await delivery.notify(
+                f"⏳ Lots of students are asking questions right now. "
+                f"You're number {ticket.position} in line, I'll answer as soon as it's your turn!"
+            )
+        metrics.ADMISSION_WAIT.observe(await ticket.wait())
         
-        conversation_history = user_contexts[user_id]
+        await _generate_answer(
+            update, user_message, conversation_history, summary, context_free, started, delivery
+        )
+    except asyncio.CancelledError:
+        # Superseded by a follow-up message: the merged answer replaces this one
+        if delivery.answer_msg is not None:
+            await _delete_quietly(delivery.answer_msg)
+        raise
+    finally:
+        ticket.release()
+
+
+async def _generate_answer(
+    update: Update,
+    user_message: str,
+    conversation_history: List[Dict[str, str]],
+    summary: Optional[str],
+    context_free: bool,
+    started: float,
+    delivery: ReplyDelivery
+):
+    """Generate an answer with the LLM and deliver it to the user."""
+    user_id = update.effective_user.id
+    
+    try:
+        prompt = _with_manual(user_message)
+        tier = classify_question(user_message, conversation_history, summary)
+        llm = get_llm_router(tier)
+        metrics.LLM_ROUTED.inc(tier=tier, kind="message")
         
         # Get AI response with conversation context
-        response = await ai_client.get_response(
-            user_message=user_message,
-            conversation_history=conversation_history
-        )
+        with usage_scope(user_id=user_id, chat_id=update.effective_chat.id, feature="message"):
+            if settings.stream_responses:
+                response = await delivery.stream(llm.stream_response(
+                    user_message=prompt,
+                    conversation_history=conversation_history,
+                    summary=summary
+                ))
+            else:
+                response = await delivery.complete(llm.get_response(
+                    user_message=prompt,
+                    conversation_history=conversation_history,
+                    summary=summary
+                ))
+        
+        # From here on the answer is delivered; a follow-up starts a new one
+        _get_debouncer().release(user_id)
         
-        # Update conversation history
-        conversation_history.append({"role": "user", "content": user_message})
-        conversation_history.append({"role": "assistant", "content": response})
+        # Update conversation history (the store trims it to the configured length)
+        await get_conversation_store().append(user_id, [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": response},
+        ])
         
-        # Trim history to max length to avoid token limits
-        max_history = settings.max_conversation_history * 2
-        if len(conversation_history) > max_history:
-            conversation_history = conversation_history[-max_history:]
+        # Show the final response
+        await delivery.finish(response)
         
-        user_contexts[user_id] = conversation_history
+        if context_free and not is_fallback_reply(response):
+            _get_faq_cache().put(user_message, response)
         
-        # Edit the placeholder with the final response
-        await placeholder_msg.edit_text(response, parse_mode="Markdown")
+        metrics.REPLY_LATENCY.observe(time.monotonic() - started, kind="message")
+        
+        # Compress older turns now that the reply has been delivered
+        if settings.summarize_history:
+            get_summarizer().schedule(user_id)
         
         logger.info(
             f"User {user_id} asked: '{user_message[:50]}...' "
-            f"(history length: {len(conversation_history)})"
+            f"(history length: {len(conversation_history) + 2}, {tier} model {llm.model})"
         )
         
     except Exception as e:
@@ -109,7 +304,60 @@ async def process_user_message(update: Update, user_message: str):
             "😅 Oops! Something went wrong while thinking. Please try asking again!\n\n"
             "If this keeps happening, try using /start to reset our conversation."
         )
-        await placeholder_msg.edit_text(error_text, parse_mode="Markdown")
+        await delivery.finish(error_text)
+
+
+async def _check_rate_limits(update: Update) -> bool:
+    """Return False (warning the user once) if the user or chat is over its rate limit."""
+    limiters = _get_limiters()
+    for scope, key in (("user", update.effective_user.id), ("chat", update.effective_chat.id)):
+        limiter = limiters[scope]
+        allowed, retry_after, notify = limiter.check(key)
+        if allowed:
+            continue
+        metrics.RATE_LIMITED.inc(scope=scope)
+        logger.info(f"Rate limited {scope} {key} for {retry_after:.1f}s")
+        if notify:
+            await update.message.reply_text(
+                "⏳ You're sending messages faster than I can answer! "
+                f"Please wait {math.ceil(retry_after)} seconds and try again."
+            )
+        return False
+    return True
+
+
+async def _delete_quietly(message: Message):
+    """Delete one of the bot's messages, ignoring failures (e.g. already deleted)."""
+    try:
+        await message.delete()
+    except Exception as e:
+        logger.debug(f"Could not delete message: {e}")
+
+
+def _with_manual(user_message: str) -> str:
+    """Return the question to send, preceded by the relevant game manual passages if any."""
+    manual_index = _get_manual_index()
+    if manual_index is None:
+        return user_message
+    passages = manual_index.search(user_message, settings.manual_top_k, settings.manual_min_score)
+    if not passages:
+        return user_message
+    logger.debug(f"Adding manual passages {[p['source'] for p in passages]} to the prompt")
+    return get_manual_prompt(passages, user_message)
+
+
+async def _send_cached_answer(update: Update, user_message: str, answer: str, started: float):
+    """Reply with an answer from the FAQ cache, skipping the placeholder and the API call."""
+    user_id = update.effective_user.id
+    await ReplyDelivery(update.message, started=started).finish(answer)
+    
+    await get_conversation_store().append(user_id, [
+        {"role": "user", "content": user_message},
+        {"role": "assistant", "content": answer},
+    ])
+    
+    metrics.REPLY_LATENCY.observe(time.monotonic() - started, kind="message")
+    logger.info(f"User {user_id} asked: '{user_message[:50]}...' (answered from FAQ cache)")
 
 
 async def clear_context_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -119,8 +367,7 @@ async def clear_context_command(update: Update, context: ContextTypes.DEFAULT_TY
     """
     user_id = update.effective_user.id
     
-    if user_id in user_contexts:
-        del user_contexts[user_id]
+    await get_conversation_store().clear(user_id)
     
     await update.message.reply_text(
         "✅ Conversation history cleared! We're starting fresh. 🔄\n\n"
@@ -0,0 +1,181 @@
+"""
+Delivery of answers with as few Telegram Bot API calls as possible.
+
+Nothing is sent while an answer is expected to be quick: an answer that is
+ready within settings.reply_preview_delay goes out as a single message. Only
+slower answers get a "typing..." indicator (renewed while nothing is shown
+yet) and, when streaming, a message that grows as text arrives and is
+finally edited into the complete answer. Final answers are rendered to
+Telegram HTML and split over several messages when they are too long
+(see rendering.py).
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from telegram import Message
+from telegram.error import BadRequest
+from bot import metrics
+from bot.config import settings
+from bot.handlers.rendering import MESSAGE_LIMIT, render
+
+logger = logging.getLogger(__name__)
+
+# Telegram shows a chat action for about five seconds
+TYPING_INTERVAL = 4.5
+
+
+async def send_formatted(send: Callable[..., Awaitable[Any]], html: str, markdown: str, **kwargs) -> Any:
+    """
+    Call send(text, parse_mode=..., **kwargs) with rendered HTML, falling back
+    to the original text without formatting if Telegram can't parse it.
+    """
+    try:
+        return await send(html, parse_mode="HTML", **kwargs)
+    except BadRequest as e:
+        if "not modified" in str(e):
+            return None
+        logger.warning(f"Sending answer as plain text, Telegram rejected its formatting: {e}")
+        metrics.RENDER_FALLBACKS.inc()
+        return await send(markdown, parse_mode=None, **kwargs)
+
+
+class ReplyDelivery:
+    """Delivers one answer as a reply to a user's message, counting the Bot API calls used."""
+
+    def __init__(
+        self,
+        message: Message,
+        answer_msg: Optional[Message] = None,
+        started: Optional[float] = None,
+        kind: str = "message"
+    ):
+        """
+        Args:
+            message: The user's message being answered
+            answer_msg: A bot message to edit into the answer (e.g. a queue notice)
+            started: time.monotonic() when the update arrived, for latency metrics
+            kind: Label for the metrics
+        """
+        self.message = message
+        self.answer_msg = answer_msg
+        self.started = started if started is not None else time.monotonic()
+        self.kind = kind
+        self.calls = 0
+
+        self._shown = ""
+        self._received = False
+        self._typing: Optional[asyncio.Task] = None
+
+    async def notify(self, text: str):
+        """Send a notice (e.g. the position in a queue) that the answer will later replace."""
+        self.calls += 1
+        self.answer_msg = await self.message.reply_text(text)
+
+    async def complete(self, answer: Awaitable[str]) -> str:
+        """Wait for a complete answer, showing "typing..." if it takes a while."""
+        self._start_typing()
+        try:
+            return await answer
+        finally:
+            await self._stop_typing()
+
+    async def stream(self, chunks: AsyncIterator[str]) -> str:
+        """
+        Show streamed text as it arrives. The first text is held back for the
+        preview delay (a fast answer then costs one message) and later edits are
+        throttled to settings.stream_edit_interval. Returns the complete text.
+        """
+        text = ""
+        # Preview last shown, without the cursor; it stops changing once it is capped
+        previewed = ""
+        last_edit = 0.0
+        self._start_typing()
+        try:
+            async for chunk in chunks:
+                text += chunk
+                self._received = self._received or bool(text.strip())
+
+                now = time.monotonic()
+                if (
+                    now - self.started < settings.reply_preview_delay
+                    or now - last_edit < settings.stream_edit_interval
+                ):
+                    continue
+                preview = text[:MESSAGE_LIMIT].strip()
+                if preview == previewed:
+                    continue
+
+                await self._stop_typing()
+                # Partial Markdown is often unbalanced, so previews are plain text
+                await self._show(preview + " ▌", preview=True)
+                previewed = preview
+                last_edit = time.monotonic()
+        finally:
+            await self._stop_typing()
+            # Stop the generation right away if this answer is abandoned (e.g. superseded)
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        return text
+
+    async def finish(self, text: str):
+        """
+        Show the final answer (continuing in new messages if it is too long)
+        and record how many Bot API calls the reply took.
+        """
+        for index, (html, markdown) in enumerate(render(text)):
+            if index:
+                self.answer_msg = None
+            await self._show(html, markdown)
+        metrics.TELEGRAM_CALLS_PER_REPLY.observe(self.calls, kind=self.kind)
+
+    async def _show(self, text: str, markdown: Optional[str] = None, preview: bool = False):
+        """
+        Edit the answer message, sending it first if there is none yet.
+        With markdown, text is HTML and markdown the plain-text fallback.
+        """
+        self.calls += 1
+        if self.answer_msg is None:
+            send = self.message.reply_text
+        else:
+            send = self.answer_msg.edit_text
+
+        try:
+            if markdown is None:
+                result = await send(text)
+            else:
+                result = await send_formatted(send, text, markdown)
+        except Exception as e:
+            if not preview:
+                raise
+            # Previews are best effort (e.g. "message is not modified")
+            logger.debug(f"Skipped streaming edit: {e}")
+            return
+
+        if self.answer_msg is None:
+            self.answer_msg = result
+        if not self._shown:
+            metrics.FIRST_RESPONSE_LATENCY.observe(time.monotonic() - self.started, kind=self.kind)
+        self._shown = text.strip()
+
+    def _start_typing(self):
+        if self._typing is None:
+            self._typing = asyncio.create_task(self._keep_typing())
+
+    async def _stop_typing(self):
+        if self._typing is not None:
+            self._typing.cancel()
+            await asyncio.gather(self._typing, return_exceptions=True)
+
+    async def _keep_typing(self):
+        """Show "typing..." after the preview delay until text arrives."""
+        await asyncio.sleep(max(0.0, self.started + settings.reply_preview_delay - time.monotonic()))
+        while not self._received:
+            self.calls += 1
+            try:
+                await self.message.chat.send_action("typing")
+            except Exception as e:
+                logger.debug(f"Could not send typing action: {e}")
+            await asyncio.sleep(TYPING_INTERVAL)
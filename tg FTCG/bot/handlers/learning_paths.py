@@ -3,17 +3,22 @@ Learning path handlers with interactive topic navigation.
 """
 
 import logging
+import time
+from typing import Optional
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from bot.ai import GeminiClient
-from bot.ai.prompts import get_learning_path_prompt
+from bot import metrics
+from bot.ai import classify_lesson, get_llm_router
+from bot.ai.lesson_cache import LessonCache
+from bot.config import settings
+from bot.handlers.conversation import get_admission
+from bot.handlers.delivery import send_formatted
+from bot.handlers.rendering import render
+from bot.ratelimit import AdmissionRejected, PRIORITY_LESSON
+from bot.usage import usage_scope
 
 logger = logging.getLogger(__name__)
 
-# Initialize Gemini client
-ai_client = GeminiClient()
-
-
 # Learning content topics
 LEARNING_TOPICS = {
     "beginner": {
@@ -43,6 +48,40 @@ LEARNING_TOPICS = {
 }
 
 
+def get_all_topic_ids() -> list:
+    """Return the ids of every topic across all levels."""
+    return [tid for data in LEARNING_TOPICS.values() for _, tid in data["topics"]]
+
+
+# Generated lessons, created on first use (see get_lesson_cache)
+_lesson_cache: Optional[LessonCache] = None
+
+
+def get_lesson_cache() -> LessonCache:
+    """Return the generated lessons shared by all users; each level uses the model tier that suits it."""
+    global _lesson_cache
+    if _lesson_cache is None:
+        _lesson_cache = LessonCache(
+            get_llm_router(),
+            topic_ids=get_all_topic_ids(),
+            ttl=settings.lesson_cache_ttl,
+            refresh_interval=settings.lesson_refresh_interval,
+            path=settings.lesson_cache_path,
+            topic_clients={
+                tid: get_llm_router(classify_lesson(level))
+                for level, data in LEARNING_TOPICS.items() for _, tid in data["topics"]
+            },
+        )
+    return _lesson_cache
+
+
+def needs_generation(callback_data: str) -> bool:
+    """Return True if a callback opens a lesson that still has to be generated."""
+    if not callback_data or not callback_data.startswith("topic_"):
+        return False
+    return not get_lesson_cache().has_lesson(callback_data.replace("topic_", ""))
+
+
 async def handle_learning_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Handle callback queries from inline keyboard buttons.
@@ -137,20 +176,15 @@ async def show_topic_content(query, topic_id: str):
     """
     Show the AI-generated content for a specific topic.
     """
-    # Show loading message with "animation"
-    await query.edit_message_text(
-        "🧠 **Mentor is thinking...**\n\n_Preparing your robotics lesson..._ 🤖",
-        parse_mode="Markdown"
-    )
-    
+    started = time.monotonic()
     try:
-        # Get the appropriate prompt for this topic
-        topic_prompt = get_learning_path_prompt(topic_id)
+        # Cached lessons are shown right away
+        response = get_lesson_cache().get_cached(topic_id)
         
-        # Get AI response
-        response = await ai_client.get_learning_response(
-            topic_prompt=topic_prompt
-        )
+        if response is None:
+            response = await generate_lesson(query, topic_id)
+            if response is None:
+                return
         
         # Create back button
         keyboard = [[
@@ -158,13 +192,16 @@ async def show_topic_content(query, topic_id: str):
         ]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
-        # Send the response
-        await query.edit_message_text(
-            response,
-            parse_mode="Markdown",
-            reply_markup=reply_markup
-        )
+        # Send the response; long lessons continue in new messages with the button on the last
+        pages = render(response)
+        for index, (html, markdown) in enumerate(pages):
+            send = query.edit_message_text if index == 0 else query.message.chat.send_message
+            await send_formatted(
+                send, html, markdown,
+                reply_markup=reply_markup if index == len(pages) - 1 else None
+            )
         
+        metrics.REPLY_LATENCY.observe(time.monotonic() - started, kind="lesson")
         logger.info(f"User {query.from_user.id} learned about {topic_id}")
         
     except Exception as e:
@@ -175,6 +212,36 @@ async def show_topic_content(query, topic_id: str):
         )
 
 
+async def generate_lesson(query, topic_id: str):
+    """
+    Generate a lesson once admission control lets this user in.
+    Returns None (after telling the user) if the queue is full.
+    """
+    try:
+        ticket = get_admission().admit(query.from_user.id, PRIORITY_LESSON)
+    except AdmissionRejected:
+        metrics.ADMISSION_REJECTED.inc()
+        await query.edit_message_text(
+            "😅 I'm answering a lot of questions right now and can't take more. "
+            "Please try again in a minute!"
+        )
+        return None
+    
+    try:
+        # Show loading message with "animation"
+        waiting = f"\n\n_You're number {ticket.position} in line._" if ticket.position else ""
+        await query.edit_message_text(
+            "🧠 **Mentor is thinking...**\n\n_Preparing your robotics lesson..._ 🤖" + waiting,
+            parse_mode="Markdown"
+        )
+        metrics.ADMISSION_WAIT.observe(await ticket.wait())
+        metrics.LLM_ROUTED.inc(tier=classify_lesson(get_level_from_topic(topic_id)), kind="lesson")
+        with usage_scope(user_id=query.from_user.id, chat_id=query.message.chat_id if query.message else None):
+            return await get_lesson_cache().get_lesson(topic_id)
+    finally:
+        ticket.release()
+
+
 def get_level_from_topic(topic_id: str) -> str:
     """Determine which level a topic belongs to."""
     for level, data in LEARNING_TOPICS.items():
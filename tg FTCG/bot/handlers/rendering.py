@@ -0,0 +1,231 @@
+"""
+Rendering of model answers for Telegram.
+
+Models write GitHub-style Markdown (**bold**, # headings, ``` code blocks),
+which Telegram's Markdown mode reads differently and rejects outright when
+a marker is unbalanced. Answers are converted to Telegram HTML instead, where
+anything that isn't a recognized construct simply stays escaped text, and
+are split at paragraph, line or sentence boundaries into pieces that fit
+into one message.
+"""
+
+import html
+import re
+from typing import List, Tuple
+
+# Telegram allows 4096 characters (UTF-16 code units) per message; keep some slack
+MESSAGE_LIMIT = 4000
+
+_FENCE = re.compile(r"^\s*```")
+_HEADING = re.compile(r"^\s*#{1,6}\s+(.*?)[\s#]*$")
+_BULLET = re.compile(r"^(\s*)[*+-]\s+(.*)$")
+_RULE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_BOLD_MARKERS = re.compile(r"\*\*|__")
+
+# Places to split text that is too long, from most to least natural
+_SPLITS = (
+    (re.compile(r"\n"), "\n"),
+    (re.compile(r"(?<=[.!?])\s+"), " "),
+    (re.compile(r"\s+"), " "),
+)
+
+# Inline constructs that are kept as they are: code spans and links
+_PROTECTED = re.compile(r"`([^`\n]+)`|\[([^\]\n]+)\]\(((?:https?|tg)://[^\s)]+)\)")
+# Underscores only mark emphasis at word boundaries, and never around a bare
+# identifier such as __init__
+_EMPHASIS = (
+    (re.compile(r"\*\*(?=\S)([^\n]+?)(?<=\S)\*\*"), "b"),
+    (re.compile(r"(?<!\w)__(?!\w+__(?!\w))(?=\S)([^\n]+?)(?<=\S)__(?!\w)"), "b"),
+    (re.compile(r"(?<![\w*])\*(?=[^\s*])([^*\n<>]+?)(?<=[^\s*])\*(?![\w*])"), "i"),
+    (re.compile(r"(?<![\w_])_(?=[^\s_])([^_\n<>]+?)(?<=[^\s_])_(?![\w_])"), "i"),
+    (re.compile(r"~~(?=\S)([^~\n]+?)(?<=\S)~~"), "s"),
+)
+_TAG = re.compile(r"<(/?)([bis])>")
+
+
+def text_length(text: str) -> int:
+    """Length of text as Telegram counts it (UTF-16 code units)."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def render(markdown: str, limit: int = MESSAGE_LIMIT) -> List[Tuple[str, str]]:
+    """
+    Render an answer as Telegram messages.
+    Returns (html, markdown) pairs, one per message; the Markdown is the
+    plain-text fallback for a message Telegram refuses to parse.
+    """
+    return [(to_html(piece), piece) for piece in split_message(markdown, limit)]
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """Split Markdown into pieces of at most limit characters at natural boundaries."""
+    pieces = []
+    current = ""
+    for block in _blocks(text):
+        for part in _fit(block, limit):
+            candidate = f"{current}\n\n{part}" if current else part
+            if text_length(candidate) <= limit:
+                current = candidate
+                continue
+            if current:
+                pieces.append(current)
+            current = part
+    if current:
+        pieces.append(current)
+    return pieces or [text]
+
+
+def to_html(markdown: str) -> str:
+    """Convert model Markdown to Telegram HTML."""
+    lines = []
+    code: List[str] = []
+    language = None
+    for line in markdown.split("\n"):
+        if _FENCE.match(line):
+            if language is None:
+                language = line.strip()[3:].strip()
+            else:
+                lines.append(_code_block(code, language))
+                code, language = [], None
+            continue
+        if language is not None:
+            code.append(line)
+        else:
+            lines.append(_render_line(line))
+
+    if language is not None:
+        # The model didn't close its code block
+        lines.append(_code_block(code, language))
+    return "\n".join(lines)
+
+
+def _blocks(text: str) -> List[str]:
+    """Split text into paragraphs, keeping code blocks whole."""
+    blocks = []
+    lines: List[str] = []
+    in_code = False
+    for line in text.strip().split("\n"):
+        if _FENCE.match(line):
+            in_code = not in_code
+        if not line.strip() and not in_code:
+            if lines:
+                blocks.append("\n".join(lines))
+                lines = []
+            continue
+        lines.append(line)
+    if lines:
+        blocks.append("\n".join(lines))
+    return blocks
+
+
+def _fit(block: str, limit: int) -> List[str]:
+    """Split a paragraph or code block that is longer than limit."""
+    if text_length(block) <= limit:
+        return [block]
+    if _FENCE.match(block):
+        return _fit_code(block, limit)
+    return _split(block, limit, _SPLITS)
+
+
+def _fit_code(block: str, limit: int) -> List[str]:
+    """Split a long code block by lines, repeating the fences around each part."""
+    lines = block.split("\n")
+    opening = lines[0]
+    body = lines[1:-1] if len(lines) > 1 and _FENCE.match(lines[-1]) else lines[1:]
+    budget = limit - text_length(opening) - len("\n\n```")
+
+    parts = []
+    current: List[str] = []
+    size = 0
+    for line in body:
+        for piece in _split(line, budget, _SPLITS[2:]):
+            if current and size + text_length(piece) + 1 > budget:
+                parts.append(current)
+                current, size = [], 0
+            current.append(piece)
+            size += text_length(piece) + 1
+    if current:
+        parts.append(current)
+    return ["\n".join([opening] + part + ["```"]) for part in parts]
+
+
+def _split(text: str, limit: int, splits) -> List[str]:
+    """Split text at the first kind of boundary that makes every piece fit."""
+    if text_length(text) <= limit:
+        return [text]
+    if not splits:
+        # No boundary left: cut (half the limit is safe for any UTF-16 length)
+        step = max(1, limit // 2)
+        return [text[i:i + step] for i in range(0, len(text), step)]
+
+    pattern, joiner = splits[0]
+    pieces = []
+    current = ""
+    for part in pattern.split(text):
+        candidate = f"{current}{joiner}{part}" if current else part
+        if text_length(candidate) <= limit:
+            current = candidate
+            continue
+        if current:
+            pieces.append(current)
+        if text_length(part) <= limit:
+            current = part
+        else:
+            pieces.extend(_split(part, limit, splits[1:]))
+            current = ""
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _code_block(lines: List[str], language: str) -> str:
+    code = html.escape("\n".join(lines))
+    language = re.sub(r"[^\w+#-]", "", language)
+    if language:
+        return f'<pre><code class="language-{language}">{code}</code></pre>'
+    return f"<pre>{code}</pre>"
+
+
+def _render_line(line: str) -> str:
+    if _RULE.match(line):
+        return "──────────"
+    heading = _HEADING.match(line)
+    if heading:
+        # Headings are bold already; nested bold markers would only add noise
+        return f"<b>{_inline(_BOLD_MARKERS.sub('', heading.group(1)))}</b>"
+    bullet = _BULLET.match(line)
+    if bullet:
+        return f"{bullet.group(1)}• {_inline(bullet.group(2))}"
+    return _inline(line)
+
+
+def _emphasize(match: re.Match, tag: str) -> str:
+    """Wrap an emphasis span in a tag, unless it overlaps a span rendered before."""
+    open_tags = []
+    for closing, name in _TAG.findall(match.group(1)):
+        if not closing:
+            open_tags.append(name)
+        elif not open_tags or open_tags.pop() != name:
+            return match.group(0)
+    if open_tags:
+        return match.group(0)
+    return f"<{tag}>{match.group(1)}</{tag}>"
+
+
+def _inline(text: str) -> str:
+    """Render inline Markdown; unmatched markers are left as literal text."""
+    protected = []
+
+    def protect(match: re.Match) -> str:
+        code, label, url = match.groups()
+        if code is not None:
+            protected.append(f"<code>{html.escape(code)}</code>")
+        else:
+            protected.append(f'<a href="{html.escape(url)}">{html.escape(label)}</a>')
+        return f"\x00{len(protected) - 1}\x00"
+
+    # NUL marks protected spans, so it can't be allowed in the text itself
+    text = html.escape(_PROTECTED.sub(protect, text.replace("\x00", "")))
+    for pattern, tag in _EMPHASIS:
+        text = pattern.sub(lambda m, tag=tag: _emphasize(m, tag), text)
+    return re.sub("\x00(\\d+)\x00", lambda m: protected[int(m.group(1))], text)
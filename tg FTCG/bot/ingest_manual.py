@@ -0,0 +1,64 @@
+"""
+Build the game manual retrieval index.
+
+Usage (from the project root):
+    python -m bot.ingest_manual path/to/game-manual.pdf
+    python -m bot.ingest_manual manual.txt --out data/manual_index
+
+PDF files need the optional pypdf package (pip install pypdf). Text and
+Markdown files are read as-is; a form feed character starts a new page.
+"""
+
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+from bot.ai.manual_index import build_index, chunk_pages
+
+logger = logging.getLogger(__name__)
+
+
+def read_pages(path: Path) -> List[Tuple[str, str]]:
+    """Read a manual as (source, text) pages, where source is e.g. "p. 12"."""
+    if path.suffix.lower() == ".pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise SystemExit("Reading PDF files needs pypdf: pip install pypdf")
+        reader = PdfReader(str(path))
+        return [(f"p. {number}", page.extract_text() or "") for number, page in enumerate(reader.pages, 1)]
+
+    text = path.read_text(encoding="utf-8")
+    return [(f"p. {number}", page) for number, page in enumerate(text.split("\f"), 1)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the game manual retrieval index")
+    parser.add_argument("manual", help="Game manual as PDF, text or Markdown")
+    parser.add_argument(
+        "--out",
+        default=os.getenv("MANUAL_INDEX_PATH") or "data/manual_index",
+        help="Directory to write the index to (default: MANUAL_INDEX_PATH or data/manual_index)"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(levelname)s - %(message)s", level=logging.INFO)
+
+    path = Path(args.manual)
+    if not path.exists():
+        sys.exit(f"File not found: {path}")
+
+    pages = read_pages(path)
+    passages = chunk_pages(pages)
+    if not passages:
+        sys.exit(f"No text found in {path}")
+
+    logger.info(f"Read {len(pages)} pages and split them into {len(passages)} passages")
+    build_index(passages, args.out)
+
+
+if __name__ == "__main__":
+    main()
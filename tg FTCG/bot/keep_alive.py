@@ -2,12 +2,20 @@ from threading import Thread
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import logging
 import os
+from bot import metrics
 
 logger = logging.getLogger(__name__)
 
 class SimpleHandler(BaseHTTPRequestHandler):
     """Simple HTTP handler to satisfy cloud health checks."""
     def do_GET(self):
+        if self.path == "/metrics":
+            body = metrics.REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header('Content-type', metrics.CONTENT_TYPE)
+            self.end_headers()
+            self.wfile.write(body)
+            return
         self.send_response(200)
         self.send_header('Content-type', 'text/plain')
         self.end_headers()
@@ -2,7 +2,15 @@
 Main entry point for the FIRST Robotics Telegram Bot.
 """
 
+import asyncio
+import json
 import logging
+import signal
+import time
+
+# Imported first so the startup breakdown includes the time spent importing
+from bot.startup import startup_timer
+
 from telegram import Update
 from telegram.ext import (
     Application,
@@ -12,6 +20,8 @@ from telegram.ext import (
     filters,
 )
 
+from bot import metrics
+from bot.ai import get_llm_router
 from bot.config import settings
 from bot.handlers import (
     start_command,
@@ -19,10 +29,16 @@ from bot.handlers import (
     rules_command,
     learn_command,
     ask_command,
+    usage_command,
     handle_message,
     handle_learning_callback,
 )
-from bot.handlers.conversation import clear_context_command
+from bot.handlers.conversation import clear_context_command, get_conversation_store, get_summarizer
+from bot.handlers.learning_paths import get_lesson_cache, needs_generation
+from bot.scheduler import SchedulingUpdateProcessor
+from bot.telegram_request import create_telegram_request
+from bot.usage import get_usage_tracker
+from bot.web_server import Request, Response, WebServer
 
 # Configure logging
 logging.basicConfig(
@@ -31,21 +47,89 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+startup_timer.mark("imports")
 
-def main():
-    """Start the bot."""
-    logger.info("Starting FIRST Robotics Mentor Bot...")
-    logger.info(f"Configuration: {settings}")
+# Background task creating the LLM clients (kept so it isn't garbage collected)
+_warm_up_task = None
+
+
+async def post_init(application: Application):
+    """Start background services once the event loop is running."""
+    startup_timer.mark("initialize")
+    await get_conversation_store().start()
+    get_usage_tracker().start()
+    if settings.lesson_cache_warm:
+        get_lesson_cache().start()
+    startup_timer.mark("services")
+    startup_timer.report(settings.startup_budget)
     
-    # Start keep-alive server (for platforms like Render/Railway)
-    # Only needed if PORT environment variable is set
-    import os
-    if "PORT" in os.environ:
-        from bot import keep_alive
-        keep_alive.start()
+    # Load the LLM SDK in the background instead of during the first question
+    global _warm_up_task
+    _warm_up_task = asyncio.create_task(warm_up_llm())
+
+
+async def warm_up_llm():
+    """Create the LLM clients ahead of the first request."""
+    started = time.perf_counter()
+    await get_llm_router().warm_up()
+    elapsed = time.perf_counter() - started
+    metrics.STARTUP_PHASE.set(elapsed, phase="llm_warm_up")
+    logger.info(f"LLM clients ready after {elapsed:.2f}s")
+
+
+async def post_stop(application: Application):
+    """Let answers still being generated finish while the bot can send them."""
+    await application.update_processor.drain()
+
+
+async def post_shutdown(application: Application):
+    """Stop background services."""
+    await get_lesson_cache().stop()
+    await get_summarizer().stop()
+    await get_conversation_store().close()
+    await get_usage_tracker().stop()
+
+
+def is_llm_update(update: object) -> bool:
+    """Return True for updates whose handler may wait on the LLM (questions, new lessons)."""
+    if not isinstance(update, Update):
+        return False
+    if update.callback_query is not None:
+        return needs_generation(update.callback_query.data)
     
+    text = update.message.text if update.message else None
+    if not text:
+        return False
+    if text.startswith("/"):
+        # "/ask@BotName question" -> "/ask"
+        return text.split(maxsplit=1)[0].split("@")[0].lower() == "/ask"
+    return True
+
+
+def build_application(base_url: str = None) -> Application:
+    """
+    Create the Application and register all handlers.
+    base_url overrides the Bot API endpoint (used by the benchmark's fake Telegram server).
+    """
     # Create the Application
-    application = Application.builder().token(settings.telegram_bot_token).build()
+    # Updates are handled concurrently so one slow AI answer doesn't block other users,
+    # and menu taps never wait behind questions queued for the LLM
+    # Bot API calls are timed for the metrics endpoint and reuse pooled keep-alive connections
+    processor = SchedulingUpdateProcessor(settings.max_concurrent_updates, is_llm_update)
+    metrics.LLM_UPDATES.set_function(lambda: processor.llm_updates)
+    builder = (
+        Application.builder()
+        .token(settings.telegram_bot_token)
+        .request(create_telegram_request(settings.telegram_pool_size))
+        .get_updates_request(create_telegram_request(1))
+        .concurrent_updates(processor)
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+    )
+    if base_url:
+        builder = builder.base_url(base_url)
+    application = builder.build()
     
     # Register command handlers
     application.add_handler(CommandHandler("start", start_command))
@@ -54,6 +138,7 @@ def main():
     application.add_handler(CommandHandler("learn", learn_command))
     application.add_handler(CommandHandler("ask", ask_command))
     application.add_handler(CommandHandler("clear", clear_context_command))
+    application.add_handler(CommandHandler("usage", usage_command))
     
     # Register callback query handler for interactive buttons
     application.add_handler(CallbackQueryHandler(handle_learning_callback))
@@ -64,6 +149,103 @@ def main():
         MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message)
     )
     
+    return application
+
+
+def create_web_server(application: Application) -> WebServer:
+    """Create the HTTP server for webhook updates and health checks."""
+    server = WebServer(host="0.0.0.0", port=settings.port)
+    
+    async def health(request: Request) -> Response:
+        return Response(200, b"Bot is running!")
+    
+    async def ready(request: Request) -> Response:
+        if application.running:
+            return Response(200, b"ready")
+        return Response(503, b"starting")
+    
+    async def metrics_endpoint(request: Request) -> Response:
+        return Response(200, metrics.REGISTRY.render().encode("utf-8"), metrics.CONTENT_TYPE)
+    
+    async def telegram_update(request: Request) -> Response:
+        secret = request.headers.get("x-telegram-bot-api-secret-token")
+        if settings.webhook_secret and secret != settings.webhook_secret:
+            return Response(403, b"Forbidden")
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return Response(400, b"Invalid JSON")
+        
+        # Queue the update and answer right away; handlers run in the background
+        await application.update_queue.put(Update.de_json(data, application.bot))
+        return Response(200, b"ok")
+    
+    server.add_route("GET", "/", health)
+    server.add_route("GET", "/healthz", health)
+    server.add_route("GET", "/readyz", ready)
+    server.add_route("GET", "/metrics", metrics_endpoint)
+    server.add_route("POST", settings.webhook_path, telegram_update)
+    return server
+
+
+async def run_webhook(application: Application):
+    """
+    Receive updates through a webhook instead of long polling.
+    A single asyncio server on $PORT handles both Telegram updates and health checks.
+    """
+    server = create_web_server(application)
+    webhook_url = settings.webhook_url.rstrip("/") + settings.webhook_path
+    
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            # Not supported on Windows; Ctrl+C still raises KeyboardInterrupt
+            pass
+    
+    await application.initialize()
+    await post_init(application)
+    await server.start()
+    try:
+        await application.bot.set_webhook(
+            url=webhook_url,
+            secret_token=settings.webhook_secret or None,
+            allowed_updates=Update.ALL_TYPES,
+        )
+        await application.start()
+        logger.info(f"Bot is receiving updates via webhook at {webhook_url}")
+        await stop_event.wait()
+    finally:
+        await server.stop()
+        if application.running:
+            await application.stop()
+            await post_stop(application)
+        await application.shutdown()
+        await post_shutdown(application)
+
+
+def main():
+    """Start the bot."""
+    logger.info("Starting FIRST Robotics Mentor Bot...")
+    logger.info(f"Configuration: {settings}")
+    startup_timer.mark("settings")
+    
+    application = build_application()
+    startup_timer.mark("application")
+    
+    if settings.webhook_url:
+        asyncio.run(run_webhook(application))
+        return
+    
+    # Start keep-alive server (for platforms like Render/Railway)
+    # Only needed if PORT environment variable is set
+    import os
+    if "PORT" in os.environ:
+        from bot import keep_alive
+        keep_alive.start()
+    
     # Start the bot
     logger.info("Bot is starting polling...")
     application.run_polling()
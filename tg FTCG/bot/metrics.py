@@ -0,0 +1,333 @@
+"""
+Lightweight Prometheus-style metrics.
+
+Metrics are kept in process memory and rendered in the Prometheus text
+exposition format by the /metrics endpoint, without extra dependencies.
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from fast cache hits to slow LLM generations
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    """Common parts of all metric types."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A value that only goes up."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in list(self._values.items())
+        ]
+
+
+class Gauge(_Metric):
+    """A value that can go up and down, or be read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the (unlabelled) value from a callback whenever metrics are rendered."""
+        self._function = function
+
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {self._function()}"]
+            except Exception as e:
+                logger.debug(f"Could not read gauge {self.name}: {e}")
+                return []
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in list(self._values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Format: {label_values: [bucket counts..., sum, count]}
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        data = self._values.get(key)
+        if data is None:
+            data = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                data[index] += 1
+        data[-2] += value
+        data[-1] += 1
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, data in list(self._values.items()):
+            data = list(data)
+            for bound, count in zip(self.buckets, data):
+                labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {data[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {data[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {data[-1]}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Startup
+STARTUP_PHASE = REGISTRY.register(Gauge(
+    "bot_startup_phase_seconds",
+    "Time spent in each phase of the last startup",
+    ["phase"],
+))
+
+# User-facing latency
+REPLY_LATENCY = REGISTRY.register(Histogram(
+    "bot_reply_latency_seconds",
+    "Time from receiving an update to delivering the complete answer",
+    ["kind"],
+))
+FIRST_RESPONSE_LATENCY = REGISTRY.register(Histogram(
+    "bot_first_response_latency_seconds",
+    "Time from receiving an update until the first answer text is shown",
+    ["kind"],
+))
+REPLIES_IN_FLIGHT = REGISTRY.register(Gauge(
+    "bot_replies_in_flight",
+    "Answers currently being generated",
+))
+
+# Update scheduling
+UPDATES = REGISTRY.register(Counter(
+    "bot_updates_total",
+    "Telegram updates by scheduling path (cheap or llm)",
+    ["kind"],
+))
+UPDATE_LATENCY = REGISTRY.register(Histogram(
+    "bot_update_handling_seconds",
+    "Time spent handling updates on the cheap path (commands, menus)",
+    ["kind"],
+))
+LLM_UPDATES = REGISTRY.register(Gauge(
+    "bot_llm_updates_in_progress",
+    "Updates that need the LLM and are still being handled",
+))
+
+# Flood protection and admission control
+RATE_LIMITED = REGISTRY.register(Counter(
+    "bot_rate_limited_total",
+    "Messages dropped by the per-user or per-chat rate limit",
+    ["scope"],
+))
+MERGED_MESSAGES = REGISTRY.register(Counter(
+    "bot_merged_messages_total",
+    "Messages answered together with the user's other messages sent right before or after",
+))
+ADMISSION_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "bot_admission_queue_depth",
+    "Questions waiting for a free answer generation slot",
+))
+ADMISSION_WAIT = REGISTRY.register(Histogram(
+    "bot_admission_wait_seconds",
+    "Time questions waited in the admission queue",
+))
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "bot_admission_rejected_total",
+    "Questions turned away because the admission queue was full",
+))
+
+# LLM calls
+LLM_REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "bot_llm_request_seconds",
+    "Duration of LLM API calls (excluding queue wait)",
+    ["model", "outcome"],
+))
+LLM_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "bot_llm_queue_wait_seconds",
+    "Time LLM calls waited for a free slot in the request pool",
+))
+LLM_IN_FLIGHT = REGISTRY.register(Gauge(
+    "bot_llm_in_flight_requests",
+    "LLM API calls currently running",
+))
+LLM_WAITING = REGISTRY.register(Gauge(
+    "bot_llm_waiting_requests",
+    "LLM API calls waiting for a free slot",
+))
+LLM_COALESCED = REGISTRY.register(Counter(
+    "bot_llm_coalesced_requests_total",
+    "Requests served by joining an identical in-flight LLM call",
+    ["kind"],
+))
+LLM_RETRIES = REGISTRY.register(Counter(
+    "bot_llm_retries_total",
+    "LLM calls retried after a transient error",
+    ["model"],
+))
+LLM_CIRCUIT_STATE = REGISTRY.register(Gauge(
+    "bot_llm_circuit_state",
+    "Circuit breaker state per model (0 closed, 1 half-open, 2 open)",
+    ["model"],
+))
+LLM_ANSWERS = REGISTRY.register(Counter(
+    "bot_llm_answers_total",
+    "LLM requests answered, by the provider and model that answered",
+    ["provider", "model"],
+))
+LLM_FAILOVERS = REGISTRY.register(Counter(
+    "bot_llm_failovers_total",
+    "LLM requests retried on the next provider after a failure",
+))
+LLM_HEDGES = REGISTRY.register(Counter(
+    "bot_llm_hedged_requests_total",
+    "Slow LLM requests raced against the next provider",
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "bot_llm_tokens_total",
+    "Tokens reported by the LLM API",
+    ["model", "kind"],
+))
+LLM_COST = REGISTRY.register(Counter(
+    "bot_llm_cost_usd_total",
+    "Estimated cost of LLM calls in USD, from reported tokens and known prices",
+    ["model"],
+))
+USAGE_TOKENS = REGISTRY.register(Counter(
+    "bot_usage_tokens_total",
+    "LLM tokens by the feature (message, lesson, summary) and learning topic they were used for",
+    ["feature", "topic", "kind"],
+))
+USAGE_COST = REGISTRY.register(Counter(
+    "bot_usage_cost_usd_total",
+    "Estimated LLM cost in USD by feature and learning topic",
+    ["feature", "topic"],
+))
+LLM_ROUTED = REGISTRY.register(Counter(
+    "bot_llm_routed_requests_total",
+    "Questions and lessons by the model tier they were routed to",
+    ["tier", "kind"],
+))
+
+# Telegram Bot API calls
+TELEGRAM_API_LATENCY = REGISTRY.register(Histogram(
+    "bot_telegram_api_seconds",
+    "Duration of Telegram Bot API calls",
+    ["method"],
+))
+RENDER_FALLBACKS = REGISTRY.register(Counter(
+    "bot_render_fallbacks_total",
+    "Answers sent as plain text because Telegram rejected their formatting",
+))
+TELEGRAM_CALLS_PER_REPLY = REGISTRY.register(Histogram(
+    "bot_telegram_calls_per_reply",
+    "Bot API calls (messages, edits, chat actions) used to deliver one answer",
+    ["kind"],
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20),
+))
+
+# Caches and storage
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "bot_cache_lookups_total",
+    "Cache lookups by cache and result (hit or miss)",
+    ["cache", "result"],
+))
+CONVERSATION_USERS = REGISTRY.register(Gauge(
+    "bot_conversation_store_users",
+    "Conversations held in memory",
+))
+CONVERSATION_BYTES = REGISTRY.register(Gauge(
+    "bot_conversation_store_bytes",
+    "Approximate memory used by stored conversations",
+))
@@ -0,0 +1,205 @@
+"""
+Rate limiting and admission control.
+
+Token buckets stop a single user or chat from flooding the bot, and the
+admission controller bounds how many answers are generated at once. Work
+beyond that waits in a queue (so the user can be told their position) and
+is shed when the queue is full, keeping latency predictable for everyone
+else during spikes. The queue is ordered by priority and then by fair
+share: a user's second waiting request goes behind everyone else's first.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Admission priorities (lower goes first). Lessons are usually pre-generated
+# by the lesson cache, so a lesson miss waits behind live questions.
+PRIORITY_QUESTION = 0
+PRIORITY_LESSON = 1
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "notified")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+        # Whether the owner has already been told they are limited
+        self.notified = False
+
+
+class RateLimiter:
+    """Token bucket per key (user or chat id)."""
+
+    def __init__(self, per_minute: float, burst: int, max_keys: int = 100000):
+        """
+        Args:
+            per_minute: Sustained requests allowed per minute (0 disables the limit)
+            burst: Requests allowed in a burst (bucket capacity)
+            max_keys: Buckets kept before the least recently used are dropped
+        """
+        self.rate = per_minute / 60.0
+        self.burst = max(1, burst)
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, _Bucket]" = OrderedDict()
+
+    def check(self, key: Hashable) -> Tuple[bool, float, bool]:
+        """
+        Take a token for a key.
+
+        Returns (allowed, retry_after, notify): retry_after is the seconds until
+        the next token, and notify is True only for the first rejection in a row,
+        so a flooding user gets one warning instead of one per message.
+        """
+        if self.rate <= 0:
+            return True, 0.0, False
+
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(self.burst, now)
+            # A dropped bucket was idle long enough to be full again anyway
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            bucket.notified = False
+            return True, 0.0, False
+
+        notify = not bucket.notified
+        bucket.notified = True
+        return False, (1 - bucket.tokens) / self.rate, notify
+
+
+class AdmissionRejected(Exception):
+    """Raised when the admission queue is full."""
+
+
+class Ticket:
+    """A place in the admission controller: running, or waiting in the queue."""
+
+    def __init__(self, controller: "AdmissionController", key: Optional[Hashable], position: int):
+        self._controller = controller
+        self.key = key
+        # Position in the queue when the ticket was issued; 0 means admitted right away
+        self.position = position
+        self.queued_at = time.monotonic()
+        self._ready = asyncio.get_running_loop().create_future()
+        self._released = False
+        if not position:
+            self._ready.set_result(None)
+
+    async def wait(self) -> float:
+        """Wait until it's this ticket's turn. Returns the seconds spent waiting."""
+        await self._ready
+        return time.monotonic() - self.queued_at
+
+    def release(self):
+        """Give up the ticket, letting the next request in (safe to call more than once)."""
+        if self._released:
+            return
+        self._released = True
+        self._controller._release(self)
+
+
+class AdmissionController:
+    """Bounds concurrent answer generations, queueing a limited number of extra requests."""
+
+    # Queue entries are (priority, user round, arrival order, ticket)
+
+    def __init__(self, max_active: int, max_queue: int):
+        """
+        Args:
+            max_active: Answers generated at the same time
+            max_queue: Requests allowed to wait; later ones are rejected
+        """
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self._active = 0
+        self._queue: List[Tuple[int, int, int, Ticket]] = []
+        self._order = itertools.count()
+        # Tickets held (running or waiting) per key, for fair sharing
+        self._held: Dict[Hashable, int] = {}
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return admission counters."""
+        return {
+            "active": self._active,
+            "queue_depth": len(self._queue),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+    def admit(self, key: Optional[Hashable] = None, priority: int = PRIORITY_QUESTION) -> Ticket:
+        """
+        Issue a ticket: admitted right away if there is capacity, otherwise queued.
+        Raises AdmissionRejected when the queue is full.
+
+        Args:
+            key: Who the work is for (e.g. the user id), used to share slots fairly
+            priority: One of the PRIORITY_* constants; lower values are served first
+        """
+        if self._active < self.max_active and not self._queue:
+            self._active += 1
+            self.admitted += 1
+            self._hold(key)
+            return Ticket(self, key, 0)
+
+        if len(self._queue) >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected()
+
+        # Each request a user already has in the system pushes this one back a round
+        entry = (priority, self._held.get(key, 0) if key is not None else 0, next(self._order))
+        position = 1 + sum(1 for queued in self._queue if queued[:3] < entry)
+        ticket = Ticket(self, key, position)
+        heapq.heappush(self._queue, entry + (ticket,))
+        self._hold(key)
+        self.queued += 1
+        return ticket
+
+    def _hold(self, key: Optional[Hashable]):
+        if key is not None:
+            self._held[key] = self._held.get(key, 0) + 1
+
+    def _release(self, ticket: Ticket):
+        if ticket.key is not None:
+            held = self._held.pop(ticket.key) - 1
+            if held:
+                self._held[ticket.key] = held
+
+        if not ticket._ready.done():
+            # Left the queue before its turn (e.g. the handler was cancelled)
+            self._queue = [entry for entry in self._queue if entry[3] is not ticket]
+            heapq.heapify(self._queue)
+            ticket._ready.cancel()
+            return
+
+        self._active -= 1
+        # Hand the freed slot to the first request in priority / fair-share order
+        while self._queue and self._active < self.max_active:
+            waiting = heapq.heappop(self._queue)[3]
+            self._active += 1
+            self.admitted += 1
+            waiting._ready.set_result(None)
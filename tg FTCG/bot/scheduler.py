@@ -0,0 +1,72 @@
+"""
+Update scheduling that keeps cheap updates fast while the LLM is busy.
+
+PTB bounds the number of updates handled at once. If questions waiting on
+the LLM hold those slots, a tap on a menu button waits behind them. The
+processor here sorts updates into two paths: cheap updates (commands and
+menu navigation) are handled right away within PTB's limit, while updates
+that need the LLM are started as separate tasks and release their slot at
+once. Their generations are then ordered by the admission controller
+(priority and fair share per user, see bot.ratelimit).
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Set
+from telegram.ext import BaseUpdateProcessor
+from bot import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulingUpdateProcessor(BaseUpdateProcessor):
+    """Update processor with a fast path for cheap updates and background tasks for LLM work."""
+
+    def __init__(self, max_concurrent_updates: int, needs_llm: Callable[[object], bool]):
+        """
+        Args:
+            max_concurrent_updates: Cheap updates handled at the same time
+            needs_llm: Returns True for updates whose handler may wait on the LLM
+        """
+        super().__init__(max_concurrent_updates)
+        self.needs_llm = needs_llm
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def llm_updates(self) -> int:
+        """Number of LLM updates currently being handled."""
+        return len(self._tasks)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]):
+        if self.needs_llm(update):
+            # The handler's own admission ticket decides when it gets to the LLM
+            metrics.UPDATES.inc(kind="llm")
+            task = asyncio.create_task(coroutine)
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return
+
+        metrics.UPDATES.inc(kind="cheap")
+        started = time.monotonic()
+        try:
+            await coroutine
+        finally:
+            metrics.UPDATE_LATENCY.observe(time.monotonic() - started, kind="cheap")
+
+    async def drain(self, timeout: float = 30.0):
+        """Wait for LLM updates still being handled, cancelling them after timeout seconds."""
+        if not self._tasks:
+            return
+        logger.info(f"Waiting for {len(self._tasks)} answers in progress")
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        await self.drain()
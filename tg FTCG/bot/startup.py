@@ -0,0 +1,50 @@
+"""
+Startup phase timing.
+
+Records how long each phase of booting takes (imports, settings,
+building the application, connecting to Telegram, starting services),
+logs the breakdown once the bot is ready and exports it as metrics, so
+cold starts on scale-to-zero hosts can be kept within a budget.
+"""
+
+import logging
+import time
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Measures consecutive startup phases from the moment it is created."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str):
+        """Record the time since the previous mark as the duration of phase."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    @property
+    def elapsed(self) -> float:
+        return self._last - self.started
+
+    def report(self, budget: float = 0.0):
+        """Log the breakdown and export it as metrics, warning if it exceeded the budget (seconds)."""
+        from bot import metrics
+
+        for phase, seconds in self.phases:
+            metrics.STARTUP_PHASE.set(seconds, phase=phase)
+        breakdown = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.phases)
+        message = f"Startup took {self.elapsed:.2f}s ({breakdown})"
+        if budget and self.elapsed > budget:
+            logger.warning(f"{message}, over the {budget:.1f}s budget")
+        else:
+            logger.info(message)
+
+
+# Created when bot.main starts importing the rest of the bot
+startup_timer = StartupTimer()
@@ -0,0 +1,15 @@
+"""Storage backends for per-user conversation history."""
+
+from .conversation_store import (
+    ConversationStore,
+    InMemoryConversationStore,
+    create_conversation_store,
+)
+from .sqlite_store import SQLiteConversationStore
+
+__all__ = [
+    "ConversationStore",
+    "InMemoryConversationStore",
+    "SQLiteConversationStore",
+    "create_conversation_store",
+]
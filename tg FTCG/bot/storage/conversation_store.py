@@ -0,0 +1,237 @@
+"""
+Conversation history stores.
+
+Handlers talk to a ConversationStore instead of a module-level dict so the
+backend can be swapped and memory use stays bounded on long-running workers.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List
+from bot.ai.tokens import estimate_message_tokens
+from bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Approximate per-message bookkeeping cost (dict, keys, list slot) in bytes
+MESSAGE_OVERHEAD_BYTES = 200
+
+
+def estimate_message_bytes(message: Dict[str, str]) -> int:
+    """Roughly estimate how much memory a stored message takes."""
+    return len(message["content"].encode("utf-8")) + MESSAGE_OVERHEAD_BYTES
+
+
+class ConversationStore:
+    """Base class for conversation history backends."""
+
+    async def start(self):
+        """Prepare the store. Called once the event loop is running."""
+
+    async def close(self):
+        """Flush pending work and release resources."""
+
+    async def get_history(self, user_id: int) -> List[Dict[str, str]]:
+        """Return a copy of the user's history, oldest message first."""
+        raise NotImplementedError
+
+    async def append(self, user_id: int, messages: List[Dict[str, str]]):
+        """Add messages to the end of the user's history."""
+        raise NotImplementedError
+
+    async def clear(self, user_id: int):
+        """Forget the user's history and summary."""
+        raise NotImplementedError
+
+    async def get_summary(self, user_id: int) -> str:
+        """Return the running summary of older turns, or an empty string."""
+        raise NotImplementedError
+
+    async def compact(self, user_id: int, folded: List[Dict[str, str]], summary: str) -> bool:
+        """
+        Replace the oldest messages with a summary.
+        The messages are only removed if they are still the oldest ones in the
+        history (e.g. not cleared meanwhile). Returns True if the history changed.
+        """
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return counters describing the store's contents."""
+        raise NotImplementedError
+
+
+class _Entry:
+    """History of one user plus bookkeeping for eviction."""
+
+    __slots__ = ("messages", "summary", "size", "tokens", "last_used")
+
+    def __init__(self):
+        self.messages: List[Dict[str, str]] = []
+        self.summary = ""
+        self.size = 0
+        self.tokens = 0
+        self.last_used = time.monotonic()
+
+
+class InMemoryConversationStore(ConversationStore):
+    """
+    In-process store with LRU and idle-TTL eviction.
+
+    Memory stays bounded by max_users and max_bytes: the least recently
+    used conversations are dropped first once either limit is reached.
+    """
+
+    def __init__(
+        self,
+        max_messages: int,
+        max_tokens: int,
+        max_users: int,
+        idle_ttl: float,
+        max_bytes: int
+    ):
+        """
+        Args:
+            max_messages: Messages kept per user (oldest are dropped first)
+            max_tokens: Estimated tokens kept per user (oldest messages are dropped first)
+            max_users: Maximum number of conversations held at once
+            idle_ttl: Seconds without activity after which a conversation is dropped
+            max_bytes: Approximate memory budget for all conversations
+        """
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.max_users = max_users
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._entries
+
+    async def get_history(self, user_id: int) -> List[Dict[str, str]]:
+        self._evict()
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return []
+        self._touch(user_id, entry)
+        return list(entry.messages)
+
+    async def append(self, user_id: int, messages: List[Dict[str, str]]):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            entry = self._entries[user_id] = _Entry()
+        previous_size = entry.size
+
+        for message in messages:
+            entry.messages.append(message)
+            entry.size += estimate_message_bytes(message)
+            entry.tokens += estimate_message_tokens(message)
+
+        # Drop the oldest messages beyond the per-user limits, always keeping the newest one
+        while len(entry.messages) > 1 and (
+            len(entry.messages) > self.max_messages or entry.tokens > self.max_tokens
+        ):
+            removed = entry.messages.pop(0)
+            entry.size -= estimate_message_bytes(removed)
+            entry.tokens -= estimate_message_tokens(removed)
+
+        self._bytes += entry.size - previous_size
+        self._touch(user_id, entry)
+        self._evict(keep=user_id)
+
+    async def clear(self, user_id: int):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    async def get_summary(self, user_id: int) -> str:
+        entry = self._entries.get(user_id)
+        return entry.summary if entry is not None else ""
+
+    async def set_summary(self, user_id: int, summary: str):
+        """Set the summary directly (used when loading from a durable backend)."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            entry = self._entries[user_id] = _Entry()
+        self._replace_summary(entry, summary)
+
+    async def compact(self, user_id: int, folded: List[Dict[str, str]], summary: str) -> bool:
+        entry = self._entries.get(user_id)
+        if entry is None or entry.messages[:len(folded)] != folded:
+            return False
+
+        for message in folded:
+            entry.size -= estimate_message_bytes(message)
+            entry.tokens -= estimate_message_tokens(message)
+            self._bytes -= estimate_message_bytes(message)
+        del entry.messages[:len(folded)]
+        self._replace_summary(entry, summary)
+        return True
+
+    def _replace_summary(self, entry: _Entry, summary: str):
+        delta = len(summary.encode("utf-8")) - len(entry.summary.encode("utf-8"))
+        entry.summary = summary
+        entry.size += delta
+        self._bytes += delta
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "users": len(self._entries),
+            "messages": sum(len(e.messages) for e in self._entries.values()),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+        }
+
+    def _touch(self, user_id: int, entry: _Entry):
+        entry.last_used = time.monotonic()
+        self._entries.move_to_end(user_id)
+
+    def _evict(self, keep: int = None):
+        """Drop idle conversations, then least recently used ones over budget."""
+        now = time.monotonic()
+        while self._entries:
+            user_id, entry = next(iter(self._entries.items()))
+            if now - entry.last_used < self.idle_ttl:
+                break
+            self._drop(user_id)
+
+        while self._entries and (len(self._entries) > self.max_users or self._bytes > self.max_bytes):
+            user_id = next(iter(self._entries))
+            if user_id == keep:
+                break
+            self._drop(user_id)
+
+    def _drop(self, user_id: int):
+        entry = self._entries.pop(user_id)
+        self._bytes -= entry.size
+        self.evictions += 1
+        logger.debug(f"Evicted conversation of user {user_id}")
+
+
+def create_conversation_store() -> ConversationStore:
+    """Create the conversation store configured in settings."""
+    memory_store = InMemoryConversationStore(
+        max_messages=settings.max_conversation_history * 2,
+        max_tokens=settings.conversation_max_tokens,
+        max_users=settings.conversation_max_users,
+        idle_ttl=settings.conversation_idle_ttl,
+        max_bytes=settings.conversation_max_bytes,
+    )
+
+    if settings.conversation_backend == "sqlite":
+        from .sqlite_store import SQLiteConversationStore
+        # The in-memory store becomes a cache of recently active conversations
+        return SQLiteConversationStore(
+            path=settings.conversation_db_path,
+            cache=memory_store,
+            flush_interval=settings.conversation_flush_interval,
+        )
+
+    if settings.conversation_backend != "memory":
+        logger.warning(
+            f"Unknown CONVERSATION_BACKEND '{settings.conversation_backend}', using memory"
+        )
+    return memory_store
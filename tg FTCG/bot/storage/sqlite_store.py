@@ -0,0 +1,265 @@
+"""
+SQLite-backed conversation store.
+
+Recent conversations are served from an in-memory LRU cache. A user's
+history is loaded from the database on their first message, and writes are
+queued and flushed in batches by a background task, so replies never wait
+on disk I/O.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from .conversation_store import ConversationStore, InMemoryConversationStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_user ON messages (user_id, id);
+CREATE TABLE IF NOT EXISTS summaries (
+    user_id INTEGER PRIMARY KEY,
+    summary TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+# Queued write: (sequence number, op, user_id, payload) where op is
+# "append" (payload: message), "clear" (payload: None) or
+# "compact" (payload: {"keep": number of newest messages kept, "summary": text})
+PendingOp = Tuple[int, str, int, Optional[Dict]]
+
+
+class SQLiteConversationStore(ConversationStore):
+    """Durable conversation store using SQLite in WAL mode with write-behind batching."""
+
+    def __init__(self, path: str, cache: InMemoryConversationStore, flush_interval: float):
+        """
+        Args:
+            path: Database file location
+            cache: In-memory store holding recently active conversations
+            flush_interval: Seconds to wait while collecting writes into one batch
+        """
+        self.path = Path(path)
+        self.cache = cache
+        self.max_messages = cache.max_messages
+        self.flush_interval = flush_interval
+
+        self._conn: Optional[sqlite3.Connection] = None
+        # A single worker thread serializes all access to the connection
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-store")
+        self._pending: List[PendingOp] = []
+        self._writing: List[PendingOp] = []
+        self._seq = 0
+        # Sequence number of the last operation committed to disk (updated by the worker thread)
+        self._written_seq = 0
+        self._loading: Dict[int, asyncio.Task] = {}
+        self._writer: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+        self.loads = 0
+        self.batches_written = 0
+        self.rows_written = 0
+
+    async def _run_db(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def start(self):
+        if self._conn is None:
+            await self._run_db(self._open)
+        if self._writer is None:
+            self._wake = asyncio.Event()
+            self._writer = asyncio.create_task(self._write_loop())
+        logger.info(f"SQLite conversation store ready at {self.path}")
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+
+        # Write whatever is still queued before shutting down
+        await self._flush()
+        if self._conn is not None:
+            await self._run_db(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
+
+    async def get_history(self, user_id: int) -> List[Dict[str, str]]:
+        if user_id not in self.cache:
+            task = self._loading.get(user_id)
+            if task is None:
+                task = self._loading[user_id] = asyncio.create_task(self._load_user(user_id))
+                task.add_done_callback(lambda _: self._loading.pop(user_id, None))
+            await task
+        return await self.cache.get_history(user_id)
+
+    async def append(self, user_id: int, messages: List[Dict[str, str]]):
+        # Make sure older turns are loaded first so the cache keeps the right order
+        if user_id not in self.cache:
+            await self.get_history(user_id)
+        await self.cache.append(user_id, messages)
+        for message in messages:
+            self._queue("append", user_id, message)
+        self._notify_writer()
+
+    async def clear(self, user_id: int):
+        loading = self._loading.get(user_id)
+        if loading is not None:
+            await loading
+        await self.cache.clear(user_id)
+        # An empty cache entry marks the user as loaded, so nothing is read back from disk
+        await self.cache.append(user_id, [])
+        self._queue("clear", user_id, None)
+        self._notify_writer()
+
+    async def get_summary(self, user_id: int) -> str:
+        if user_id not in self.cache:
+            await self.get_history(user_id)
+        return await self.cache.get_summary(user_id)
+
+    async def compact(self, user_id: int, folded: List[Dict[str, str]], summary: str) -> bool:
+        if not await self.cache.compact(user_id, folded, summary):
+            return False
+        keep = len(await self.cache.get_history(user_id))
+        self._queue("compact", user_id, {"keep": keep, "summary": summary})
+        self._notify_writer()
+        return True
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = dict(self.cache.get_stats())
+        stats.update({
+            "pending_writes": len(self._pending),
+            "loads": self.loads,
+            "batches_written": self.batches_written,
+            "rows_written": self.rows_written,
+        })
+        return stats
+
+    async def _load_user(self, user_id: int):
+        """Read the user's recent turns from disk into the cache."""
+        if self._conn is not None:
+            messages, summary, read_seq = await self._run_db(self._read_recent, user_id)
+        else:
+            messages, summary, read_seq = [], "", self._written_seq
+        self.loads += 1
+
+        # Apply writes that were not yet on disk when the rows were read
+        for seq, op, pending_user, payload in self._writing + self._pending:
+            if pending_user != user_id or seq <= read_seq:
+                continue
+            if op == "clear":
+                messages, summary = [], ""
+            elif op == "compact":
+                messages = messages[-payload["keep"]:] if payload["keep"] else []
+                summary = payload["summary"]
+            else:
+                messages.append(payload)
+
+        await self.cache.append(user_id, messages[-self.max_messages:])
+        if summary:
+            await self.cache.set_summary(user_id, summary)
+
+    def _queue(self, op: str, user_id: int, payload: Optional[Dict]):
+        self._seq += 1
+        self._pending.append((self._seq, op, user_id, payload))
+
+    def _notify_writer(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _write_loop(self):
+        """Collect queued writes for flush_interval seconds, then write them in one batch."""
+        while True:
+            await self._wake.wait()
+            await asyncio.sleep(self.flush_interval)
+            self._wake.clear()
+            try:
+                await self._flush()
+            except Exception as e:
+                logger.error(f"Failed to write conversation history: {e}")
+                self._wake.set()
+
+    async def _flush(self):
+        if not self._pending or self._conn is None:
+            return
+        batch = self._writing = self._pending
+        self._pending = []
+        try:
+            await self._run_db(self._write_batch, batch)
+        except Exception:
+            # Put the batch back so it is retried with the next flush
+            self._pending = batch + self._pending
+            raise
+        finally:
+            self._writing = []
+        self.batches_written += 1
+        self.rows_written += len(batch)
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._conn = conn
+
+    def _read_recent(self, user_id: int) -> Tuple[List[Dict[str, str]], str, int]:
+        """Return the user's recent messages, summary and the last sequence number on disk."""
+        rows = self._conn.execute(
+            "SELECT role, content FROM messages WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+            (user_id, self.max_messages),
+        ).fetchall()
+        messages = [{"role": role, "content": content} for role, content in reversed(rows)]
+        summary_row = self._conn.execute(
+            "SELECT summary FROM summaries WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return messages, summary_row[0] if summary_row else "", self._written_seq
+
+    def _write_batch(self, batch: List[PendingOp]):
+        now = time.time()
+        touched = set()
+        with self._conn:
+            for _, op, user_id, payload in batch:
+                if op == "clear":
+                    self._conn.execute("DELETE FROM messages WHERE user_id = ?", (user_id,))
+                    self._conn.execute("DELETE FROM summaries WHERE user_id = ?", (user_id,))
+                elif op == "compact":
+                    self._conn.execute(
+                        "DELETE FROM messages WHERE user_id = ? AND id NOT IN "
+                        "(SELECT id FROM messages WHERE user_id = ? ORDER BY id DESC LIMIT ?)",
+                        (user_id, user_id, payload["keep"]),
+                    )
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO summaries (user_id, summary, updated) VALUES (?, ?, ?)",
+                        (user_id, payload["summary"], now),
+                    )
+                else:
+                    self._conn.execute(
+                        "INSERT INTO messages (user_id, role, content, created) VALUES (?, ?, ?, ?)",
+                        (user_id, payload["role"], payload["content"], now),
+                    )
+                touched.add(user_id)
+
+            # Only the most recent turns are ever read back, so drop the rest
+            for user_id in touched:
+                self._conn.execute(
+                    "DELETE FROM messages WHERE user_id = ? AND id NOT IN "
+                    "(SELECT id FROM messages WHERE user_id = ? ORDER BY id DESC LIMIT ?)",
+                    (user_id, user_id, self.max_messages),
+                )
+        self._written_seq = batch[-1][0]
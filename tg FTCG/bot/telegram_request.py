@@ -0,0 +1,52 @@
+"""
+Instrumented HTTP transport for the Telegram Bot API.
+"""
+
+import importlib.util
+import logging
+import time
+import httpx
+from telegram.request import HTTPXRequest
+from bot import metrics
+from bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest that records the duration of every Bot API call by method."""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        started = time.monotonic()
+        try:
+            return await super().do_request(url, method, *args, **kwargs)
+        finally:
+            metrics.TELEGRAM_API_LATENCY.observe(time.monotonic() - started, method=api_method)
+
+
+def http2_available() -> bool:
+    """Return whether httpx can speak HTTP/2 (the h2 package is installed)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_telegram_request(pool_size: int) -> InstrumentedHTTPXRequest:
+    """Create a Bot API transport with a connection pool of pool_size, tuned from settings."""
+    http_version = settings.telegram_http_version
+    if http_version != "1.1" and not http2_available():
+        logger.warning("HTTP/2 for Telegram needs `pip install \"httpx[http2]\"`, using HTTP/1.1")
+        http_version = "1.1"
+
+    return InstrumentedHTTPXRequest(
+        connection_pool_size=pool_size,
+        pool_timeout=settings.telegram_pool_timeout,
+        http_version=http_version,
+        httpx_kwargs={
+            # Keep every pooled connection alive between bursts instead of httpx's 20 for 5s
+            "limits": httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=settings.telegram_keepalive_expiry,
+            ),
+        },
+    )
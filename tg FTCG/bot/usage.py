@@ -0,0 +1,223 @@
+"""
+Token and cost accounting per user, chat, learning topic, feature and model.
+
+Handlers describe what an LLM call is for with usage_scope() (who asked, in
+which chat, for which feature or lesson topic). The scope is kept in a
+context variable, so it follows the call through the router, single-flight
+and hedging tasks down to the provider, which reports the tokens and
+estimated cost of every finished call to the tracker here. Totals are kept
+in memory, logged and optionally saved to a JSON file every flush interval,
+exported as metrics (except per user and chat, which would be too many
+series) and shown to admins by /usage.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from bot import metrics
+from bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Dimensions usage is aggregated by
+DIMENSIONS = ("user", "chat", "topic", "feature", "model")
+
+# Counters kept for every key of a dimension
+FIELDS = ("calls", "prompt", "completion", "cached", "cost")
+
+# Keys kept per dimension; beyond that the cheapest are dropped at the next flush
+MAX_KEYS_PER_DIMENSION = 50_000
+
+_scope: contextvars.ContextVar[Dict[str, object]] = contextvars.ContextVar("usage_scope", default={})
+
+
+@contextmanager
+def usage_scope(**attributes):
+    """
+    Attribute LLM calls made inside the block (and tasks started from it),
+    e.g. usage_scope(user_id=1, chat_id=1, feature="message"). Attributes of
+    enclosing scopes are kept unless overridden; None removes one.
+    """
+    merged = {**_scope.get(), **attributes}
+    token = _scope.set({name: value for name, value in merged.items() if value is not None})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def _empty() -> Dict[str, float]:
+    return {field: 0 for field in FIELDS}
+
+
+class UsageTracker:
+    """In-memory usage totals with periodic logging and persistence."""
+
+    def __init__(self, flush_interval: float, path: Optional[str] = None):
+        """
+        Args:
+            flush_interval: Seconds between flushes (log line and save)
+            path: Optional JSON file used to keep totals across restarts
+        """
+        self.flush_interval = flush_interval
+        self.path = Path(path) if path else None
+
+        # Format: {dimension: {key: {"calls": n, "prompt": n, ..., "cost": usd}}}
+        self._totals: Dict[str, Dict[str, Dict[str, float]]] = {d: {} for d in DIMENSIONS}
+        self.since = time.time()
+        # Totals recorded since the last flush
+        self._recent = _empty()
+        self._task: Optional[asyncio.Task] = None
+
+        self._load()
+
+    def record(self, model: str, usage: Optional[Dict[str, int]], cost: float):
+        """Add the usage of a finished LLM call, attributed to the current scope."""
+        if not usage:
+            return
+        scope = _scope.get()
+        keys = {
+            "user": scope.get("user_id"),
+            "chat": scope.get("chat_id"),
+            "topic": scope.get("topic"),
+            "feature": scope.get("feature", "other"),
+            "model": model,
+        }
+        delta = {
+            "calls": 1,
+            "prompt": usage.get("prompt") or 0,
+            "completion": usage.get("completion") or 0,
+            "cached": usage.get("cached") or 0,
+            "cost": cost,
+        }
+        for dimension, key in keys.items():
+            if key is None:
+                continue
+            totals = self._totals[dimension].setdefault(str(key), _empty())
+            for field, value in delta.items():
+                totals[field] += value
+        for field, value in delta.items():
+            self._recent[field] += value
+
+        feature, topic = str(keys["feature"]), str(keys["topic"] or "")
+        for kind in ("prompt", "completion", "cached"):
+            if delta[kind]:
+                metrics.USAGE_TOKENS.inc(delta[kind], feature=feature, topic=topic, kind=kind)
+        if cost:
+            metrics.USAGE_COST.inc(cost, feature=feature, topic=topic)
+
+    def get(self, dimension: str, key) -> Dict[str, float]:
+        """Return the totals of one user, chat, topic, feature or model."""
+        return dict(self._totals[dimension].get(str(key), _empty()))
+
+    def top(self, dimension: str, limit: int = 5) -> List[Tuple[str, Dict[str, float]]]:
+        """Return the keys of a dimension with the highest cost (then tokens) first."""
+        entries = self._totals[dimension].items()
+        ranked = sorted(entries, key=lambda item: (item[1]["cost"], item[1]["prompt"] + item[1]["completion"]),
+                        reverse=True)
+        return [(key, dict(totals)) for key, totals in ranked[:limit]]
+
+    def total(self) -> Dict[str, float]:
+        """Return the totals over all calls."""
+        result = _empty()
+        for totals in self._totals["model"].values():
+            for field in FIELDS:
+                result[field] += totals[field]
+        return result
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return the number of keys tracked per dimension."""
+        return {dimension: len(keys) for dimension, keys in self._totals.items()}
+
+    def start(self):
+        """Flush totals every flush interval in a background task."""
+        if self._task is None and self.flush_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and flush one last time."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self):
+        """Log usage since the last flush and save the totals."""
+        recent, self._recent = self._recent, _empty()
+        if recent["calls"]:
+            logger.info(
+                f"LLM usage: {recent['calls']} calls, {recent['prompt']} prompt "
+                f"({recent['cached']} cached) and {recent['completion']} completion tokens, "
+                f"${recent['cost']:.4f}"
+            )
+        self._trim()
+
+        if self.path and recent["calls"]:
+            try:
+                await asyncio.to_thread(self._save, self._snapshot())
+            except OSError as e:
+                logger.warning(f"Could not save usage totals to {self.path}: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _trim(self):
+        """Drop the cheapest keys of dimensions that grew too large."""
+        for dimension, keys in self._totals.items():
+            excess = len(keys) - MAX_KEYS_PER_DIMENSION
+            if excess > 0:
+                cheapest = sorted(keys, key=lambda key: keys[key]["cost"])[:excess]
+                for key in cheapest:
+                    del keys[key]
+
+    def _load(self):
+        """Load saved totals, ignoring a missing or corrupt file."""
+        if not self.path or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.since = data.get("since", self.since)
+            for dimension in DIMENSIONS:
+                for key, totals in data.get("totals", {}).get(dimension, {}).items():
+                    self._totals[dimension][key] = {**_empty(), **totals}
+            logger.info(f"Loaded usage totals since {time.ctime(self.since)} from {self.path}")
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable usage file {self.path}: {e}")
+
+    def _snapshot(self) -> Dict:
+        return {
+            "since": self.since,
+            "totals": {dimension: {key: dict(totals) for key, totals in keys.items()}
+                       for dimension, keys in self._totals.items()},
+        }
+
+    def _save(self, data: Dict):
+        """Write totals to disk atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+_tracker: Optional[UsageTracker] = None
+
+
+def get_usage_tracker() -> UsageTracker:
+    """Return the tracker shared by the whole process, creating it on first use."""
+    global _tracker
+    if _tracker is None:
+        _tracker = UsageTracker(settings.usage_flush_interval, settings.usage_path)
+    return _tracker
@@ -0,0 +1,166 @@
+"""
+Minimal asyncio HTTP server.
+
+Serves Telegram webhook updates and health checks on a single port inside
+the bot's event loop, without an extra thread or web framework.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+KEEP_ALIVE_TIMEOUT = 30
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class Request:
+    """An incoming HTTP request."""
+
+    def __init__(self, method: str, path: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+
+
+class Response:
+    """An HTTP response returned by a route handler."""
+
+    def __init__(self, status: int = 200, body: bytes = b"", content_type: str = "text/plain"):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class WebServer:
+    """Tiny HTTP/1.1 server with exact-path routing and keep-alive support."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._routes: Dict[Tuple[str, str], Handler] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections = set()
+
+    def add_route(self, method: str, path: str, handler: Handler):
+        """Register a handler. GET routes also answer HEAD requests."""
+        self._routes[(method.upper(), path)] = handler
+
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, limit=MAX_HEADER_BYTES
+        )
+        if not self.port:
+            # An ephemeral port (0) was requested; report the one actually bound
+            self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Web server listening on port {self.port}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Close idle keep-alive connections so shutdown doesn't wait for them
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), timeout=KEEP_ALIVE_TIMEOUT
+                    )
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._write(writer, Response(400, b"Headers too large"), keep_alive=False)
+                    return
+
+                keep_alive = await self._handle_request(head, reader, writer)
+                if not keep_alive:
+                    return
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _handle_request(self, head: bytes, reader, writer) -> bool:
+        """Parse and answer one request. Returns whether the connection stays open."""
+        try:
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, version = lines[0].split(" ", 2)
+            headers = {}
+            for line in lines[1:]:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            await self._write(writer, Response(400, b"Bad request"), keep_alive=False)
+            return False
+
+        if length < 0:
+            await self._write(writer, Response(400, b"Bad request"), keep_alive=False)
+            return False
+        if length > MAX_BODY_BYTES:
+            await self._write(writer, Response(413, b"Payload too large"), keep_alive=False)
+            return False
+        try:
+            body = await reader.readexactly(length) if length else b""
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return False
+
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        path = target.split("?", 1)[0]
+        request = Request(method.upper(), path, headers, body)
+
+        response = await self._dispatch(request)
+        await self._write(writer, response, keep_alive, include_body=request.method != "HEAD")
+        return keep_alive
+
+    async def _dispatch(self, request: Request) -> Response:
+        method = "GET" if request.method == "HEAD" else request.method
+        handler = self._routes.get((method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self._routes):
+                return Response(405, b"Method not allowed")
+            return Response(404, b"Not found")
+
+        try:
+            return await handler(request)
+        except Exception as e:
+            logger.error(f"Error handling {request.method} {request.path}: {e}")
+            return Response(500, b"Internal server error")
+
+    async def _write(self, writer, response: Response, keep_alive: bool, include_body: bool = True):
+        reason = REASONS.get(response.status, "Unknown")
+        head = (
+            f"HTTP/1.1 {response.status} {reason}\r\n"
+            f"Content-Type: {response.content_type}\r\n"
+            f"Content-Length: {len(response.body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        ).encode("latin-1")
+        writer.write(head + (response.body if include_body else b""))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
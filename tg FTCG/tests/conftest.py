@@ -0,0 +1,13 @@
+"""
+Shared test setup: the bot's settings require credentials, so placeholder
+values are set before any bot module is imported.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:TEST")
+os.environ.setdefault("GEMINI_API_KEY", "test")
@@ -0,0 +1,53 @@
+"""Tests for Gemini context caching of system instructions."""
+
+import asyncio
+from types import SimpleNamespace
+from bot.ai.context_cache import ContextCache
+from bot.ai.prompts import SYSTEM_PROMPT
+
+MODEL = "gemini-2.5-flash"
+
+
+class FakeCaches:
+    def __init__(self):
+        self.created = 0
+
+    async def create(self, model, config=None):
+        self.created += 1
+        return SimpleNamespace(name=f"cachedContents/{self.created}")
+
+
+def make_client():
+    return SimpleNamespace(aio=SimpleNamespace(caches=FakeCaches()))
+
+
+def test_default_prompt_is_sent_inline():
+    cache = ContextCache(ttl=3600)
+    client = make_client()
+
+    assert not cache.is_cacheable(MODEL, SYSTEM_PROMPT)
+    assert asyncio.run(cache.get(client, MODEL, SYSTEM_PROMPT)) is None
+    assert client.aio.caches.created == 0
+
+
+def test_too_small_instruction_is_sized_once(monkeypatch):
+    cache = ContextCache(ttl=3600)
+    counted = []
+    monkeypatch.setattr("bot.ai.context_cache.estimate_tokens", lambda text: counted.append(text) or 0)
+
+    for _ in range(3):
+        assert not cache.is_cacheable(MODEL, SYSTEM_PROMPT)
+    assert len(counted) == 1
+
+
+def test_long_instruction_is_uploaded_once():
+    cache = ContextCache(ttl=3600)
+    client = make_client()
+    instruction = "Answer like a mentor. " * 300
+
+    async def scenario():
+        return [await cache.get(client, MODEL, instruction) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == ["cachedContents/1"] * 3
+    assert client.aio.caches.created == 1
+    assert cache.get_stats()["hits"] == 2
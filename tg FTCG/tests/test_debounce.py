@@ -0,0 +1,40 @@
+"""Tests for merging messages a user sends in quick succession."""
+
+import asyncio
+from bot.debounce import MessageDebouncer
+
+
+def test_single_message_is_answered_right_away():
+    async def scenario():
+        debouncer = MessageDebouncer(window=5.0)
+        return await asyncio.wait_for(debouncer.collect("user", "What is a servo?"), 0.1)
+
+    assert asyncio.run(scenario()) == "What is a servo?"
+
+
+def test_follow_up_supersedes_answer_and_merges():
+    async def scenario():
+        debouncer = MessageDebouncer(window=0.05)
+        answers = []
+
+        async def send(text):
+            try:
+                merged = await debouncer.collect("user", text)
+                if merged is not None:
+                    await asyncio.sleep(0.2)
+                    answers.append(merged)
+            finally:
+                debouncer.release("user")
+
+        first = asyncio.create_task(send("How do I"))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(send("program a servo?"))
+        await asyncio.sleep(0.01)
+        third = asyncio.create_task(send("In Java"))
+        await asyncio.gather(first, second, third, return_exceptions=True)
+        return answers, first.cancelled(), debouncer.get_stats()
+
+    answers, cancelled, stats = asyncio.run(scenario())
+    assert answers == ["How do I\nprogram a servo?\nIn Java"]
+    assert cancelled
+    assert stats == {"pending": 0, "merged": 2, "superseded": 1}
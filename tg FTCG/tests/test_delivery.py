@@ -0,0 +1,49 @@
+"""Tests for streaming answers into Telegram messages."""
+
+import asyncio
+from bot.config import settings
+from bot.handlers.delivery import ReplyDelivery
+from bot.handlers.rendering import MESSAGE_LIMIT
+
+
+class FakeMessage:
+    """Records the texts sent and edited through it."""
+
+    def __init__(self, sent=None):
+        self.sent = sent if sent is not None else []
+
+    async def reply_text(self, text, **kwargs):
+        self.sent.append(text)
+        return FakeMessage(self.sent)
+
+    async def edit_text(self, text, **kwargs):
+        self.sent.append(text)
+        return self
+
+
+def stream(chunks, monkeypatch):
+    monkeypatch.setattr(settings, "reply_preview_delay", 0.0)
+    monkeypatch.setattr(settings, "stream_edit_interval", 0.0)
+
+    async def generate():
+        for chunk in chunks:
+            yield chunk
+            await asyncio.sleep(0)
+
+    message = FakeMessage()
+    text = asyncio.run(ReplyDelivery(message).stream(generate()))
+    return text, message.sent
+
+
+def test_unchanged_preview_is_not_edited(monkeypatch):
+    text, sent = stream(["Hello", "  ", "\n", " world"], monkeypatch)
+
+    assert text == "Hello  \n world"
+    assert sent == ["Hello ▌", "Hello  \n world ▌"]
+
+
+def test_capped_preview_is_not_edited_again(monkeypatch):
+    text, sent = stream(["a" * MESSAGE_LIMIT] + ["b" * 100] * 5, monkeypatch)
+
+    assert len(text) == MESSAGE_LIMIT + 500
+    assert sent == ["a" * MESSAGE_LIMIT + " ▌"]
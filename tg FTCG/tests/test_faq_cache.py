@@ -0,0 +1,45 @@
+"""Tests for the semantic FAQ answer cache."""
+
+import pytest
+from bot.ai.faq_cache import FAQCache
+
+pytest.importorskip("numpy")
+
+
+def make_cache():
+    return FAQCache(threshold=0.95, max_entries=10, ttl=3600)
+
+
+def test_rephrased_question_reuses_answer():
+    cache = make_cache()
+    cache.put("What is a motor controller?", "answer")
+
+    assert cache.get("whats a motor controller") == "answer"
+    assert cache.get("what's the motor controller?") == "answer"
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Can I use REV motors in FTC?", "Can I use REV motors in FRC?"),
+    ("What does rule G301 say?", "What does rule G302 say?"),
+    ("How many motors can a robot have in 2024?", "How many motors can a robot have in 2025?"),
+    ("Java vs Python", "Python vs Java"),
+    ("How do I use a servo?", "Can I use a servo?"),
+    ("What is the difference between a servo and a motor?", "Is a servo a motor?"),
+    ("What is my team number?", "What is your team number?"),
+    ("Explain encoders", "Compare encoders"),
+])
+def test_different_question_is_not_served(cached, asked):
+    cache = make_cache()
+    cache.put(cached, "answer")
+
+    assert cache.get(asked) is None
+
+
+def test_put_keeps_entries_with_different_keys():
+    cache = make_cache()
+    cache.put("Can I use REV motors in FTC?", "ftc")
+    cache.put("Can I use REV motors in FRC?", "frc")
+
+    assert cache.get_stats()["entries"] == 2
+    assert cache.get("Can I use REV motors in FTC?") == "ftc"
+    assert cache.get("Can I use REV motors in FRC?") == "frc"
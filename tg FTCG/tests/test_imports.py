@@ -0,0 +1,21 @@
+"""Tests that importing the bot has no side effects."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_importing_handlers_needs_no_settings():
+    env = {k: v for k, v in os.environ.items() if k not in ("TELEGRAM_BOT_TOKEN", "GEMINI_API_KEY")}
+    code = (
+        "import sys\n"
+        "import bot.handlers.rendering, bot.main\n"
+        "from bot.ai import router\n"
+        "assert 'numpy' not in sys.modules\n"
+        "assert not router._shared_routers\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
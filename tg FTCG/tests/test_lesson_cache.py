@@ -0,0 +1,61 @@
+"""Tests for the cache of generated learning-path lessons."""
+
+import asyncio
+import json
+import pytest
+from bot.ai.lesson_cache import LessonCache
+from bot.ai.provider import EMPTY_REPLY
+
+TOPIC = "basics_what_is_first"
+
+
+class FakeClient:
+    model = "gemini-2.5-flash-lite"
+
+    def __init__(self, reply):
+        self.reply = reply
+
+    async def generate(self, **kwargs):
+        return self.reply
+
+
+def make_cache(reply, path=None, ttl=3600):
+    return LessonCache(FakeClient(reply), [TOPIC], ttl=ttl, refresh_interval=3600, path=path)
+
+
+def test_lesson_is_cached_and_saved(tmp_path):
+    path = tmp_path / "lessons.json"
+    cache = make_cache("FIRST is a robotics community.", path=str(path))
+
+    assert asyncio.run(cache.get_lesson(TOPIC)) == "FIRST is a robotics community."
+    assert cache.has_lesson(TOPIC)
+    assert path.exists()
+
+
+def test_empty_reply_is_not_cached(tmp_path):
+    path = tmp_path / "lessons.json"
+    cache = make_cache(EMPTY_REPLY, path=str(path))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_lesson(TOPIC))
+    assert not cache.has_lesson(TOPIC)
+    assert not path.exists()
+
+
+def test_empty_refresh_keeps_previous_lesson():
+    cache = make_cache("Old lesson")
+    asyncio.run(cache.get_lesson(TOPIC))
+
+    cache.ai_client.reply = EMPTY_REPLY
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache._refresh(TOPIC))
+    assert cache.get_cached(TOPIC) == "Old lesson"
+
+
+def test_saved_empty_replies_are_ignored(tmp_path):
+    path = tmp_path / "lessons.json"
+    path.write_text(json.dumps({
+        f"{TOPIC}|{FakeClient.model}": {"text": EMPTY_REPLY, "created": 0},
+    }), encoding="utf-8")
+
+    assert not make_cache("unused", path=str(path)).has_lesson(TOPIC)
@@ -0,0 +1,17 @@
+"""Tests for grounding answers in game manual passages."""
+
+from bot.ai.gemini_client import GeminiClient
+from bot.ai.prompts import SYSTEM_PROMPT, get_manual_prompt
+
+PASSAGES = [{"source": "GM2 p. 41", "text": "<G301> Robots may not extend beyond 42 inches."}]
+
+
+def test_manual_passages_keep_the_mentor_persona():
+    question = "How far can my robot extend?"
+    message = get_manual_prompt(PASSAGES, question)
+
+    system_instruction, contents = GeminiClient(model="gemini-2.5-flash")._build_request(message)
+
+    assert system_instruction == SYSTEM_PROMPT
+    assert "<G301>" in contents
+    assert contents.rstrip().endswith(f"Question: {question}\nModel:")
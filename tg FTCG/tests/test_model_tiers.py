@@ -0,0 +1,28 @@
+"""Tests for the local classifier that picks a model tier per question."""
+
+import pytest
+from bot.ai.model_tiers import LITE, PRO, STANDARD, classify_question
+
+
+@pytest.mark.parametrize("question", [
+    "Can I use motors (REV) in FTC (2024)?",
+    "How many motor(s) can one hub drive?",
+])
+def test_prose_parentheticals_are_not_code(question):
+    assert classify_question(question) == LITE
+
+
+@pytest.mark.parametrize("question", [
+    "Why does motor.setPower(0.5) do nothing?",
+    "What does telemetry.update() do?",
+])
+def test_calls_are_code(question):
+    assert classify_question(question) == STANDARD
+
+
+def test_small_talk_is_lite():
+    assert classify_question("thanks!") == LITE
+
+
+def test_debugging_code_is_pro():
+    assert classify_question("How do I debug this error in my PID loop: arm.setPower(pid.calculate());") == PRO
@@ -0,0 +1,94 @@
+"""Tests for the request pool, retries and timeouts of LLM providers."""
+
+import asyncio
+import time
+from bot.ai.provider import PooledProvider
+from bot.config import settings
+
+
+class SlowProvider(PooledProvider):
+    """Provider whose calls never finish."""
+
+    name = "slow"
+
+    def __init__(self, timeout):
+        super().__init__("slow-model", max_concurrency=4, timeout=timeout, single_flight=False)
+        self.calls = 0
+
+    def _build_request(self, user_message, conversation_history, system_prompt, summary):
+        return user_message
+
+    async def _complete(self, request):
+        self.calls += 1
+        await asyncio.sleep(10)
+
+
+def configure(monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_retries", 2)
+    monkeypatch.setattr(settings, "llm_retry_base_delay", 0.0)
+    monkeypatch.setattr(settings, "circuit_failure_threshold", 0)
+
+
+def test_timeout_covers_all_retries(monkeypatch):
+    configure(monkeypatch)
+    provider = SlowProvider(timeout=0.2)
+
+    async def scenario():
+        started = time.monotonic()
+        try:
+            await provider.generate("question")
+        except asyncio.TimeoutError:
+            return time.monotonic() - started
+        raise AssertionError("expected a timeout")
+
+    assert asyncio.run(scenario()) < 0.35
+
+
+def test_streaming_timeout_covers_all_retries(monkeypatch):
+    configure(monkeypatch)
+    provider = SlowProvider(timeout=0.2)
+
+    async def scenario():
+        started = time.monotonic()
+        try:
+            async for _ in provider.stream("question"):
+                pass
+        except asyncio.TimeoutError:
+            return time.monotonic() - started
+        raise AssertionError("expected a timeout")
+
+    assert asyncio.run(scenario()) < 0.35
+
+
+class CountingProvider(PooledProvider):
+    """Provider recording how many of its pool's calls run at once."""
+
+    name = "counting"
+    active = 0
+    peak = 0
+
+    def __init__(self, model, pool):
+        super().__init__(model, max_concurrency=2, timeout=5, single_flight=False, pool=pool)
+
+    def _build_request(self, user_message, conversation_history, system_prompt, summary):
+        return user_message
+
+    async def _complete(self, request):
+        CountingProvider.active += 1
+        CountingProvider.peak = max(CountingProvider.peak, CountingProvider.active)
+        await asyncio.sleep(0.02)
+        CountingProvider.active -= 1
+        return "answer", None
+
+
+def test_providers_of_one_pool_share_its_limit(monkeypatch):
+    configure(monkeypatch)
+    monkeypatch.setattr(CountingProvider, "peak", 0)
+    lite = CountingProvider("lite-model", pool="shared-test")
+    pro = CountingProvider("pro-model", pool="shared-test")
+
+    async def scenario():
+        await asyncio.gather(*(provider.generate(f"q{i}") for i in range(4) for provider in (lite, pro)))
+
+    asyncio.run(scenario())
+    assert CountingProvider.peak == 2
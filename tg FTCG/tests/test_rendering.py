@@ -0,0 +1,20 @@
+"""Tests for rendering model Markdown as Telegram HTML."""
+
+import pytest
+from bot.handlers.rendering import to_html
+
+
+@pytest.mark.parametrize("markdown, expected", [
+    ("**bold** and ~~struck~~", "<b>bold</b> and <s>struck</s>"),
+    ("~~a **b** c~~", "<s>a <b>b</b> c</s>"),
+    ("__bold text__", "<b>bold text</b>"),
+    ("Override __init__ in your OpMode", "Override __init__ in your OpMode"),
+    ("Edit __init__.py", "Edit __init__.py"),
+    ("Call my_motor_power", "Call my_motor_power"),
+])
+def test_emphasis(markdown, expected):
+    assert to_html(markdown) == expected
+
+
+def test_overlapping_emphasis_stays_well_nested():
+    assert to_html("**a ~~b** c~~") == "<b>a ~~b</b> c~~"
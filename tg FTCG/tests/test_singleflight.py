@@ -0,0 +1,71 @@
+"""Tests for single-flight coalescing of identical LLM requests."""
+
+import asyncio
+from bot.ai.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def factory():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        results = await asyncio.gather(*(flight.run("key", factory) for _ in range(3)))
+        return results, calls
+
+    results, calls = asyncio.run(scenario())
+    assert results == ["answer"] * 3
+    assert calls == 1
+
+
+def test_caller_after_abandoned_call_starts_a_new_one():
+    async def scenario():
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                # Cleanup (e.g. closing the connection) takes a moment
+                await asyncio.sleep(0.05)
+                raise
+            return "never"
+
+        async def fast():
+            return "answer"
+
+        first = asyncio.create_task(flight.run("key", slow))
+        await started.wait()
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        # The abandoned call is still cleaning up when the next caller arrives
+        return await flight.run("key", fast)
+
+    assert asyncio.run(scenario()) == "answer"
+
+
+def test_stream_caller_after_abandoned_stream_starts_a_new_one():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def slow():
+            yield "partial"
+            await asyncio.sleep(10)
+
+        async def fast():
+            yield "a"
+            yield "b"
+
+        chunks = flight.stream("key", slow)
+        assert await chunks.__anext__() == "partial"
+        await chunks.aclose()
+        return [chunk async for chunk in flight.stream("key", fast)]
+
+    assert asyncio.run(scenario()) == ["a", "b"]
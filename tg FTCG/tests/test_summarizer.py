@@ -0,0 +1,74 @@
+"""Tests for rolling conversation summarization."""
+
+import asyncio
+import pytest
+from bot.ai.provider import EMPTY_REPLY
+from bot.ai.summarizer import ConversationSummarizer
+
+
+class FakeClient:
+    model = "gemini-2.5-flash"
+
+    def __init__(self, reply):
+        self.reply = reply
+
+    async def generate(self, **kwargs):
+        return self.reply
+
+
+class FakeStore:
+    def __init__(self, history):
+        self.history = history
+        self.summary = "Earlier summary"
+
+    async def get_history(self, user_id):
+        return list(self.history)
+
+    async def get_summary(self, user_id):
+        return self.summary
+
+    async def compact(self, user_id, folded, summary):
+        self.history = self.history[len(folded):]
+        self.summary = summary
+        return True
+
+
+def long_history():
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"Turn {i} " + "about servos " * 100}
+        for i in range(20)
+    ]
+
+
+def summarize(reply):
+    store = FakeStore(long_history())
+    summarizer = ConversationSummarizer(FakeClient(reply), store, max_words=100)
+    asyncio.run(summarizer._summarize(1))
+    return store, summarizer
+
+
+def test_long_history_is_folded_into_summary():
+    store, summarizer = summarize("The student is learning about servos.")
+
+    assert store.summary == "The student is learning about servos."
+    assert len(store.history) < 20
+    assert summarizer.summaries_written == 1
+
+
+@pytest.mark.parametrize("reply", [EMPTY_REPLY, "   "])
+def test_fallback_reply_keeps_history_and_summary(reply):
+    store, summarizer = summarize(reply)
+
+    assert store.summary == "Earlier summary"
+    assert len(store.history) == 20
+    assert summarizer.summaries_written == 0
+
+
+def test_history_is_folded_against_the_given_budget():
+    # About 2000 tokens: within the standard model's budget but not the lite model's
+    store = FakeStore(long_history()[:6])
+    summarizer = ConversationSummarizer(FakeClient("Summary"), store, max_words=100, history_budget=1500)
+    asyncio.run(summarizer._summarize(1))
+
+    assert store.summary == "Summary"
+    assert len(store.history) < 6